@@ -1,6 +1,7 @@
 import logging
 import pathlib
 import functools
+import tempfile
 import multiprocessing
 import click
 
@@ -15,6 +16,7 @@ from libs.pipelines import api_pipeline
 from libs.pipelines import api_v2_pipeline
 from libs.datasets import combined_datasets
 from libs.datasets.timeseries import MultiRegionTimeseriesDataset
+from libs.datasets.timeseries import SharedMultiRegionDataset
 from libs.datasets.dataset_utils import REPO_ROOT
 from libs.datasets.dataset_utils import AggregationLevel
 from libs.enums import Intervention
@@ -220,21 +222,25 @@ def generate_api_v2(model_output_dir, output, aggregation_level, state, fips):
 
     regions_data = combined_datasets.load_us_timeseries_dataset().get_regions_subset(regions)
 
-    regional_inputs = [
-        api_v2_pipeline.RegionalInput.from_one_regions(
-            region,
-            regional_data,
-            icu_data=icu_data_map.get(region),
-            rt_data=rt_data_map.get(region),
-        )
-        for region, regional_data in regions_data.iter_one_regions()
-    ]
+    with tempfile.TemporaryDirectory() as shared_dir:
+        # Workers read the combined data of their region from memory-mapped files instead of
+        # each region's data being pickled and sent to them.
+        shared_data = SharedMultiRegionDataset.write(regions_data, pathlib.Path(shared_dir))
+        regional_inputs = [
+            api_v2_pipeline.RegionalInput.from_shared_dataset(
+                region,
+                shared_data,
+                icu_data=icu_data_map.get(region),
+                rt_data=rt_data_map.get(region),
+            )
+            for region in shared_data.iter_regions()
+        ]
 
-    _logger.info(f"Finished loading all regional inputs.")
+        _logger.info(f"Finished loading all regional inputs.")
 
-    # Build all region timeseries API Output objects.
-    _logger.info("Generating all API Timeseries")
-    all_timeseries = api_v2_pipeline.run_on_regions(regional_inputs)
+        # Build all region timeseries API Output objects.
+        _logger.info("Generating all API Timeseries")
+        all_timeseries = api_v2_pipeline.run_on_regions(regional_inputs)
 
     api_v2_pipeline.deploy_single_level(all_timeseries, AggregationLevel.COUNTY, output)
     api_v2_pipeline.deploy_single_level(all_timeseries, AggregationLevel.STATE, output)
@@ -17,6 +17,7 @@ from libs.datasets.combined_datasets import (
 )
 from libs.datasets.latest_values_dataset import LatestValuesDataset
 from libs.datasets.timeseries import MultiRegionTimeseriesDataset
+from libs.datasets.timeseries import MultiRegionTimeseriesDatasetBuilder
 from libs.datasets.timeseries import add_new_cases
 from libs.qa import dataset_summary
 from libs.qa import data_availability
@@ -24,6 +25,7 @@ from libs.datasets.timeseries import TimeseriesDataset
 from libs.datasets import dataset_utils
 from libs.datasets import combined_dataset_utils
 from libs.datasets import combined_datasets
+from libs.datasets.dataset_pointer import DatasetFormat
 from libs.datasets.sources import forecast_hub
 from pyseir import DATA_DIR
 import pyseir.icu.utils
@@ -65,7 +67,10 @@ def update_forecasts(filename):
 @click.option("--summary-filename", default="timeseries_summary.csv")
 @click.option("--wide-dates-filename", default="multiregion-wide-dates.csv")
 @click.option("--aggregate-to-msas", is_flag=True, help="Aggregate counties to MSAs")
-def update(summary_filename, wide_dates_filename, aggregate_to_msas: bool):
+@click.option(
+    "--parquet", is_flag=True, help="Save the multiregion dataset as Parquet instead of CSV"
+)
+def update(summary_filename, wide_dates_filename, aggregate_to_msas: bool, parquet: bool):
     """Updates latest and timeseries datasets to the current checked out covid data public commit"""
     path_prefix = dataset_utils.DATA_DIRECTORY.relative_to(dataset_utils.REPO_ROOT)
 
@@ -85,18 +90,20 @@ def update(summary_filename, wide_dates_filename, aggregate_to_msas: bool):
     latest_dataset: LatestValuesDataset = combined_datasets.build_from_sources(
         LatestValuesDataset, data_sources, ALL_FIELDS_FEATURE_DEFINITION, filter=US_STATES_FILTER,
     )
-    multiregion_dataset = MultiRegionTimeseriesDataset.from_timeseries_and_latest(
-        timeseries_dataset, latest_dataset
+    county_dataset = add_new_cases(
+        MultiRegionTimeseriesDataset.from_timeseries_and_latest(timeseries_dataset, latest_dataset)
     )
-    multiregion_dataset = add_new_cases(multiregion_dataset)
+    builder = MultiRegionTimeseriesDatasetBuilder(county_dataset)
     if aggregate_to_msas:
         aggregator = statistical_areas.CountyToCBSAAggregator.from_local_public_data()
-        multiregion_dataset = multiregion_dataset.append_regions(
-            aggregator.aggregate(multiregion_dataset)
-        )
+        builder.append_regions(aggregator.aggregate(county_dataset))
+    multiregion_dataset = builder.build()
 
     _, multiregion_pointer = combined_dataset_utils.update_data_public_head(
-        path_prefix, latest_dataset, multiregion_dataset,
+        path_prefix,
+        latest_dataset,
+        multiregion_dataset,
+        timeseries_format=DatasetFormat.PARQUET if parquet else DatasetFormat.CSV,
     )
 
     # Write DataSource objects that have provenance information, which is only set when significant
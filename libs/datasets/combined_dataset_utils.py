@@ -8,6 +8,7 @@ from libs.datasets import dataset_base
 from libs.datasets import timeseries
 from libs.datasets import latest_values_dataset
 from libs.datasets import dataset_utils
+from libs.datasets.dataset_pointer import DatasetFormat
 from libs.datasets.dataset_pointer import DatasetPointer
 from libs.github_utils import GitSummary
 
@@ -18,6 +19,7 @@ def persist_dataset(
     dataset: dataset_base.SaveableDatasetInterface,
     data_directory: pathlib.Path,
     data_public_path: pathlib.Path = dataset_utils.LOCAL_PUBLIC_DATA_PATH,
+    dataset_format: DatasetFormat = DatasetFormat.CSV,
 ) -> DatasetPointer:
     """Saves dataset and associated pointer in same data directory.
 
@@ -25,6 +27,7 @@ def persist_dataset(
         dataset: Dataset to persist.
         data_directory: Data directory
         data_public_path: Path to covid data public folder.
+        dataset_format: File format of the dataset.
 
     Returns: DatasetPointer describing persisted dataset.
     """
@@ -33,7 +36,7 @@ def persist_dataset(
 
     dataset_type = dataset.dataset_type
 
-    dataset_path = data_directory / f"{dataset_type.value}.csv"
+    dataset_path = data_directory / f"{dataset_type.value}{dataset_format.value}"
     dataset_pointer = DatasetPointer(
         dataset_type=dataset_type,
         path=dataset_path,
@@ -50,6 +53,7 @@ def update_data_public_head(
     data_directory: pathlib.Path,
     latest_dataset: latest_values_dataset.LatestValuesDataset,
     timeseries_dataset: timeseries.MultiRegionTimeseriesDataset,
+    timeseries_format: DatasetFormat = DatasetFormat.CSV,
 ) -> Tuple[DatasetPointer, DatasetPointer]:
     """Persists US latest and timeseries dataset and saves dataset pointers for Latest tag.
 
@@ -57,10 +61,13 @@ def update_data_public_head(
         data_directory: Directory to save dataset and pointer.
         latest_dataset: The LatestValuesDataset to persist for debugging. It is not read downstream.
         timeseries_dataset: The dataset to persist.
+        timeseries_format: File format of the timeseries dataset.
 
     Returns: Tuple of DatasetPointers to latest and timeseries datasets.
     """
     latest_pointer = persist_dataset(latest_dataset, data_directory)
 
-    timeseries_pointer = persist_dataset(timeseries_dataset, data_directory)
+    timeseries_pointer = persist_dataset(
+        timeseries_dataset, data_directory, dataset_format=timeseries_format
+    )
     return latest_pointer, timeseries_pointer
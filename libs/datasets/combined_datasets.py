@@ -129,11 +129,15 @@ def load_us_timeseries_dataset(
     before=None,
     previous_commit=False,
     commit: str = None,
+    columns: Optional[Tuple[str, ...]] = None,
 ) -> MultiRegionTimeseriesDataset:
+    """Loads the combined dataset. `columns` limits the columns loaded from a Parquet dataset."""
     filename = dataset_pointer.form_filename(DatasetType.MULTI_REGION)
     pointer_path = pointer_directory / filename
     pointer = DatasetPointer.parse_raw(pointer_path.read_text())
-    return pointer.load_dataset(before=before, previous_commit=previous_commit, commit=commit)
+    return pointer.load_dataset(
+        before=before, previous_commit=previous_commit, commit=commit, columns=columns
+    )
 
 
 @functools.lru_cache(None)
@@ -261,9 +265,9 @@ def _merge_field(
             field_provenance.loc[pd.notna(datasource_field_in)] = datasource_name
             field_out = datasource_field_in
         else:
-            field_out_has_ts = field_out.groupby(level=[CommonFields.FIPS], sort=False).transform(
-                lambda x: x.notna().any()
-            )
+            field_out_has_ts = field_out.groupby(
+                level=[CommonFields.FIPS], sort=False, observed=True
+            ).transform(lambda x: x.notna().any())
             copy_field_in = (~field_out_has_ts) & pd.notna(datasource_field_in)
             # Copy from datasource_field_in only on rows where all rows of field_out with that FIPS are NaN.
             field_provenance.loc[copy_field_in] = datasource_name
@@ -295,7 +299,9 @@ def provenance_wide_metrics_to_series(wide: pd.DataFrame, log) -> pd.Series:
         .drop_duplicates()
         .dropna(subset=["value"])
     )
-    fips_var_grouped = long_unindexed.groupby([CommonFields.FIPS, "variable"], sort=False)["value"]
+    fips_var_grouped = long_unindexed.groupby(
+        [CommonFields.FIPS, "variable"], sort=False, observed=True
+    )["value"]
     dups = fips_var_grouped.transform("size") > 1
     if dups.any():
         log.warning("Multiple rows for a timeseries", bad_data=long_unindexed[dups])
@@ -6,6 +6,7 @@ import structlog
 from covidactnow.datapublic import common_df
 import pandas as pd
 
+from libs.datasets import dataset_utils
 from libs.datasets.dataset_utils import AggregationLevel, DatasetType
 
 
@@ -18,6 +19,14 @@ class SaveableDatasetInterface:
         """
         raise NotImplementedError("Subsclass must implement")
 
+    def to_parquet(self, path: pathlib.Path):
+        """Persists timeseries to Parquet.
+
+        Args:
+            path: Path to write to.
+        """
+        raise NotImplementedError("Subsclass must implement")
+
     @property
     def dataset_type(self) -> DatasetType:
         raise NotImplementedError("Subsclass must implement")
@@ -30,7 +39,7 @@ class DatasetBase(SaveableDatasetInterface):
     COMMON_INDEX_FIELDS: List[str] = []
 
     def __init__(self, data: pd.DataFrame, provenance: Optional[pd.Series] = None):
-        self.data = data
+        self.data = dataset_utils.categorize_columns(data)
         self.provenance = provenance
 
     def get_subset(self, aggregation_level: AggregationLevel, **filters) -> "DatasetBase":
@@ -38,10 +47,7 @@ class DatasetBase(SaveableDatasetInterface):
         raise NotImplementedError("Subsclass must implement")
 
     def yield_records(self) -> Iterable[dict]:
-        # It'd be faster to use self.data.itertuples or find a way to avoid yield_records, but that
-        # needs larger changes in code calling this.
-        for idx, row in self.data.iterrows():
-            yield row.where(pd.notnull(row), None).to_dict()
+        return dataset_utils.yield_records(self.data)
 
     @classmethod
     def load_csv(cls, path_or_buf: Union[pathlib.Path, TextIO]):
@@ -1,4 +1,4 @@
-from typing import Optional, Type
+from typing import Iterable, Optional, Type
 import os
 import enum
 import logging
@@ -18,6 +18,11 @@ GEO_DATA_COLUMNS = [
     CommonFields.COUNTY,
 ]
 
+# Columns of datasets with a few distinct values repeated in every row of a region. They are stored
+# as categoricals, which take a fraction of the memory of str objects and are faster to group by.
+# Pass `observed=True` when grouping by them so that groups are only made for values in the rows.
+CATEGORICAL_COLUMNS = [CommonFields.LOCATION_ID, *GEO_DATA_COLUMNS]
+
 
 def _get_public_data_path():
     """Sets global path to covid-data-public directory."""
@@ -193,6 +198,18 @@ def add_county_using_fips(data, fips_data):
     return pd.concat([data, not_county_df])
 
 
+def categorize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns df with the CATEGORICAL_COLUMNS in it converted to categoricals."""
+    columns = [
+        column
+        for column in CATEGORICAL_COLUMNS
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype)
+    ]
+    if not columns:
+        return df
+    return df.astype({column: "category" for column in columns})
+
+
 def assert_counties_have_fips(data, county_key="county", fips_key="fips"):
     is_county = data["aggregate_level"] == AggregationLevel.COUNTY.value
     is_fips_null = is_county & data[fips_key].isnull()
@@ -206,7 +223,7 @@ def summarize(data, aggregate_level, groupby):
 
     data = data[data["aggregate_level"] == aggregate_level.value]
     missing_fips = sum(data.fips.isna())
-    index_size = data.groupby(groupby).size()
+    index_size = data.groupby(groupby, observed=True).size()
     non_unique = index_size > 1
     num_non_unique = sum(non_unique)
     print(key_fmt.format("Aggregate Level:", aggregate_level.value))
@@ -311,3 +328,20 @@ def fips_index_geo_data(df: pd.DataFrame) -> pd.DataFrame:
     # are rows in the input data sources that have different values for county name, state etc.
     fips_indexed = all_identifiers.set_index(CommonFields.FIPS, verify_integrity=True)
     return fips_indexed
+
+
+def yield_records(df: pd.DataFrame) -> Iterable[dict]:
+    """Yields a dict for each row of df, with None in place of missing values.
+
+    Returns the same records as `row.where(pd.notnull(row), None).to_dict()` for each row of a df
+    with columns of different types, but converts each column to Python objects once instead of
+    building a Series for every row.
+    """
+    columns = list(df.columns)
+    column_values = []
+    for column in columns:
+        values = df[column].to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = None
+        column_values.append(values)
+    for row in zip(*column_values):
+        yield dict(zip(columns, row))
@@ -5,6 +5,7 @@ import datetime
 import pandas as pd
 
 from libs.datasets import can_model_output_schema as schema
+from libs.datasets import dataset_utils
 from libs.enums import Intervention
 from pyseir.deployment import webui_data_adaptor_v1
 
@@ -89,7 +90,4 @@ class CANPyseirLocationOutput(object):
         return self.data.loc[last_idx][schema.RT_INDICATOR_CI90]
 
     def yield_records(self) -> Iterable[dict]:
-        # It'd be faster to use self.data.itertuples or find a way to avoid yield_records, but that
-        # needs larger changes in code calling this.
-        for idx, row in self.data.iterrows():
-            yield row.where(pd.notnull(row), None).to_dict()
+        return dataset_utils.yield_records(self.data)
@@ -72,7 +72,7 @@ class CountyToCBSAAggregator:
         # TODO(tom): Handle dates with a subset of counties reporting.
         # TODO(tom): Handle data columns that don't make sense aggregated with sum.
         groupby_columns = [CBSA_COLUMN, CommonFields.DATE] if groupby_date else [CBSA_COLUMN]
-        df_cbsa = df.groupby(groupby_columns, as_index=False).sum()
+        df_cbsa = df.groupby(groupby_columns, as_index=False, observed=True).sum()
         df_cbsa[CommonFields.LOCATION_ID] = df_cbsa[CBSA_COLUMN].apply(pipeline.cbsa_to_location_id)
 
         return df_cbsa
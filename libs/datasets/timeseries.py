@@ -1,8 +1,11 @@
 import datetime
+import json
 import pathlib
 import warnings
+import dataclasses
 from dataclasses import dataclass
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import Iterable
 from typing import List, Optional, Union, TextIO
@@ -13,6 +16,7 @@ from covidactnow.datapublic import common_fields
 from covidactnow.datapublic.common_fields import PdFields
 from typing_extensions import final
 
+import fastparquet
 import pandas as pd
 import numpy as np
 import structlog
@@ -95,11 +99,7 @@ class OneRegionTimeseriesDataset:
         return True
 
     def yield_records(self) -> Iterable[dict]:
-        # Copied from dataset_base.py
-        # It'd be faster to use self.data.itertuples or find a way to avoid yield_records, but that
-        # needs larger changes in code calling this.
-        for idx, row in self.data.iterrows():
-            yield row.where(pd.notnull(row), None).to_dict()
+        return dataset_utils.yield_records(self.data)
 
     def get_subset(self, after=None, columns=tuple()):
         rows_key = dataset_utils.make_rows_key(self.data, after=after,)
@@ -143,23 +143,23 @@ class TimeseriesDataset(dataset_base.DatasetBase):
     def latest_values(self) -> pd.DataFrame:
         """Gets the most recent values.
 
-        Return: DataFrame
+        Return: DataFrame with a row for each FIPS and the last real value of each column, except
+            DATE, in the rows of the FIPS sorted by DATE.
         """
-        columns_to_ffill = list(set(self.data.columns) - set(TimeseriesDataset.INDEX_FIELDS))
-        data_copy = self.data.set_index([CommonFields.FIPS, CommonFields.DATE]).sort_index()
-        # Groupby preserves the order of rows within a group so ffill will fill forwards by DATE.
-        groups_to_fill = data_copy.groupby([CommonFields.FIPS], sort=False)
-        # Consider using ffill(limit=...) to constrain how far in the past the latest values go. Currently, because
-        # there may be dates missing in the index an integer limit does not provide a consistent
-        # limit on the number of days in the past that may be used.
-        data_copy[columns_to_ffill] = groups_to_fill[columns_to_ffill].ffill()
-        return (
-            data_copy.groupby([CommonFields.FIPS], sort=False)
-            .last()
-            # Reset FIPS back to a regular column and drop the DATE index.
-            .reset_index(CommonFields.FIPS)
-            .reset_index(drop=True)
+        data = self.data
+        if data[CommonFields.FIPS].isna().any():
+            data = data.loc[data[CommonFields.FIPS].notna(), :]
+        fips_codes, fips_values = pd.factorize(data[CommonFields.FIPS], sort=True)
+        date_codes, _ = pd.factorize(data[CommonFields.DATE], sort=True)
+        # Missing dates have code -1; sort them after all real dates like sort_index does.
+        date_codes = np.where(date_codes < 0, len(data), date_codes)
+        row_order = np.lexsort((date_codes, fips_codes))
+        group_starts = np.searchsorted(fips_codes[row_order], np.arange(len(fips_values) + 1))
+        latest = _last_valid_values(
+            data.drop(columns=[CommonFields.FIPS, CommonFields.DATE]), row_order, group_starts
         )
+        latest.insert(0, CommonFields.FIPS, fips_values)
+        return latest
 
     def latest_values_object(self) -> LatestValuesDataset:
         return LatestValuesDataset(self.latest_values())
@@ -189,9 +189,7 @@ class TimeseriesDataset(dataset_base.DatasetBase):
         # Drop any rows without a real value for any date.
         wide_dates = wide_dates.loc[wide_dates.loc[:, "value"].notna().any(axis=1), :]
 
-        summary = wide_dates.loc[:, "value"].apply(
-            libs.qa.dataset_summary_gen.generate_field_summary, axis=1
-        )
+        summary = libs.qa.dataset_summary_gen.generate_field_summaries(wide_dates.loc[:, "value"])
 
         geo_data_per_fips = dataset_utils.fips_index_geo_data(self.data)
         # Make a DataFrame with a row for each summary.index element
@@ -323,17 +321,32 @@ class TimeseriesDataset(dataset_base.DatasetBase):
         return cls(df)
 
 
+def _map_unique(
+    values: Union[pd.Series, pd.Index], func: Callable[[str], Optional[str]]
+) -> np.ndarray:
+    """Returns an array of func applied to every element of values, calling func once for each
+    distinct value.
+
+    Datasets have hundreds of rows for each region so this is much faster than `values.apply`.
+    """
+    unique_values = pd.Index(pd.unique(values))
+    unique_results = np.array([func(value) for value in unique_values], dtype=object)
+    return unique_results[unique_values.get_indexer(values)]
+
+
 def _add_location_id(df: pd.DataFrame):
     """Adds the location_id column derived from FIPS, inplace."""
     if CommonFields.LOCATION_ID in df.columns:
         raise ValueError("location_id already in DataFrame")
-    df[CommonFields.LOCATION_ID] = df[CommonFields.FIPS].apply(pipeline.fips_to_location_id)
+    df[CommonFields.LOCATION_ID] = _map_unique(df[CommonFields.FIPS], pipeline.fips_to_location_id)
 
 
 def _add_fips_if_missing(df: pd.DataFrame):
     """Adds the FIPS column derived from location_id, inplace."""
     if CommonFields.FIPS not in df.columns:
-        df[CommonFields.FIPS] = df[CommonFields.LOCATION_ID].apply(pipeline.location_id_to_fips)
+        df[CommonFields.FIPS] = _map_unique(
+            df[CommonFields.LOCATION_ID], pipeline.location_id_to_fips
+        )
 
 
 def _index_latest_df(
@@ -346,7 +359,10 @@ def _index_latest_df(
         warnings.warn(BadMultiRegionWarning("Unexpected empty latest DataFrame"))
         return pd.DataFrame(index=ts_locations).sort_index()
     else:
-        latest_df_with_index = latest_df.set_index(CommonFields.LOCATION_ID, verify_integrity=True)
+        # A plain index, even when the column is categorical, so other locations can be added.
+        latest_df_with_index = latest_df.astype({CommonFields.LOCATION_ID: object}).set_index(
+            CommonFields.LOCATION_ID, verify_integrity=True
+        )
         # Make an index with the union of the locations in the timeseries and latest_df to keep all rows of
         # latest_df
         all_locations = (
@@ -361,6 +377,101 @@ def _index_latest_df(
         return latest_df_with_index.reindex(index=all_locations)
 
 
+@final
+@dataclass(frozen=True)
+class _LocationIndex:
+    """Rows of each location in the `data` and `latest_data` of a MultiRegionTimeseriesDataset."""
+
+    # Sorted location_id of every location in `data` or `latest_data`.
+    location_ids: np.ndarray
+    # Positions of the rows of `data` sorted by location_id and date, None if `data` is sorted.
+    row_order: Optional[np.ndarray]
+    # The rows of location_ids[i] are at row_order[row_starts[i] : row_starts[i + 1]].
+    row_starts: np.ndarray
+    # Position of each location in `latest_data`, -1 for locations without latest values.
+    latest_positions: np.ndarray
+
+    @staticmethod
+    def build(data: pd.DataFrame, latest_data: pd.DataFrame) -> "_LocationIndex":
+        data_location_codes, data_location_ids = pd.factorize(data[CommonFields.LOCATION_ID])
+        location_ids = np.unique(
+            np.concatenate(
+                [
+                    np.asarray(data_location_ids, dtype=object),
+                    latest_data.index.to_numpy(dtype=object),
+                ]
+            )
+        )
+        location_codes = np.searchsorted(location_ids, data_location_ids)[data_location_codes]
+        date_codes, _ = pd.factorize(data[CommonFields.DATE], sort=True)
+        row_order = np.lexsort((date_codes, location_codes))
+        row_starts = np.searchsorted(location_codes[row_order], np.arange(len(location_ids) + 1))
+        if (row_order[1:] > row_order[:-1]).all():
+            row_order = None
+        return _LocationIndex(
+            location_ids=location_ids,
+            row_order=row_order,
+            row_starts=row_starts,
+            latest_positions=latest_data.index.get_indexer(location_ids),
+        )
+
+    def find(self, location_id: str) -> Optional[int]:
+        """Returns the position of location_id in location_ids, None if it is not there."""
+        i = int(np.searchsorted(self.location_ids, location_id))
+        if i < len(self.location_ids) and self.location_ids[i] == location_id:
+            return i
+        return None
+
+    def rows(self, i: int) -> Union[slice, np.ndarray]:
+        """Returns the positions in `data` of the rows of location_ids[i], sorted by date."""
+        start, stop = self.row_starts[i], self.row_starts[i + 1]
+        if self.row_order is None:
+            return slice(start, stop)
+        return self.row_order[start:stop]
+
+
+@final
+@dataclass(frozen=True)
+class TimeseriesArray:
+    """Timeseries of many regions in a dense array, built by `timeseries_array`."""
+
+    # Sorted location_id of every location with timeseries rows.
+    location_ids: pd.Index
+    # Every date from the first to the last date of the timeseries.
+    dates: pd.DatetimeIndex
+    fields: pd.Index
+    # Read-only array with shape (len(location_ids), len(dates), len(fields)). NaN where a
+    # location has no row for a date or no value for a field.
+    values: np.ndarray
+
+    def field(self, field: common_fields.FieldName) -> pd.DataFrame:
+        """Returns the values of one field with a LOCATION_ID index and a column per date."""
+        return pd.DataFrame(
+            self.values[:, :, self.fields.get_loc(field)],
+            index=self.location_ids,
+            columns=self.dates,
+        )
+
+    def to_long(self) -> pd.DataFrame:
+        """Returns the real values in the format of `MultiRegionTimeseriesDataset.timeseries_long`.
+
+        Returns: a DataFrame with columns LOCATION_ID, DATE, VARIABLE, VALUE
+        """
+        # Move fields to the first axis so rows are sorted by variable, location and date.
+        by_field = self.values.transpose(2, 0, 1)
+        field_positions, location_positions, date_positions = np.nonzero(~np.isnan(by_field))
+        return pd.DataFrame(
+            {
+                CommonFields.LOCATION_ID: pd.Categorical.from_codes(
+                    location_positions, self.location_ids
+                ),
+                CommonFields.DATE: self.dates[date_positions],
+                PdFields.VARIABLE: self.fields[field_positions],
+                PdFields.VALUE: by_field[field_positions, location_positions, date_positions],
+            }
+        )
+
+
 @final
 @dataclass(frozen=True)
 class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
@@ -384,6 +495,21 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
     # `provenance` is an array of str with a MultiIndex with names LOCATION_ID and VARIABLE.
     provenance: Optional[pd.Series] = None
 
+    # Built by `_location_index` the first time a region is looked up.
+    _location_index_cache: Optional[_LocationIndex] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    # Built by `last_valid_values` the first time it is called.
+    _last_valid_values_cache: Optional[pd.DataFrame] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    # Arrays built by `timeseries_array`, by fields and dtype.
+    _timeseries_array_cache: Dict[Tuple, TimeseriesArray] = dataclasses.field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
     @property
     def dataset_type(self) -> DatasetType:
         return DatasetType.MULTI_REGION
@@ -407,6 +533,10 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
     def load_csv(cls, path_or_buf: Union[pathlib.Path, TextIO]):
         return MultiRegionTimeseriesDataset.from_csv(path_or_buf)
 
+    @classmethod
+    def load_parquet(cls, path: pathlib.Path, columns: Optional[Sequence[str]] = None):
+        return MultiRegionTimeseriesDataset.from_parquet(path, columns=columns)
+
     def timeseries_long(self, columns: List[common_fields.FieldName]) -> pd.DataFrame:
         """Returns a subset of the data in a long format DataFrame, where all values are in a single column.
 
@@ -423,6 +553,84 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
         long[PdFields.VALUE].apply(pd.to_numeric)
         return long
 
+    def last_valid_values(self) -> pd.DataFrame:
+        """Returns the last real value of each column of `data` for each location.
+
+        The DataFrame has a LOCATION_ID index with the locations that have timeseries rows and
+        every column of `data` except LOCATION_ID and DATE. The result is computed once, from the
+        rows of each location sorted by date, and shared by later calls, so treat it as read-only.
+        """
+        if self._last_valid_values_cache is None:
+            location_index = self._location_index()
+            has_rows = np.diff(location_index.row_starts) > 0
+            latest = _last_valid_values(
+                self.data.drop(columns=[CommonFields.LOCATION_ID, CommonFields.DATE]),
+                location_index.row_order,
+                location_index.row_starts,
+            )
+            latest.index = pd.Index(location_index.location_ids, name=CommonFields.LOCATION_ID)
+            object.__setattr__(self, "_last_valid_values_cache", latest.loc[has_rows, :])
+        return self._last_valid_values_cache
+
+    def timeseries_array(
+        self,
+        fields: Optional[Sequence[common_fields.FieldName]] = None,
+        dtype: Union[str, np.dtype] = np.float32,
+    ) -> TimeseriesArray:
+        """Returns the timeseries of `fields` in a dense regions x dates x fields array.
+
+        The array is built once for each `fields` and `dtype` and shared by later calls, so code
+        processing all regions and dates can index it instead of pivoting `data` again.
+
+        Args:
+            fields: Timeseries columns to include, by default every numeric column.
+            dtype: Type of the values. float32 halves the memory of the default float64 of
+                `data` but is only exact for integers up to 2**24.
+        """
+        if fields is None:
+            fields = [
+                column
+                for column in self.data.select_dtypes(include="number").columns
+                if column not in GEO_DATA_COLUMNS
+            ]
+        dtype = np.dtype(dtype)
+        key = (tuple(str(field) for field in fields), dtype.str)
+        if key not in self._timeseries_array_cache:
+            self._timeseries_array_cache[key] = self._build_timeseries_array(fields, dtype)
+        return self._timeseries_array_cache[key]
+
+    def _build_timeseries_array(
+        self, fields: Sequence[common_fields.FieldName], dtype: np.dtype
+    ) -> TimeseriesArray:
+        location_index = self._location_index()
+        row_counts = np.diff(location_index.row_starts)
+        has_rows = row_counts > 0
+        # Position on the location axis of each row, in the order of `location_index`.
+        location_positions = np.repeat(np.arange(has_rows.sum()), row_counts[has_rows])
+        data = self.data
+        if location_index.row_order is not None:
+            data = data.iloc[location_index.row_order]
+        row_dates = pd.DatetimeIndex(data[CommonFields.DATE])
+        if len(row_dates):
+            dates = pd.date_range(row_dates.min(), row_dates.max(), name=CommonFields.DATE)
+        else:
+            dates = pd.DatetimeIndex([], name=CommonFields.DATE)
+        date_positions = (row_dates - row_dates.min()).days.to_numpy()
+
+        values = np.full((has_rows.sum(), len(dates), len(fields)), np.nan, dtype=dtype)
+        values[location_positions, date_positions, :] = data.loc[:, list(fields)].to_numpy(
+            dtype=dtype
+        )
+        values.flags.writeable = False
+        return TimeseriesArray(
+            location_ids=pd.Index(
+                location_index.location_ids[has_rows], name=CommonFields.LOCATION_ID
+            ),
+            dates=dates,
+            fields=pd.Index(fields, name=PdFields.VARIABLE),
+            values=values,
+        )
+
     @staticmethod
     def from_timeseries_df(
         timeseries_df: pd.DataFrame, provenance: Optional[pd.Series] = None
@@ -433,18 +641,29 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
         return MultiRegionTimeseriesDataset(timeseries_df, empty_latest_df, provenance=provenance)
 
     def append_latest_df(self, latest_df: pd.DataFrame) -> "MultiRegionTimeseriesDataset":
-        assert latest_df.index.names == [None]
-        assert CommonFields.LOCATION_ID in latest_df.columns
+        return self._append_latest_dfs([latest_df])
 
+    def _append_latest_dfs(
+        self, latest_dfs: Sequence[pd.DataFrame]
+    ) -> "MultiRegionTimeseriesDataset":
+        """Returns a copy of this dataset with the columns of every DataFrame in latest_dfs added to
+        latest_data, with one concat for all of them."""
         # test_top_level_metrics_basic depends on some empty columns being preserved in the
         # MultiRegionTimeseriesDataset so don't call dropna in this method.
-        ts_locations = self.data[CommonFields.LOCATION_ID].unique()
+        ts_locations = np.asarray(self.data[CommonFields.LOCATION_ID].unique(), dtype=object)
         ts_locations.sort()
-        latest_df = _index_latest_df(latest_df, ts_locations)
-        common_columns = set(latest_df.columns) & set(self.latest_data.columns)
-        if common_columns:
-            warnings.warn(f"Common columns {common_columns}")
-        latest_df = pd.concat([self.latest_data, latest_df], axis=1)
+        latest_columns = set(self.latest_data.columns)
+        indexed_latest_dfs = []
+        for latest_df in latest_dfs:
+            assert latest_df.index.names == [None]
+            assert CommonFields.LOCATION_ID in latest_df.columns
+            latest_df = _index_latest_df(latest_df, ts_locations)
+            common_columns = set(latest_df.columns) & latest_columns
+            if common_columns:
+                warnings.warn(f"Common columns {common_columns}")
+            latest_columns.update(latest_df.columns)
+            indexed_latest_dfs.append(latest_df)
+        latest_df = pd.concat([self.latest_data, *indexed_latest_dfs], axis=1)
 
         return MultiRegionTimeseriesDataset(self.data, latest_df, provenance=self.provenance)
 
@@ -483,6 +702,33 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
             common_df.read_csv(path_or_buf, set_index=False)
         )
 
+    @staticmethod
+    def from_parquet(
+        path: pathlib.Path, columns: Optional[Sequence[str]] = None
+    ) -> "MultiRegionTimeseriesDataset":
+        """Loads a dataset saved by `to_parquet`.
+
+        Args:
+            path: Path of the timeseries file, see `parquet_paths`.
+            columns: If set, only these columns are read, along with LOCATION_ID, DATE and FIPS.
+        """
+        if columns is not None:
+            columns = [CommonFields.LOCATION_ID, CommonFields.DATE, CommonFields.FIPS, *columns]
+        timeseries_path, latest_path = MultiRegionTimeseriesDataset.parquet_paths(path)
+        timeseries_df = _read_parquet(timeseries_path, columns)
+        latest_df = (
+            _read_parquet(latest_path, columns)
+            .astype({CommonFields.LOCATION_ID: object})
+            .set_index(CommonFields.LOCATION_ID)
+        )
+        return MultiRegionTimeseriesDataset(timeseries_df, latest_df)
+
+    @staticmethod
+    def parquet_paths(path: pathlib.Path) -> Tuple[pathlib.Path, pathlib.Path]:
+        """Returns the paths of the timeseries and latest values files of a Parquet dataset."""
+        path = pathlib.Path(path)
+        return path, path.with_name(f"{path.stem}-latest{path.suffix}")
+
     @staticmethod
     def from_timeseries_and_latest(
         ts: TimeseriesDataset, latest: LatestValuesDataset
@@ -495,13 +741,19 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
         _add_location_id(latest_df)
 
         if ts.provenance is not None:
-            # Check that current index is as expected. Names will be fixed after remapping, below.
+            # Check that current index is as expected.
             assert ts.provenance.index.names == [CommonFields.FIPS, PdFields.VARIABLE]
             provenance = ts.provenance.copy()
-            provenance.index = provenance.index.map(
-                lambda i: (pipeline.fips_to_location_id(i[0]), i[1])
+            provenance.index = pd.MultiIndex.from_arrays(
+                [
+                    _map_unique(
+                        provenance.index.get_level_values(CommonFields.FIPS),
+                        pipeline.fips_to_location_id,
+                    ),
+                    provenance.index.get_level_values(PdFields.VARIABLE),
+                ],
+                names=[CommonFields.LOCATION_ID, PdFields.VARIABLE],
             )
-            provenance.index.rename([CommonFields.LOCATION_ID, PdFields.VARIABLE], inplace=True)
         else:
             provenance = None
 
@@ -513,6 +765,15 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
         ).append_latest_df(latest_df)
 
     def __post_init__(self):
+        # The dataclass is frozen, but the columns are only converted to a more compact dtype
+        # before the object is used.
+        object.__setattr__(self, "data", dataset_utils.categorize_columns(self.data))
+        object.__setattr__(self, "latest_data", dataset_utils.categorize_columns(self.latest_data))
+        if self.provenance is not None and not isinstance(
+            self.provenance.dtype, pd.CategoricalDtype
+        ):
+            object.__setattr__(self, "provenance", self.provenance.astype("category"))
+
         # Some integrity checks
         assert CommonFields.LOCATION_ID in self.data.columns
         assert self.data[CommonFields.LOCATION_ID].notna().all()
@@ -523,26 +784,40 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
     def append_regions(
         self, other: "MultiRegionTimeseriesDataset"
     ) -> "MultiRegionTimeseriesDataset":
-        return MultiRegionTimeseriesDataset.from_timeseries_df(
-            pd.concat([self.data, other.data], ignore_index=True)
-        ).append_latest_df(
-            pd.concat(
-                [self.latest_data.reset_index(), other.latest_data.reset_index()], ignore_index=True
+        return MultiRegionTimeseriesDatasetBuilder(self).append_regions(other).build()
+
+    def _location_index(self) -> _LocationIndex:
+        """Returns the rows of each location, built on first use.
+
+        With it a region is looked up with a binary search and a slice of `data` instead of a
+        scan of every row.
+        """
+        if self._location_index_cache is None:
+            # The dataclass is frozen, but the index only caches a function of `data` and
+            # `latest_data` which are never modified.
+            object.__setattr__(
+                self, "_location_index_cache", _LocationIndex.build(self.data, self.latest_data)
             )
-        )
+        return self._location_index_cache
 
     def get_one_region(self, region: Region) -> OneRegionTimeseriesDataset:
-        ts_df = self.data.loc[self.data[CommonFields.LOCATION_ID] == region.location_id, :]
+        location_index = self._location_index()
+        i = location_index.find(region.location_id)
+        if i is None:
+            raise RegionLatestNotFound(region)
+        ts_df = self.data.iloc[location_index.rows(i)]
         latest_dict = self._location_id_latest_dict(region.location_id)
         if ts_df.empty and not latest_dict:
             raise RegionLatestNotFound(region)
         return OneRegionTimeseriesDataset(data=ts_df, latest=latest_dict)
 
     def _location_id_latest_dict(self, location_id: str) -> dict:
-        try:
-            latest_row = self.latest_data.loc[location_id, :]
-        except KeyError:
+        location_index = self._location_index()
+        i = location_index.find(location_id)
+        if i is None or location_index.latest_positions[i] < 0:
             latest_row = pd.Series([], dtype=object)
+        else:
+            latest_row = self.latest_data.iloc[location_index.latest_positions[i]]
         return latest_row.where(pd.notnull(latest_row), None).to_dict()
 
     def get_regions_subset(self, regions: Sequence[Region]) -> "MultiRegionTimeseriesDataset":
@@ -588,7 +863,7 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
         return latest_df, provenance
 
     def groupby_region(self) -> pandas.core.groupby.generic.DataFrameGroupBy:
-        return self.data.groupby(CommonFields.LOCATION_ID)
+        return self.data.groupby(CommonFields.LOCATION_ID, observed=True)
 
     @property
     def empty(self) -> bool:
@@ -616,49 +891,347 @@ class MultiRegionTimeseriesDataset(SaveableDatasetInterface):
             provenance_path = str(path).replace(".csv", "-provenance.csv")
             self.provenance.sort_index().to_csv(provenance_path)
 
+    def to_parquet(self, path: pathlib.Path):
+        """Persists timeseries and latest values to Parquet files, see `parquet_paths`.
+
+        Unlike a CSV file the column types are stored, so loading skips parsing dates and
+        inferring types, the timeseries and latest values don't need to be split again and
+        `from_parquet` can read a subset of the columns.
+
+        Args:
+            path: Path to write to.
+        """
+        assert self.data[CommonFields.LOCATION_ID].notna().all()
+        timeseries_path, latest_path = MultiRegionTimeseriesDataset.parquet_paths(path)
+        _write_parquet(self.data, timeseries_path)
+        _write_parquet(self.latest_data.reset_index(), latest_path)
+        if self.provenance is not None:
+            provenance_path = str(path).replace(".parquet", "-provenance.csv")
+            self.provenance.sort_index().to_csv(provenance_path)
+
     def join_columns(self, other: "MultiRegionTimeseriesDataset") -> "MultiRegionTimeseriesDataset":
         """Joins the timeseries columns in `other` with those in `self`."""
+        return MultiRegionTimeseriesDatasetBuilder(self).join_columns(other).build()
+
+    def iter_one_regions(self) -> Iterable[Tuple[Region, OneRegionTimeseriesDataset]]:
+        """Iterates through all the regions in this object
+
+        Regions are yielded in location_id order, each with a slice of `data` (a view when `data`
+        is sorted by location_id and date) and latest values converted for all regions at once.
+        """
+        location_index = self._location_index()
+        latest_object = self.latest_data.astype(object)
+        latest_dicts = latest_object.where(latest_object.notna(), None).to_dict(orient="index")
+        data = self.data_with_fips
+        for i, location_id in enumerate(location_index.location_ids):
+            if location_index.row_starts[i] == location_index.row_starts[i + 1]:
+                # Only in latest_data
+                continue
+            latest_dict = latest_dicts.get(location_id, {})
+            yield Region(location_id=location_id, fips=None), OneRegionTimeseriesDataset(
+                data.iloc[location_index.rows(i)], latest_dict
+            )
+
+
+@dataclass
+class MultiRegionTimeseriesDatasetBuilder:
+    """Collects changes to a MultiRegionTimeseriesDataset and makes them all at once in `build`.
+
+    Each call of `join_columns`, `append_regions` and `append_latest_df` of
+    MultiRegionTimeseriesDataset copies, re-indexes and checks the whole dataset. The builder
+    keeps the arguments and `build` makes one concat of all the joined columns, one of all the
+    appended regions and one of all the latest values. The result is the same as calling the
+    methods of the dataset in the same order, which must be all `join_columns` calls, then all
+    `append_regions` calls, then all `append_latest_df` calls.
+    """
+
+    dataset: MultiRegionTimeseriesDataset
+
+    # Timeseries columns to join, indexed by LOCATION_ID and DATE.
+    _joined_dfs: List[pd.DataFrame] = dataclasses.field(default_factory=list)
+    _appended_datasets: List[MultiRegionTimeseriesDataset] = dataclasses.field(default_factory=list)
+    _latest_dfs: List[pd.DataFrame] = dataclasses.field(default_factory=list)
+
+    def join_columns(
+        self, other: MultiRegionTimeseriesDataset
+    ) -> "MultiRegionTimeseriesDatasetBuilder":
+        """Joins the timeseries columns in `other` with those of the dataset."""
+        if self._appended_datasets or self._latest_dfs:
+            raise ValueError(
+                "join_columns must be called before append_regions and append_latest_df"
+            )
         if not other.latest_data.empty:
             raise NotImplementedError("No support for joining other with latest_data")
         other_df = other.data_with_fips.set_index([CommonFields.LOCATION_ID, CommonFields.DATE])
-        self_df = self.data_with_fips.set_index([CommonFields.LOCATION_ID, CommonFields.DATE])
-        other_geo_columns = set(other_df.columns) & set(GEO_DATA_COLUMNS)
         other_ts_columns = (
             set(other_df.columns) - set(GEO_DATA_COLUMNS) - set(TimeseriesDataset.INDEX_FIELDS)
         )
-        common_ts_columns = other_ts_columns & set(self.data_with_fips.columns)
+        columns = set(self.dataset.data_with_fips.columns).union(
+            *(joined_df.columns for joined_df in self._joined_dfs)
+        )
+        common_ts_columns = other_ts_columns & columns
         if common_ts_columns:
             # columns to be joined need to be disjoint
             raise ValueError(f"Columns are in both dataset: {common_ts_columns}")
-        common_geo_columns = list(set(self.data_with_fips.columns) & other_geo_columns)
-        # TODO(tom): fix geo columns check, no later than when self.data is changed to contain only
-        # timeseries
-        # self_common_geo_columns = self_df.loc[:, common_geo_columns].fillna("")
-        # other_common_geo_columns = other_df.loc[:, common_geo_columns].fillna("")
-        # try:
-        #    if (self_common_geo_columns != other_common_geo_columns).any(axis=None):
-        #        unequal_rows = (self_common_geo_columns != other_common_geo_columns).any(axis=1)
-        #        _log.info(
-        #            "Geo data unexpectedly varies",
-        #            self_rows=self_df.loc[unequal_rows, common_geo_columns],
-        #            other_rows=other_df.loc[unequal_rows, common_geo_columns],
-        #        )
-        #        raise ValueError("Geo data unexpectedly varies")
-        # except Exception:
-        #    _log.exception(f"Comparing df {self_common_geo_columns} to {other_common_geo_columns}")
-        #    raise
-        combined_df = pd.concat([self_df, other_df[list(other_ts_columns)]], axis=1)
-        return MultiRegionTimeseriesDataset.from_timeseries_df(
-            combined_df.reset_index()
-        ).append_latest_df(self.latest_data_with_fips.reset_index())
+        # TODO(tom): check that the geo columns in both datasets are equal, no later than when
+        # `data` is changed to contain only timeseries
+        self._joined_dfs.append(other_df[list(other_ts_columns)])
+        return self
 
-    def iter_one_regions(self) -> Iterable[Tuple[Region, OneRegionTimeseriesDataset]]:
-        """Iterates through all the regions in this object"""
-        for location_id, data_group in self.data_with_fips.groupby(CommonFields.LOCATION_ID):
-            latest_dict = self._location_id_latest_dict(location_id)
-            yield Region(location_id=location_id, fips=None), OneRegionTimeseriesDataset(
-                data_group, latest_dict
+    def append_regions(
+        self, other: MultiRegionTimeseriesDataset
+    ) -> "MultiRegionTimeseriesDatasetBuilder":
+        """Appends the timeseries and latest values of the regions in `other`."""
+        if self._latest_dfs:
+            raise ValueError("append_regions must be called before append_latest_df")
+        self._appended_datasets.append(other)
+        return self
+
+    def append_latest_df(self, latest_df: pd.DataFrame) -> "MultiRegionTimeseriesDatasetBuilder":
+        """Adds the columns of latest_df, which has a LOCATION_ID column, to the latest values."""
+        self._latest_dfs.append(latest_df)
+        return self
+
+    def build(self) -> MultiRegionTimeseriesDataset:
+        dataset = self.dataset
+        # Like the methods of MultiRegionTimeseriesDataset, joining columns and appending regions
+        # doesn't keep the provenance.
+        if self._joined_dfs:
+            self_df = dataset.data_with_fips.set_index(
+                [CommonFields.LOCATION_ID, CommonFields.DATE]
+            )
+            combined_df = pd.concat([self_df, *self._joined_dfs], axis=1)
+            dataset = MultiRegionTimeseriesDataset.from_timeseries_df(
+                combined_df.reset_index()
+            ).append_latest_df(dataset.latest_data_with_fips.reset_index())
+        if self._appended_datasets:
+            datasets = [dataset, *self._appended_datasets]
+            dataset = MultiRegionTimeseriesDataset.from_timeseries_df(
+                pd.concat([d.data for d in datasets], ignore_index=True)
+            ).append_latest_df(
+                pd.concat([d.latest_data.reset_index() for d in datasets], ignore_index=True)
             )
+        if self._latest_dfs:
+            dataset = dataset._append_latest_dfs(self._latest_dfs)
+        return dataset
+
+
+def _write_parquet(df: pd.DataFrame, path: pathlib.Path):
+    """Writes df without its index. str columns are dictionary encoded, see `_read_parquet`."""
+    object_columns = df.select_dtypes(include=object).columns
+    df = df.astype({column: "category" for column in object_columns})
+    # The parquet writer requires plain str column names.
+    df.columns = [str(column) for column in df.columns]
+    df.to_parquet(path, engine="fastparquet", index=False)
+
+
+def _read_parquet(path: pathlib.Path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Reads a file written by `_write_parquet`, only the `columns` that are in it when set.
+
+    The dictionary encoded columns are read as categoricals, which is much faster than reading
+    strings that have been stored one by one. Those not in dataset_utils.CATEGORICAL_COLUMNS are
+    converted back to object columns.
+    """
+    if columns is not None:
+        requested = {str(column) for column in columns}
+        available = fastparquet.ParquetFile(str(path)).columns
+        columns = [column for column in available if column in requested]
+    df = pd.read_parquet(path, engine="fastparquet", columns=columns)
+    categorical_columns = [
+        column
+        for column, dtype in df.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+        and column not in dataset_utils.CATEGORICAL_COLUMNS
+    ]
+    return df.astype({column: object for column in categorical_columns})
+
+
+@final
+@dataclass(frozen=True)
+class SharedMultiRegionDataset:
+    """A MultiRegionTimeseriesDataset saved in a directory of memory-mapped arrays.
+
+    The rows of `data` are stored sorted by location_id and date, with an index of the rows of
+    each location, so a region is a contiguous slice of each file. Instances are pickled as
+    their directory, letting worker processes open the same files read-only and read only the
+    pages of the regions they process instead of each getting a copy of every region.
+
+    Numeric columns are read back as float64 and other columns, except date, as categoricals.
+    """
+
+    directory: pathlib.Path
+
+    # Sorted location_id of every location in `data` or `latest_data`.
+    location_ids: np.ndarray
+    # The timeseries rows of location_ids[i] are at row_starts[i] : row_starts[i + 1].
+    row_starts: np.ndarray
+    # Names of the timeseries and latest columns and the categories of the non-numeric columns,
+    # see `_write_shared_table`.
+    columns: Dict[str, Any]
+    # Memory-mapped arrays, by file name without the ".npy" suffix.
+    arrays: Dict[str, np.ndarray]
+    # Name and categories of each non-numeric column of the "timeseries" and "latest" tables.
+    categories: Dict[str, List[Tuple[str, pd.Index]]]
+
+    INDEX_FILE = "columns.json"
+
+    @staticmethod
+    def write(
+        dataset: MultiRegionTimeseriesDataset, directory: pathlib.Path
+    ) -> "SharedMultiRegionDataset":
+        """Saves `dataset` to `directory`, which is created if needed, and opens it."""
+        directory.mkdir(parents=True, exist_ok=True)
+        location_index = dataset._location_index()
+        data = dataset.data
+        if location_index.row_order is not None:
+            data = data.iloc[location_index.row_order]
+        latest_data = dataset.latest_data.reindex(location_index.location_ids)
+
+        _save_array(directory, "location_ids", location_index.location_ids.astype(str))
+        _save_array(directory, "row_starts", location_index.row_starts.astype(np.int64))
+        _save_array(directory, "latest_present", location_index.latest_positions >= 0)
+        _save_array(directory, "dates", data[CommonFields.DATE].to_numpy(dtype="datetime64[ns]"))
+        columns = {
+            "timeseries": _write_shared_table(
+                directory, "timeseries", data.drop(columns=[CommonFields.DATE])
+            ),
+            "latest": _write_shared_table(directory, "latest", latest_data),
+        }
+        columns["timeseries"]["columns"] = [str(column) for column in data.columns]
+        (directory / SharedMultiRegionDataset.INDEX_FILE).write_text(json.dumps(columns))
+        return SharedMultiRegionDataset.open(directory)
+
+    @staticmethod
+    def open(directory: pathlib.Path) -> "SharedMultiRegionDataset":
+        """Opens a dataset saved by `write`. Only the small index files are read."""
+        arrays = {
+            path.stem: np.load(path, mmap_mode="r", allow_pickle=False)
+            for path in directory.glob("*.npy")
+        }
+        columns = json.loads((directory / SharedMultiRegionDataset.INDEX_FILE).read_text())
+        categories = {
+            table: [
+                (column, pd.Index(column_categories, dtype=object))
+                for column, column_categories in columns[table]["categories"]
+            ]
+            for table in ["timeseries", "latest"]
+        }
+        return SharedMultiRegionDataset(
+            directory=directory,
+            location_ids=arrays["location_ids"],
+            row_starts=arrays["row_starts"],
+            columns=columns,
+            arrays=arrays,
+            categories=categories,
+        )
+
+    def __reduce__(self):
+        # Re-open the files in the unpickling process instead of copying their contents.
+        return SharedMultiRegionDataset.open, (self.directory,)
+
+    def iter_regions(self) -> Iterable[Region]:
+        """Iterates through the regions with timeseries rows, in location_id order."""
+        for i in np.flatnonzero(np.diff(self.row_starts)):
+            yield Region(location_id=str(self.location_ids[i]), fips=None)
+
+    def get_one_region(self, region: Region) -> OneRegionTimeseriesDataset:
+        i = int(np.searchsorted(self.location_ids, region.location_id))
+        if i == len(self.location_ids) or self.location_ids[i] != region.location_id:
+            raise RegionLatestNotFound(region)
+        rows = slice(self.row_starts[i], self.row_starts[i + 1])
+        ts_columns = self._read_columns("timeseries", rows)
+        ts_columns[CommonFields.DATE] = self.arrays["dates"][rows]
+        ts_df = pd.DataFrame(ts_columns, columns=self.columns["timeseries"]["columns"])
+        if self.arrays["latest_present"][i]:
+            latest_columns = self._read_columns("latest", slice(i, i + 1))
+            latest_dict = {
+                column: None if pd.isna(latest_columns[column][0]) else latest_columns[column][0]
+                for column in self.columns["latest"]["columns"]
+            }
+        else:
+            latest_dict = {}
+        if ts_df.empty and not latest_dict:
+            raise RegionLatestNotFound(region)
+        return OneRegionTimeseriesDataset(data=ts_df, latest=latest_dict)
+
+    def _read_columns(self, table: str, rows: slice) -> Dict[str, np.ndarray]:
+        """Returns `rows` of each column of a table saved by `_write_shared_table`.
+
+        Like `MultiRegionTimeseriesDataset`, only the dataset_utils.CATEGORICAL_COLUMNS are
+        categoricals. Other columns saved as codes are returned as object arrays.
+        """
+        values = self.arrays[f"{table}_values"][rows]
+        columns = {column: values[:, j] for j, column in enumerate(self.columns[table]["values"])}
+        codes = self.arrays[f"{table}_codes"][rows]
+        for j, (column, categories) in enumerate(self.categories[table]):
+            categorical = pd.Categorical.from_codes(codes[:, j], categories)
+            if column not in dataset_utils.CATEGORICAL_COLUMNS:
+                categorical = np.asarray(categorical, dtype=object)
+            columns[column] = categorical
+        return columns
+
+
+def _save_array(directory: pathlib.Path, name: str, array: np.ndarray):
+    np.save(directory / f"{name}.npy", array, allow_pickle=False)
+
+
+def _write_shared_table(directory: pathlib.Path, table: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """Saves the columns of df in two 2D arrays, one row per row of df.
+
+    Numeric columns are saved as float64 in "<table>_values.npy". Other columns are saved as
+    categorical codes in "<table>_codes.npy", -1 for missing values. Returns the column names and
+    categories.
+    """
+    value_columns = [
+        column
+        for column, dtype in df.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    ]
+    category_columns = [column for column in df.columns if column not in value_columns]
+    _save_array(directory, f"{table}_values", df[value_columns].to_numpy(dtype=float))
+    codes = np.empty((len(df), len(category_columns)), dtype=np.int32)
+    categories = []
+    for j, column in enumerate(category_columns):
+        values = df[column].astype("category")
+        codes[:, j] = values.cat.codes
+        categories.append([str(column), values.cat.categories.tolist()])
+    _save_array(directory, f"{table}_codes", codes)
+    return {
+        "columns": [str(column) for column in df.columns],
+        "values": [str(column) for column in value_columns],
+        "categories": categories,
+    }
+
+
+def _last_valid_values(
+    df: pd.DataFrame, row_order: Optional[np.ndarray], group_starts: np.ndarray
+) -> pd.DataFrame:
+    """Returns the last real value of each column of df in each group of rows.
+
+    Group i is made of the rows at positions row_order[group_starts[i] : group_starts[i + 1]] of
+    df, or group_starts[i] : group_starts[i + 1] when row_order is None. The result has a row for
+    each group, with NaN when a group has no real value in a column. Each column is scanned once
+    without making a forward filled copy of df.
+    """
+    starts, ends = group_starts[:-1], group_starts[1:]
+    positions = np.arange(len(df))
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_extension_array_dtype(series.dtype):
+            values = series.array
+        else:
+            values = series.to_numpy()
+        if row_order is not None:
+            values = values.take(row_order)
+        # Position of the last real value at or before each row.
+        last_valid = np.maximum.accumulate(np.where(pd.notna(values), positions, -1))
+        group_last_valid = np.full(len(starts), -1)
+        non_empty = ends > starts
+        group_last_valid[non_empty] = last_valid[ends[non_empty] - 1]
+        group_last_valid[group_last_valid < starts] = -1
+        columns[column] = pd.api.extensions.take(values, group_last_valid, allow_fill=True)
+    return pd.DataFrame(columns, columns=df.columns)
 
 
 def _remove_padded_nans(df, columns):
@@ -676,7 +1249,5 @@ def add_new_cases(mrts: MultiRegionTimeseriesDataset) -> MultiRegionTimeseriesDa
     df_copy = mrts.data.copy()
     grouped_df = mrts.groupby_region()
     df_copy[CommonFields.NEW_CASES] = grouped_df[CommonFields.CASES].diff(1)
-    new_mrts = MultiRegionTimeseriesDataset.from_timeseries_df(
-        timeseries_df=df_copy, provenance=mrts.provenance
-    ).append_latest_df(mrts.latest_data.reset_index())
-    return new_mrts
+    # The locations are unchanged so latest_data is kept as is instead of being indexed again.
+    return MultiRegionTimeseriesDataset(df_copy, mrts.latest_data, provenance=mrts.provenance)
@@ -5,6 +5,7 @@ represents a geographical area (state, county, metro area, etc).
 
 # Many other modules import this module. Importing pyseir or dataset code here is likely to create
 # in import cycle.
+import functools
 import re
 import warnings
 from dataclasses import dataclass
@@ -20,17 +21,29 @@ class BadFipsWarning(UserWarning):
 
 def fips_to_location_id(fips: str) -> str:
     """Converts a FIPS code to a location_id"""
+    location_id = _state_fips_to_location_id(fips)
+    if location_id:
+        return location_id
+
+    warnings.warn(BadFipsWarning(f"Fallback location_id for fips {fips}"), stacklevel=2)
+    return f"iso1:us#fips:{fips}"
+
+
+# The conversions are called for every region of every dataset that is loaded but there are only a
+# few thousand distinct codes, so the results are cached for the life of the process.
+@functools.lru_cache(maxsize=None)
+def _state_fips_to_location_id(fips: str) -> Optional[str]:
+    """Returns the location_id of a state or county FIPS code or None if the state is not found."""
     state_obj = us.states.lookup(fips[0:2], field="fips")
     if state_obj:
         if len(fips) == 2:
             return f"iso1:us#iso2:us-{state_obj.abbr.lower()}"
         elif len(fips) == 5:
             return f"iso1:us#iso2:us-{state_obj.abbr.lower()}#fips:{fips}"
-
-    warnings.warn(BadFipsWarning(f"Fallback location_id for fips {fips}"), stacklevel=2)
-    return f"iso1:us#fips:{fips}"
+    return None
 
 
+@functools.lru_cache(maxsize=None)
 def location_id_to_fips(location_id: str) -> Optional[str]:
     """Converts a location_id to a FIPS code"""
     match = re.fullmatch(r"iso1:us#.*fips:(\d+)", location_id)
@@ -65,7 +78,10 @@ class Region:
     # The FIPS identifier for the region, either 2 digits for a state or 5 digits for a county.
     fips: Optional[str]
 
+    # Region objects are immutable so `from_fips` and `from_cbsa_code` return the same object for
+    # every call with a code, making repeated lookups a dict access.
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def from_fips(fips: str) -> "Region":
         return Region(location_id=fips_to_location_id(fips), fips=fips)
 
@@ -77,6 +93,7 @@ class Region:
         return Region.from_fips(fips)
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def from_cbsa_code(cbsa_code: str) -> "Region":
         return Region(location_id=cbsa_to_location_id(cbsa_code), fips=None)
 
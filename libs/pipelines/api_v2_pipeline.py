@@ -21,6 +21,7 @@ from libs import pipeline
 from libs.datasets import timeseries
 from libs.datasets.timeseries import OneRegionTimeseriesDataset
 from libs.datasets.timeseries import MultiRegionTimeseriesDataset
+from libs.datasets.timeseries import SharedMultiRegionDataset
 from libs.enums import Intervention
 from libs.functions import build_api_v2
 from libs.datasets import AggregationLevel
@@ -35,22 +36,31 @@ INTERVENTION = Intervention.OBSERVED_INTERVENTION
 class RegionalInput:
     region: pipeline.Region
 
-    _combined_data: OneRegionTimeseriesDataset
+    _combined_data: Optional[OneRegionTimeseriesDataset]
 
     rt_data: Optional[OneRegionTimeseriesDataset]
 
     icu_data: Optional[OneRegionTimeseriesDataset]
 
+    # When set `_combined_data` is sliced from it the first time it is needed, by the worker
+    # process running the region instead of the process building the inputs.
+    _shared_combined_data: Optional[SharedMultiRegionDataset] = None
+
     @property
     def fips(self) -> str:
         return self.region.fips
 
     @property
     def latest(self) -> Dict[str, Any]:
-        return self._combined_data.latest
+        return self.timeseries.latest
 
     @property
     def timeseries(self) -> OneRegionTimeseriesDataset:
+        if self._combined_data is None:
+            # The dataclass is frozen, but this only loads the data the input refers to.
+            object.__setattr__(
+                self, "_combined_data", self._shared_combined_data.get_one_region(self.region),
+            )
         return self._combined_data
 
     @staticmethod
@@ -88,6 +98,23 @@ class RegionalInput:
             region=region, _combined_data=regional_data, rt_data=rt_data, icu_data=icu_data,
         )
 
+    @staticmethod
+    def from_shared_dataset(
+        region: pipeline.Region,
+        combined_data: SharedMultiRegionDataset,
+        rt_data: Optional[OneRegionTimeseriesDataset],
+        icu_data: Optional[OneRegionTimeseriesDataset],
+    ) -> "RegionalInput":
+        """Makes an input which is cheap to pass to a worker process; the worker reads the data of
+        `region` from the memory-mapped files of `combined_data`."""
+        return RegionalInput(
+            region=region,
+            _combined_data=None,
+            rt_data=rt_data,
+            icu_data=icu_data,
+            _shared_combined_data=combined_data,
+        )
+
 
 def run_on_regions(
     regional_inputs: List[RegionalInput],
@@ -4,6 +4,7 @@ without creating an import loop.
 """
 
 
+import numpy as np
 import pandas as pd
 
 
@@ -43,3 +44,50 @@ def generate_field_summary(series: pd.Series) -> pd.Series:
         "largest_delta_date": largest_delta_date,
     }
     return pd.Series(results)
+
+
+def generate_field_summaries(wide_df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the summary of `generate_field_summary` for every row of wide_df in one pass.
+
+    Args:
+        wide_df: DataFrame with a row for each timeseries and a column for each date, in order.
+
+    Returns:
+        DataFrame with the index of wide_df and a column for each summary field. Rows without any
+        value have NaN or NaT in place of None.
+    """
+    values = wide_df.to_numpy(dtype=float)
+    # A leading column of NaN so that rows without a value and frames without a date column
+    # have a position to point at. Positions in `padded` are one more than in `values`.
+    padded = np.hstack([np.full((len(values), 1), np.nan), values])
+    has_values = ~np.isnan(padded)
+    has_value = has_values.any(axis=1)
+    first_positions = has_values.argmax(axis=1)
+    last_positions = padded.shape[1] - 1 - has_values[:, ::-1].argmax(axis=1)
+    rows = np.arange(len(padded))
+
+    deltas = np.abs(np.diff(padded, axis=1, prepend=np.nan))
+    largest_delta = np.fmax.reduce(deltas, axis=1, initial=np.nan)
+    # Like idxmax, the position of the first of equal largest deltas.
+    largest_delta_positions = np.where(np.isnan(deltas), -np.inf, deltas).argmax(axis=1)
+    has_delta = ~np.isnan(largest_delta)
+
+    def take_dates(positions, mask):
+        return pd.api.extensions.take(
+            wide_df.columns.array, np.where(mask, positions - 1, -1), allow_fill=True
+        )
+
+    return pd.DataFrame(
+        {
+            "has_value": has_value,
+            "min_date": take_dates(first_positions, has_value),
+            "max_date": take_dates(last_positions, has_value),
+            "max_value": np.fmax.reduce(padded, axis=1, initial=np.nan),
+            "min_value": np.fmin.reduce(padded, axis=1, initial=np.nan),
+            "latest_value": padded[rows, last_positions],
+            "num_observations": has_values.sum(axis=1),
+            "largest_delta": largest_delta,
+            "largest_delta_date": take_dates(largest_delta_positions, has_delta),
+        },
+        index=wide_df.index,
+    )
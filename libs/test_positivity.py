@@ -4,6 +4,7 @@ from itertools import chain
 from typing import Sequence
 import structlog
 
+import numpy as np
 import pandas as pd
 
 from covidactnow.datapublic.common_fields import CommonFields, FieldName
@@ -88,18 +89,19 @@ class AllMethods:
         if missing_columns:
             raise AssertionError(f"Data missing for test positivity: {missing_columns}")
 
-        input_long = metrics_in.timeseries_long(ts_value_cols).set_index(
-            [PdFields.VARIABLE, CommonFields.LOCATION_ID, CommonFields.DATE]
-        )[PdFields.VALUE]
-        dates = input_long.index.get_level_values(CommonFields.DATE)
-        start_date = dates.min()
-        end_date = dates.max()
+        input_array = metrics_in.timeseries_array(ts_value_cols, dtype=float)
+        dates_with_values = input_array.dates[~np.isnan(input_array.values).all(axis=(0, 2))]
+        start_date = dates_with_values.min()
+        end_date = dates_with_values.max()
         input_date_range = pd.date_range(start=start_date, end=end_date)
         recent_date_range = pd.date_range(end=end_date, periods=recent_days).intersection(
             input_date_range
         )
         input_wide = (
-            input_long.unstack(CommonFields.DATE)
+            pd.concat(
+                {field: input_array.field(field) for field in ts_value_cols},
+                names=[PdFields.VARIABLE],
+            )
             .reindex(columns=input_date_range)
             .rename_axis(columns=CommonFields.DATE)
         )
@@ -127,7 +129,7 @@ class AllMethods:
         all_recent_data[PdFields.VARIABLE] = all_recent_data[PdFields.VARIABLE].astype(
             method_cat_type
         )
-        first = all_recent_data.groupby(CommonFields.LOCATION_ID).first()
+        first = all_recent_data.groupby(CommonFields.LOCATION_ID, observed=True).first()
         provenance = first[PdFields.VARIABLE].astype(str).rename(PdFields.PROVENANCE)
         provenance.index = pd.MultiIndex.from_product(
             [provenance.index, [CommonFields.TEST_POSITIVITY]],
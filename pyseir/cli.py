@@ -1,5 +1,7 @@
-from typing import Mapping, Optional, List, Union
+from typing import Dict, Mapping, Optional, List, Union
 import dataclasses
+import functools
+import math
 import pathlib
 import sys
 import os
@@ -22,7 +24,10 @@ from libs.datasets.timeseries import MultiRegionTimeseriesDataset
 from libs.datasets.timeseries import OneRegionTimeseriesDataset
 from pyseir.deployment import webui_data_adaptor_v1
 from pyseir.inference import whitelist
+from pyseir.rt import checkpoint as rt_checkpoint
 from pyseir.rt import infer_rt
+from pyseir.rt import plotting as rt_plotting
+from pyseir.rt import result_cache as rt_result_cache
 from pyseir.icu import infer_icu
 import pyseir.rt.patches
 from pyseir.ensembles import ensemble_runner
@@ -30,6 +35,7 @@ from pyseir.inference import model_fitter
 from pyseir.deployment.webui_data_adaptor_v1 import WebUIDataAdaptorV1
 import pyseir.utils
 from pyseir.inference.whitelist import WhitelistGenerator
+from pyseir.rt.constants import InferRtConstants
 from pyseir.rt.utils import NEW_ORLEANS_FIPS
 
 sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(__file__)), ".."))
@@ -83,9 +89,9 @@ class StatePipeline:
     ensemble: ensemble_runner.EnsembleRunner
 
     @staticmethod
-    def run(region: pipeline.Region) -> "StatePipeline":
+    def run(region: pipeline.Region, infer_df: pd.DataFrame) -> "StatePipeline":
+        """Runs the pipeline steps after Rt inference, which runs in batches, see _run_infer_rt."""
         assert region.is_state()
-        infer_df = infer_rt.run_rt(infer_rt.RegionalInput.from_region(region))
 
         # Run ICU adjustment
         icu_input = infer_icu.RegionalInput.from_regional_data(
@@ -168,12 +174,11 @@ class SubStatePipeline:
     ensemble: Optional[ensemble_runner.EnsembleRunner] = None
 
     @staticmethod
-    def run(input: SubStateRegionPipelineInput) -> "SubStatePipeline":
+    def run(input: SubStateRegionPipelineInput, infer_df: pd.DataFrame) -> "SubStatePipeline":
+        """Runs the pipeline steps after Rt inference, which runs in batches, see _run_infer_rt."""
         assert not input.region.is_state()
         # `infer_df` does not have the NEW_ORLEANS patch applied. TODO(tom): Rename to something like
         # infection_rate.
-        infer_rt_input = infer_rt.RegionalInput.from_region(input.region)
-        infer_df = infer_rt.run_rt(infer_rt_input)
 
         # Run ICU adjustment
         icu_input = infer_icu.RegionalInput.from_regional_data(input.regional_combined_dataset)
@@ -294,16 +299,70 @@ def _write_pipeline_output(
             p.map(web_ui_mapper.write_region_safely, webui_inputs)
 
 
+def _run_rt_batch(
+    regions: List[pipeline.Region],
+    rt_plot_mode: rt_plotting.PlotMode,
+    rt_checkpoint_store: Optional[rt_checkpoint.RtCheckpointStore],
+    rt_cache: Optional[rt_result_cache.RtResultCache],
+) -> Dict[pipeline.Region, pd.DataFrame]:
+    return infer_rt.run_rt_batch(
+        combined_datasets.load_us_timeseries_dataset(),
+        regions,
+        plot_mode=rt_plot_mode,
+        checkpoint_store=rt_checkpoint_store,
+        cache=rt_cache,
+    )
+
+
+def _run_infer_rt(
+    pool,
+    regions: List[pipeline.Region],
+    rt_plot_mode: rt_plotting.PlotMode = rt_plotting.PlotMode.IMMEDIATE,
+    rt_checkpoint_store: Optional[rt_checkpoint.RtCheckpointStore] = None,
+    rt_cache: Optional[rt_result_cache.RtResultCache] = None,
+    batch_size: int = InferRtConstants.BATCH_SIZE,
+) -> Dict[pipeline.Region, pd.DataFrame]:
+    """Infers Rt of regions with infer_rt.run_rt_batch, mapping batches of regions over pool.
+
+    Batches have at most batch_size regions and are made smaller when needed to give every process
+    of the pool a batch.
+    """
+    batch_size = max(1, min(batch_size, math.ceil(len(regions) / (os.cpu_count() or 1))))
+    batches = [regions[i : i + batch_size] for i in range(0, len(regions), batch_size)]
+    batch_results = pool.map(
+        functools.partial(
+            _run_rt_batch,
+            rt_plot_mode=rt_plot_mode,
+            rt_checkpoint_store=rt_checkpoint_store,
+            rt_cache=rt_cache,
+        ),
+        batches,
+    )
+    return {region: df for results in batch_results for region, df in results.items()}
+
+
 def _build_all_for_states(
-    states: List[str], states_only=False, fips: Optional[str] = None,
+    states: List[str],
+    states_only=False,
+    fips: Optional[str] = None,
+    rt_plot_mode: rt_plotting.PlotMode = rt_plotting.PlotMode.IMMEDIATE,
+    rt_checkpoint_store: Optional[rt_checkpoint.RtCheckpointStore] = None,
+    rt_cache: Optional[rt_result_cache.RtResultCache] = None,
 ) -> List[Union[StatePipeline, SubStatePipeline]]:
     # prepare data
     _cache_global_datasets()
 
+    rt_options = dict(
+        rt_plot_mode=rt_plot_mode, rt_checkpoint_store=rt_checkpoint_store, rt_cache=rt_cache
+    )
+
     # do everything for just states in parallel
     with Pool(maxtasksperchild=1) as pool:
         states_regions = [pipeline.Region.from_state(s) for s in states]
-        state_pipelines: List[StatePipeline] = pool.map(StatePipeline.run, states_regions)
+        state_infer_dfs = _run_infer_rt(pool, states_regions, **rt_options)
+        state_pipelines: List[StatePipeline] = pool.starmap(
+            StatePipeline.run, [(region, state_infer_dfs[region]) for region in states_regions],
+        )
         state_fitter_map = {p.region: p.fitter for p in state_pipelines}
 
     if states_only:
@@ -316,13 +375,33 @@ def _build_all_for_states(
     with Pool(maxtasksperchild=1) as p:
         root.info(f"executing pipeline for {len(substate_inputs)} counties")
 
-        substate_pipelines = p.map(SubStatePipeline.run, substate_inputs)
+        substate_infer_dfs = _run_infer_rt(
+            p, [input.region for input in substate_inputs], **rt_options
+        )
+        substate_pipelines = p.starmap(
+            SubStatePipeline.run,
+            [(input, substate_infer_dfs[input.region]) for input in substate_inputs],
+        )
 
     substate_pipelines = _patch_substatepipeline_nola_infection_rate(substate_pipelines)
 
     return state_pipelines + substate_pipelines
 
 
+def _rt_checkpoint_store(
+    directory: Optional[pathlib.Path],
+) -> Optional[rt_checkpoint.RtCheckpointStore]:
+    if directory is None:
+        return None
+    return rt_checkpoint.RtCheckpointStore(directory)
+
+
+def _rt_result_cache(directory: Optional[pathlib.Path]) -> Optional[rt_result_cache.RtResultCache]:
+    if directory is None:
+        return None
+    return rt_result_cache.RtResultCache(directory)
+
+
 @entry_point.command()
 def generate_whitelist():
     _generate_whitelist()
@@ -340,9 +419,44 @@ def generate_whitelist():
     help="Warning: This flag is unused and the function always defaults to only state "
     "level regions",
 )
-def run_infer_rt(state, states_only):
-    for state in _states_region_list(state=state, default=ALL_STATES):
-        infer_rt.run_rt(infer_rt.RegionalInput.from_region(state))
+@click.option(
+    "--rt-plot-mode",
+    type=click.Choice([mode.value for mode in rt_plotting.PlotMode]),
+    default=rt_plotting.PlotMode.IMMEDIATE.value,
+    help="Render Rt reports while running, save their data for `render-rt-plots` or skip them.",
+)
+@click.option(
+    "--rt-checkpoint-dir",
+    type=pathlib.Path,
+    help="Directory of Rt filter checkpoints. When set, Rt inference resumes from the checkpoint "
+    "of each region saved by the previous run and only computes the days after it.",
+)
+@click.option(
+    "--rt-cache-dir",
+    type=pathlib.Path,
+    help="Directory of cached Rt results. When set, regions with the same Rt input and settings "
+    "as in a previous run reuse its result instead of running inference again.",
+)
+def run_infer_rt(state, states_only, rt_plot_mode, rt_checkpoint_dir, rt_cache_dir):
+    _run_rt_batch(
+        _states_region_list(state=state, default=ALL_STATES),
+        rt_plot_mode=rt_plotting.PlotMode(rt_plot_mode),
+        rt_checkpoint_store=_rt_checkpoint_store(rt_checkpoint_dir),
+        rt_cache=_rt_result_cache(rt_cache_dir),
+    )
+
+
+@entry_point.command()
+@click.option(
+    "--output-dir",
+    default=pyseir.OUTPUT_DIR,
+    type=pathlib.Path,
+    help="Directory searched for Rt reports saved with `--rt-plot-mode deferred`.",
+)
+def render_rt_plots(output_dir):
+    """Render the Rt reports deferred by a previous run."""
+    rendered = rt_plotting.render_deferred_plots(output_dir)
+    root.info(f"Rendered {rendered} Rt reports")
 
 
 @entry_point.command()
@@ -372,6 +486,24 @@ def run_infer_rt(state, states_only):
 @click.option("--states-only", is_flag=True, help="If set, only runs on states.")
 @click.option("--output-dir", default="output/", type=str, help="Directory to deploy webui output.")
 @click.option("--webui-output-enabled", is_flag=True, help="If true, writes web ui output.")
+@click.option(
+    "--rt-plot-mode",
+    type=click.Choice([mode.value for mode in rt_plotting.PlotMode]),
+    default=rt_plotting.PlotMode.IMMEDIATE.value,
+    help="Render Rt reports while running, save their data for `render-rt-plots` or skip them.",
+)
+@click.option(
+    "--rt-checkpoint-dir",
+    type=pathlib.Path,
+    help="Directory of Rt filter checkpoints. When set, Rt inference resumes from the checkpoint "
+    "of each region saved by the previous run and only computes the days after it.",
+)
+@click.option(
+    "--rt-cache-dir",
+    type=pathlib.Path,
+    help="Directory of cached Rt results. When set, regions with the same Rt input and settings "
+    "as in a previous run reuse its result instead of running inference again.",
+)
 def build_all(
     states,
     output_interval_days,
@@ -380,6 +512,9 @@ def build_all(
     states_only,
     fips,
     webui_output_enabled,
+    rt_plot_mode,
+    rt_checkpoint_dir,
+    rt_cache_dir,
 ):
     # split columns by ',' and remove whitespace
     states = [c.strip() for c in states]
@@ -388,7 +523,14 @@ def build_all(
     if not len(states):
         states = ALL_STATES
 
-    pipelines = _build_all_for_states(states, states_only=states_only, fips=fips,)
+    pipelines = _build_all_for_states(
+        states,
+        states_only=states_only,
+        fips=fips,
+        rt_plot_mode=rt_plotting.PlotMode(rt_plot_mode),
+        rt_checkpoint_store=_rt_checkpoint_store(rt_checkpoint_dir),
+        rt_cache=_rt_result_cache(rt_cache_dir),
+    )
     _write_pipeline_output(
         pipelines,
         output_dir,
@@ -0,0 +1,249 @@
+"""
+Forward Bayesian filter used to infer R_t, vectorized over any number of timeseries.
+
+Timeseries are rows of a (regions x days) array of counts. Each row may start and end on a
+different column; days outside of a row's series are NaN. The filter runs over a
+(regions x R_BUCKETS x days) posterior tensor, grouping the regions that share a (quantized)
+process sigma on each day so that a process matrix is applied to all of them at once.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from scipy import stats as sps
+
+from pyseir.rt import utils
+from pyseir.rt.constants import InferRtConstants
+from pyseir.rt.process_matrix import PriorUpdateMethod
+from pyseir.rt.process_matrix import ProcessMatrixProvider
+
+
+@dataclass(frozen=True)
+class FilterResult:
+    """Posteriors and per-day diagnostics for a set of timeseries."""
+
+    # Posteriors of shape (regions, len(r_buckets), days). NaN on days outside a series.
+    posteriors: np.ndarray
+    # Exponential moving average of the counts, used to scale sigma, of shape (regions, days).
+    scales: np.ndarray
+    # Per-day values of shape (regions, days - 1). Entry i describes the update of day i + 1.
+    # The log of the probability of the data, NaN on days outside a series.
+    daily_log_likelihoods: np.ndarray
+    # Used to monitor lag of the posterior.
+    sigmas: np.ndarray
+    prior_argmaxes: np.ndarray
+    likelihood_argmaxes: np.ndarray
+    numerator_argmaxes: np.ndarray
+
+    @property
+    def log_likelihoods(self) -> np.ndarray:
+        """Sum of the log of the probability of the data of shape (regions,)."""
+        return np.nansum(self.daily_log_likelihoods, axis=1)
+
+    def for_row(self, row: int, num_days: int) -> "FilterResult":
+        """Returns the result of one row, trimmed to the first num_days days."""
+        return FilterResult(
+            posteriors=self.posteriors[row : row + 1, :, :num_days],
+            scales=self.scales[row : row + 1, :num_days],
+            daily_log_likelihoods=self.daily_log_likelihoods[row : row + 1, : num_days - 1],
+            sigmas=self.sigmas[row : row + 1, : num_days - 1],
+            prior_argmaxes=self.prior_argmaxes[row : row + 1, : num_days - 1],
+            likelihood_argmaxes=self.likelihood_argmaxes[row : row + 1, : num_days - 1],
+            numerator_argmaxes=self.numerator_argmaxes[row : row + 1, : num_days - 1],
+        )
+
+
+@dataclass(frozen=True)
+class PosteriorSummary:
+    """Indices into r_buckets of the MAP and credible interval bounds of each day's posterior."""
+
+    # Of shape (days,)
+    map_indices: np.ndarray
+    # Of shape (len(confidence_intervals), days)
+    ci_low_indices: np.ndarray
+    ci_high_indices: np.ndarray
+
+    def __len__(self):
+        return len(self.map_indices)
+
+    def head(self, num_days: int) -> "PosteriorSummary":
+        return PosteriorSummary(
+            map_indices=self.map_indices[:num_days],
+            ci_low_indices=self.ci_low_indices[:, :num_days],
+            ci_high_indices=self.ci_high_indices[:, :num_days],
+        )
+
+    def append(self, other: "PosteriorSummary") -> "PosteriorSummary":
+        return PosteriorSummary(
+            map_indices=np.concatenate([self.map_indices, other.map_indices]),
+            ci_low_indices=np.concatenate([self.ci_low_indices, other.ci_low_indices], axis=1),
+            ci_high_indices=np.concatenate([self.ci_high_indices, other.ci_high_indices], axis=1),
+        )
+
+
+def summarize_posteriors(posteriors: np.ndarray, confidence_intervals) -> PosteriorSummary:
+    """Finds the MAP and credible interval bounds of posteriors with one column per day.
+
+    The bounds of confidence interval ci are where the cumulative posterior is closest to 1 - ci
+    and ci.
+    """
+    posterior_cdfs = posteriors.cumsum(axis=0)
+    return PosteriorSummary(
+        map_indices=posteriors.argmax(axis=0),
+        ci_low_indices=np.array(
+            [utils.nearest_cdf_index(posterior_cdfs, 1 - ci) for ci in confidence_intervals]
+        ).reshape(len(confidence_intervals), -1),
+        ci_high_indices=np.array(
+            [utils.nearest_cdf_index(posterior_cdfs, ci) for ci in confidence_intervals]
+        ).reshape(len(confidence_intervals), -1),
+    )
+
+
+def initial_priors(r_buckets: np.ndarray):
+    """Returns the prior of the first day and the prior used to restart the filter.
+
+    Gamma mean of "a" with mode of "a-1".
+    """
+    prior0 = sps.gamma(a=2.5).pdf(r_buckets)
+    prior0 /= prior0.sum()
+
+    reinit_prior = sps.gamma(a=2).pdf(r_buckets)
+    reinit_prior /= reinit_prior.sum()
+    return prior0, reinit_prior
+
+
+def _series_bounds(counts: np.ndarray):
+    """Returns the first and last valid column of each row, raising if a row has gaps."""
+    valid = np.isfinite(counts)
+    has_data = valid.any(axis=1)
+    first = np.where(has_data, valid.argmax(axis=1), 0)
+    last = np.where(has_data, counts.shape[1] - 1 - valid[:, ::-1].argmax(axis=1), -1)
+    columns = np.arange(counts.shape[1])
+    in_series = (columns >= first[:, None]) & (columns <= last[:, None])
+    if (in_series & ~valid).any():
+        raise ValueError("Cannot calculate likelihoods of non-finite counts")
+    return first, last
+
+
+def forward_filter(
+    counts: np.ndarray,
+    process_matrix_provider: ProcessMatrixProvider,
+    r_buckets: np.ndarray = InferRtConstants.R_BUCKETS,
+    serial_period: float = InferRtConstants.SERIAL_PERIOD,
+    prior_update: PriorUpdateMethod = PriorUpdateMethod.DENSE,
+    initial_posteriors: Optional[np.ndarray] = None,
+    initial_scales: Optional[np.ndarray] = None,
+) -> FilterResult:
+    """Iteratively applies Bayes' rule to each row of counts.
+
+    Parameters
+    ----------
+    counts: np.array
+        Smoothed daily counts of shape (regions, days). Each row must be contiguous: NaN is only
+        allowed before the first and after the last value of a row.
+    process_matrix_provider: ProcessMatrixProvider
+        Source of the (now scaled up for low counts) Gaussian process matrices.
+    r_buckets: np.array
+        R values of the posterior.
+    serial_period: float
+        Serial period used to convert R to a daily growth rate.
+    prior_update: PriorUpdateMethod
+        How the process matrix is applied to the previous posterior.
+    initial_posteriors: np.array
+        Optional posterior of the first day of each row, of shape (regions, len(r_buckets)).
+        Used to resume the filter from a previous run. Defaults to the initial prior.
+    initial_scales: np.array
+        Optional count scale of the first day of each row, used with initial_posteriors.
+        Defaults to the first count of each row.
+
+    Returns
+    -------
+    result: FilterResult
+    """
+    counts = np.atleast_2d(np.asarray(counts, dtype=float))
+    num_regions, num_days = counts.shape
+    num_buckets = len(r_buckets)
+    first, last = _series_bounds(counts)
+
+    prior0, reinit_prior = initial_priors(r_buckets)
+    growth = np.exp((r_buckets - 1) / serial_period)
+
+    posteriors = np.full((num_regions, num_buckets, num_days), np.nan)
+    scales_by_day = np.full((num_regions, num_days), np.nan)
+    daily_log_likelihoods = np.full((num_regions, max(num_days - 1, 0)), np.nan)
+    sigmas = np.full((num_regions, max(num_days - 1, 0)), np.nan)
+    prior_argmaxes = np.zeros((num_regions, max(num_days - 1, 0)), dtype=int)
+    likelihood_argmaxes = np.zeros_like(prior_argmaxes)
+    numerator_argmaxes = np.zeros_like(prior_argmaxes)
+
+    # The posterior of the previous day of every row, kept contiguous for the matrix products.
+    if initial_posteriors is None:
+        current = np.tile(prior0, (num_regions, 1))
+    else:
+        current = np.array(initial_posteriors, dtype=float)
+    # Initialize timeseries scale (used for auto sigma) with the first count of each row.
+    if initial_scales is None:
+        scales = counts[np.arange(num_regions), first]
+    else:
+        scales = np.array(initial_scales, dtype=float)
+
+    for day in range(num_days):
+        starting = np.flatnonzero(first == day)
+        posteriors[starting, :, day] = current[starting]
+        scales_by_day[starting, day] = scales[starting]
+
+        active = np.flatnonzero((first < day) & (day <= last))
+        if not len(active):
+            continue
+
+        # Keep track of exponential moving average of scale of counts of timeseries
+        scales[active] = 0.9 * scales[active] + 0.1 * counts[active, day]
+
+        # Calculate the new prior, applying each process matrix to all rows that share its sigma.
+        steps = process_matrix_provider.quantized_steps(scales[active])
+        current_priors = np.empty((len(active), num_buckets))
+        for step in np.unique(steps):
+            in_step = steps == step
+            current_priors[in_step] = process_matrix_provider.update_priors(
+                step, current[active[in_step]], prior_update
+            )
+            sigmas[active[in_step], day - 1] = process_matrix_provider.sigma_for_step(step)
+
+        # Calculate the Poisson likelihood of the observed increase from day - 1 to day.
+        lam = counts[active, day - 1, None] * growth
+        likelihoods = utils.interpolated_poisson_pmf(counts[active, day, None], lam)
+
+        # Calculate the numerator and denominator of Bayes' Rule: P(k|R_t)P(R_t) and P(k)
+        numerators = likelihoods * current_priors
+        denominators = numerators.sum(axis=1)
+
+        # Restart the bayesian learning for rows with a denominator of 0. This is necessary since
+        # otherwise NaN values will be inferred for all future days, after seeing a single
+        # (smoothed) zero value. Restarting the posteriors with the re-initial prior may incur a
+        # start-up artifact as the posterior restabilizes, but we believe it's the current best
+        # solution for municipalities that have smoothed cases and deaths that dip down to zero,
+        # but then start to increase again.
+        restart = denominators == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            updated = numerators / denominators[:, None]
+        updated[restart] = reinit_prior
+
+        current[active] = updated
+        posteriors[active, :, day] = updated
+        scales_by_day[active, day] = scales[active]
+        prior_argmaxes[active, day - 1] = current_priors.argmax(axis=1)
+        likelihood_argmaxes[active, day - 1] = likelihoods.argmax(axis=1)
+        numerator_argmaxes[active, day - 1] = numerators.argmax(axis=1)
+
+        # Keep track of the log of the probability of the data for maximum likelihood calculation.
+        daily_log_likelihoods[active, day - 1] = np.log(denominators)
+
+    return FilterResult(
+        posteriors=posteriors,
+        scales=scales_by_day,
+        daily_log_likelihoods=daily_log_likelihoods,
+        sigmas=sigmas,
+        prior_argmaxes=prior_argmaxes,
+        likelihood_argmaxes=likelihood_argmaxes,
+        numerator_argmaxes=numerator_argmaxes,
+    )
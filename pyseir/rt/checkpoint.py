@@ -0,0 +1,125 @@
+"""
+Checkpoints of the Rt Bayesian filter, used to resume inference when only recent data changed.
+
+The filter is a forward recursion: the posterior of a day only depends on the posterior and count
+scale of the previous day and on the counts of the two days. A checkpoint stores that state for
+day T - window of a previous run along with a fingerprint of the counts up to that day. When the
+counts up to the checkpoint are unchanged the filter restarts from it and only the days after it
+are recomputed, giving the same result as filtering the whole series.
+"""
+import hashlib
+import pathlib
+import urllib.parse
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pyseir.rt import utils
+from pyseir.rt.bayes_filter import PosteriorSummary
+from pyseir.utils import TimeseriesType
+
+
+def settings_fingerprint(settings: Sequence) -> str:
+    """Returns a digest of the filter settings."""
+    hasher = hashlib.sha256()
+    utils.update_hash_with_settings(hasher, settings)
+    return hasher.hexdigest()
+
+
+def input_fingerprint(first_date, counts: np.ndarray, settings: Sequence) -> str:
+    """Returns a digest of the counts, the date of the first count and the filter settings."""
+    hasher = hashlib.sha256()
+    hasher.update(str(first_date).encode())
+    utils.update_hash_with_settings(hasher, settings)
+    hasher.update(np.ascontiguousarray(counts, dtype=float).tobytes())
+    return hasher.hexdigest()
+
+
+@dataclass(frozen=True)
+class RtCheckpoint:
+    """State of the filter on day `day_index` of a timeseries."""
+
+    # input_fingerprint of the counts up to and including day_index.
+    fingerprint: str
+    day_index: int
+    # Posterior of day_index, of shape (len(r_buckets),).
+    posterior: np.ndarray
+    # Exponential moving average of the counts on day_index, used to scale sigma.
+    scale: float
+    # Sum of the log of the probability of the data up to day_index.
+    log_likelihood: float
+    # MAP and credible intervals of days 0 to day_index.
+    summary: PosteriorSummary
+
+    def matches(self, first_date, counts: np.ndarray, settings: Sequence) -> bool:
+        """Returns True if the filter can resume from this checkpoint for counts."""
+        return self.day_index < len(counts) and self.fingerprint == input_fingerprint(
+            first_date, counts[: self.day_index + 1], settings
+        )
+
+    def save(self, path: pathlib.Path):
+        # Write to a temporary file first so that an interrupted build never leaves a partial
+        # checkpoint behind.
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as f:
+            np.savez(
+                f,
+                fingerprint=self.fingerprint,
+                day_index=self.day_index,
+                posterior=self.posterior,
+                scale=self.scale,
+                log_likelihood=self.log_likelihood,
+                map_indices=self.summary.map_indices,
+                ci_low_indices=self.summary.ci_low_indices,
+                ci_high_indices=self.summary.ci_high_indices,
+            )
+        tmp_path.replace(path)
+
+    @staticmethod
+    def load(path: pathlib.Path) -> "RtCheckpoint":
+        with np.load(path, allow_pickle=False) as data:
+            return RtCheckpoint(
+                fingerprint=str(data["fingerprint"]),
+                day_index=int(data["day_index"]),
+                posterior=data["posterior"],
+                scale=float(data["scale"]),
+                log_likelihood=float(data["log_likelihood"]),
+                summary=PosteriorSummary(
+                    map_indices=data["map_indices"],
+                    ci_low_indices=data["ci_low_indices"],
+                    ci_high_indices=data["ci_high_indices"],
+                ),
+            )
+
+
+class RtCheckpointStore:
+    """Checkpoints keyed by location_id and timeseries type.
+
+    When created with a directory each checkpoint is also written to its own file so that the
+    store can be shared by the processes of a build and reused by the next build. Otherwise
+    checkpoints are only kept in memory.
+    """
+
+    def __init__(self, directory: Optional[pathlib.Path] = None):
+        self.directory = pathlib.Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._checkpoints: Dict[Tuple[str, TimeseriesType], RtCheckpoint] = {}
+
+    def _path(self, location_id: str, timeseries_type: TimeseriesType) -> pathlib.Path:
+        filename = urllib.parse.quote(location_id, safe="")
+        return self.directory / f"{filename}__{timeseries_type.value}.npz"
+
+    def get(self, location_id: str, timeseries_type: TimeseriesType) -> Optional[RtCheckpoint]:
+        key = (location_id, timeseries_type)
+        if key not in self._checkpoints and self.directory is not None:
+            path = self._path(location_id, timeseries_type)
+            if path.exists():
+                self._checkpoints[key] = RtCheckpoint.load(path)
+        return self._checkpoints.get(key)
+
+    def put(self, location_id: str, timeseries_type: TimeseriesType, checkpoint: RtCheckpoint):
+        self._checkpoints[(location_id, timeseries_type)] = checkpoint
+        if self.directory is not None:
+            checkpoint.save(self._path(location_id, timeseries_type))
@@ -9,6 +9,10 @@ class InferRtConstants:
     # Don't try to infer Rt for timeseries shorter than this
     MIN_TIMESERIES_LENGTH = 20
 
+    # Minimum total and maximum daily counts of a timeseries to infer Rt from it
+    MIN_CUMULATIVE_COUNTS = dict(cases=20, deaths=10)
+    MIN_INCIDENT_COUNTS = dict(cases=5, deaths=5)
+
     # Settings for outlier removal
     LOCAL_LOOKBACK_WINDOW = 14
     Z_THRESHOLD = 10
@@ -37,6 +41,24 @@ class InferRtConstants:
     # Recommend range 20. - 50. 30. appears to be best
     MAX_SCALING_OF_SIGMA = 30.0
 
+    # Relative step used to quantize the sigma scaling factor so that process matrices can be
+    # cached and shared across days and regions. 0.02 bounds the change in sigma to +/- 1%.
+    PROCESS_SIGMA_QUANTIZATION = 0.02
+
+    # Number of distinct process matrices kept in memory per process (~2MB each for 501 buckets).
+    # None keeps every matrix: the quantization above bounds them to
+    # log(MAX_SCALING_OF_SIGMA) / log(1 + PROCESS_SIGMA_QUANTIZATION) + 1 = 173, and batched
+    # inference touches many of them on every day.
+    PROCESS_MATRIX_CACHE_SIZE = None
+
+    # Entries of a process matrix at or below this value are ignored by the banded prior update,
+    # bounding the difference of each prior value from the dense matrix product.
+    BANDED_PROCESS_MATRIX_TOLERANCE = 1e-12
+
+    # Maximum number of regions whose posteriors are computed together by run_rt_batch. The
+    # posterior tensor takes about 1.2MB per region for 300 days of data.
+    BATCH_SIZE = 256
+
     # Override min_cases and min_deaths with this value.
     # Recommend 1. - 5. range.
     # 1. is allowing some counties to run that shouldn't (unphysical results)
@@ -73,3 +95,6 @@ class InferRtConstants:
 
     # The Possible Cross Correlation Shifts Allowed to Align Cases and Deaths
     XCOR_DAY_RANGE = range(-21, 5)
+    # Cross correlations of shifts within this fraction of the largest possible value of the best
+    # one are ties, see utils.align_time_series_batch.
+    XCOR_TIE_TOLERANCE = 1e-9
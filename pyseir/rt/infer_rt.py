@@ -2,12 +2,10 @@ import math
 from dataclasses import dataclass
 from datetime import timedelta
 import structlog
-from typing import Optional
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-from scipy import stats as sps
-from matplotlib import pyplot as plt
 
 from libs.datasets import combined_datasets
 from libs import pipeline
@@ -16,10 +14,14 @@ from pyseir import load_data
 from pyseir.utils import TimeseriesType, RunArtifact
 import pyseir.utils
 from pyseir.rt.constants import InferRtConstants
-from pyseir.rt import plotting, utils
+from pyseir.rt import bayes_filter, checkpoint, plotting, preprocessing, process_matrix
+from pyseir.rt import result_cache, utils
 
 rt_log = structlog.get_logger(__name__)
 
+# Column of the input data of each timeseries type that R_t is inferred from.
+SIGNAL_COLUMNS = {TimeseriesType.NEW_CASES: "cases", TimeseriesType.NEW_DEATHS: "deaths"}
+
 
 @dataclass(frozen=True)
 class RegionalInput:
@@ -51,10 +53,34 @@ def run_rt(
     include_deaths: bool = False,
     include_testing_correction: bool = False,
     figure_collector: Optional[list] = None,
+    prior_update: process_matrix.PriorUpdateMethod = process_matrix.PriorUpdateMethod.DENSE,
+    checkpoint_store: Optional[checkpoint.RtCheckpointStore] = None,
+    plot_mode: plotting.PlotMode = plotting.PlotMode.IMMEDIATE,
+    cache: Optional[result_cache.RtResultCache] = None,
+    joint_signals: bool = False,
 ) -> pd.DataFrame:
     """Entry Point for Infer Rt
 
     Returns an empty DataFrame if inference was not possible.
+
+    prior_update: PriorUpdateMethod
+        How the process matrix is applied to the posterior of each day, see
+        process_matrix.PriorUpdateMethod. DENSE by default; BANDED is a faster approximation that
+        differs from DENSE by at most BANDED_PROCESS_MATRIX_TOLERANCE per bucket and day.
+    checkpoint_store: RtCheckpointStore
+        Optional store of filter checkpoints. When the smoothed input of the region is unchanged
+        up to its checkpoint the filter resumes from it instead of starting from the first day,
+        then a new checkpoint is stored. See pyseir.rt.checkpoint.
+    plot_mode: PlotMode
+        How the smoothing and inference reports are produced. PlotMode.DEFERRED saves their data
+        to be rendered later by plotting.render_deferred_plots, PlotMode.DISABLED skips them.
+    cache: RtResultCache
+        Optional cache of results keyed by the filtered and smoothed input and the inference
+        settings. On a hit the stored result is returned without running the filter, and no
+        inference report is produced.
+    joint_signals: bool
+        If True, the posteriors of all timeseries types of the region are computed in one call of
+        the filter, sharing the R grid and the process matrices. Results are unchanged.
     """
 
     # Generate the Data Packet to Pass to RtInferenceEngine
@@ -63,6 +89,7 @@ def run_rt(
         include_testing_correction=include_testing_correction,
         include_deaths=include_deaths,
         figure_collector=figure_collector,
+        plot_mode=plot_mode,
     )
     if input_df.dropna().empty:
         rt_log.warning(
@@ -71,6 +98,13 @@ def run_rt(
         )
         return pd.DataFrame()
 
+    cache_key = None
+    if cache is not None:
+        cache_key = _result_cache_key(input_df, include_deaths, prior_update)
+        cached = _get_cached_result(cache, cache_key, regional_input)
+        if cached is not None:
+            return cached
+
     # Save a reference to instantiated engine (eventually I want to pull out the figure
     # generation and saving so that I don't have to pass a display_name and fips into the class
     engine = RtInferenceEngine(
@@ -78,26 +112,190 @@ def run_rt(
         display_name=regional_input.display_name,
         regional_input=regional_input,
         include_deaths=include_deaths,
+        prior_update=prior_update,
+        checkpoint_store=checkpoint_store,
+        plot_mode=plot_mode,
+        joint_signals=joint_signals,
     )
 
     # Generate the output DataFrame (consider renaming the function infer_all to be clearer)
     output_df = engine.infer_all()
+    if cache is not None:
+        cache.put(cache_key, output_df)
 
     return output_df
 
 
-def _generate_input_data(
-    regional_input: RegionalInput,
-    include_testing_correction: bool,
-    include_deaths: bool,
-    figure_collector: Optional[list],
-) -> pd.DataFrame:
+def _result_cache_key(
+    input_df: pd.DataFrame, include_deaths: bool, prior_update: process_matrix.PriorUpdateMethod
+) -> str:
+    settings = (
+        include_deaths,
+        process_matrix.PriorUpdateMethod(prior_update).value,
+    ) + process_matrix.get_default_provider().parameters()
+    return result_cache.input_digest(input_df, result_cache.inference_settings() + settings)
+
+
+def _get_cached_result(
+    cache: result_cache.RtResultCache, key: str, regional_input: RegionalInput
+) -> Optional[pd.DataFrame]:
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    rt_log.info(event="Using cached Rt result", region=regional_input.display_name)
+    if not cached.empty:
+        # Regions with identical inputs share a result.
+        cached["fips"] = regional_input.region.fips
+    return cached
+
+
+def run_rt_batch(
+    dataset: timeseries.MultiRegionTimeseriesDataset,
+    regions: Sequence[pipeline.Region],
+    include_deaths: bool = False,
+    include_testing_correction: bool = False,
+    batch_size: int = InferRtConstants.BATCH_SIZE,
+    prior_update: process_matrix.PriorUpdateMethod = process_matrix.PriorUpdateMethod.DENSE,
+    plot_mode: plotting.PlotMode = plotting.PlotMode.IMMEDIATE,
+    cache: Optional[result_cache.RtResultCache] = None,
+    joint_signals: bool = False,
+    checkpoint_store: Optional[checkpoint.RtCheckpointStore] = None,
+) -> Dict[pipeline.Region, pd.DataFrame]:
+    """Infer Rt for many regions, running the Bayesian filter for all of them at once.
+
+    Results are identical to calling `run_rt` for each region. The counts of all regions are
+    filtered and smoothed together, see filter_and_smooth_all_input_data, then the posteriors of
+    each timeseries type are computed for up to batch_size regions at a time as one
+    (regions x R_BUCKETS x days) tensor.
+
+    Args:
+        dataset: Timeseries of all the regions.
+        regions: Regions to infer Rt for.
+        include_deaths: Passed to `run_rt`.
+        include_testing_correction: Passed to `run_rt`.
+        batch_size: Maximum number of regions in each posterior tensor, bounding memory use.
+        prior_update: Passed to `run_rt`.
+        plot_mode: Passed to `run_rt`.
+        cache: Passed to `run_rt`. Regions with a cached result are left out of the batches.
+        joint_signals: If True, all timeseries types of a batch are filtered as one tensor instead
+            of one tensor per type.
+        checkpoint_store: Passed to `run_rt`. Checkpoints resume each series from its own day, so
+            when a store is given the posteriors of each region are computed separately.
+
+    Returns: A DataFrame for each region, empty if inference was not possible.
     """
-    Allow the RtInferenceEngine to be agnostic to aggregation level by handling the loading first
+    results = {}
+    loaded: List[Tuple[RegionalInput, pd.DataFrame]] = []
+    for region in regions:
+        regional_input = RegionalInput(
+            region=region,
+            _combined_data=combined_datasets.RegionalData(
+                region=region, timeseries=dataset.get_one_region(region)
+            ),
+        )
+        raw_df = _load_input_data(regional_input, include_testing_correction)
+        if raw_df.empty:
+            results[region] = raw_df
+        else:
+            loaded.append((regional_input, raw_df))
 
-    include_testing_correction: bool
-        If True, include a correction for testing increases and decreases.
+    # Outlier replacement, smoothing and filtering run once for all regions.
+    input_dfs = filter_and_smooth_all_input_data(
+        [raw_df for _, raw_df in loaded],
+        [regional_input.region for regional_input, _ in loaded],
+        include_deaths=include_deaths,
+        logs=[rt_log.new(region=regional_input.display_name) for regional_input, _ in loaded],
+        plot_mode=plot_mode,
+    )
+    inputs: List[Tuple[RegionalInput, pd.DataFrame]] = []
+    cache_keys = {}
+    for (regional_input, _), input_df in zip(loaded, input_dfs):
+        if input_df.dropna().empty:
+            rt_log.warning(
+                event="Infer Rt Skipped. No Data Passed Filter Requirements:",
+                region=regional_input.display_name,
+            )
+            results[regional_input.region] = pd.DataFrame()
+            continue
+        if cache is not None:
+            cache_key = _result_cache_key(input_df, include_deaths, prior_update)
+            cached = _get_cached_result(cache, cache_key, regional_input)
+            if cached is not None:
+                results[regional_input.region] = cached
+                continue
+            cache_keys[regional_input.region] = cache_key
+        inputs.append((regional_input, input_df))
+
+    provider = process_matrix.get_default_provider()
+    if checkpoint_store is not None:
+        # Each engine filters its series, resuming from their checkpoints.
+        signal_groups = []
+    elif joint_signals:
+        signal_groups = [list(SIGNAL_COLUMNS)]
+    else:
+        signal_groups = [[timeseries_type] for timeseries_type in SIGNAL_COLUMNS]
+    for batch_start in range(0, len(inputs), batch_size):
+        batch = inputs[batch_start : batch_start + batch_size]
+        filter_results = [{} for _ in batch]
+        for timeseries_types in signal_groups:
+            rows = [
+                (i, timeseries_type)
+                for timeseries_type in timeseries_types
+                for i, (_, input_df) in enumerate(batch)
+                if SIGNAL_COLUMNS[timeseries_type] in input_df
+            ]
+            if not rows:
+                continue
+            row_results = _forward_filter_rows(
+                [
+                    batch[i][1][SIGNAL_COLUMNS[timeseries_type]].values
+                    for i, timeseries_type in rows
+                ],
+                provider,
+                prior_update=prior_update,
+            )
+            for (i, timeseries_type), row_result in zip(rows, row_results):
+                filter_results[i][timeseries_type] = row_result
+
+        for (regional_input, input_df), precomputed in zip(batch, filter_results):
+            engine = RtInferenceEngine(
+                data=input_df,
+                display_name=regional_input.display_name,
+                regional_input=regional_input,
+                include_deaths=include_deaths,
+                precomputed_filter_results=precomputed,
+                prior_update=prior_update,
+                checkpoint_store=checkpoint_store,
+                plot_mode=plot_mode,
+                joint_signals=joint_signals,
+            )
+            results[regional_input.region] = engine.infer_all()
+            if cache is not None:
+                cache.put(cache_keys[regional_input.region], results[regional_input.region])
+
+    return results
+
+
+def _forward_filter_rows(
+    series: Sequence[np.ndarray], provider: process_matrix.ProcessMatrixProvider, **kwargs,
+) -> List[bayes_filter.FilterResult]:
+    """Runs the filter for all series at once, as the rows of one tensor.
+
+    Series are aligned on their first day, not by date, exactly as when each series is filtered
+    alone. kwargs are passed to bayes_filter.forward_filter.
     """
+    lengths = [len(values) for values in series]
+    counts = np.full((len(series), max(lengths)), np.nan)
+    for row, values in enumerate(series):
+        counts[row, : lengths[row]] = values
+    result = bayes_filter.forward_filter(counts, provider, **kwargs)
+    return [result.for_row(row, length) for row, length in enumerate(lengths)]
+
+
+def _load_input_data(
+    regional_input: RegionalInput, include_testing_correction: bool,
+) -> pd.DataFrame:
+    """Returns the new cases and deaths of each day, empty if they could not be calculated."""
     # TODO: Outlier Removal Before Test Correction
     try:
         (
@@ -118,13 +316,35 @@ def _generate_input_data(
         return pd.DataFrame()
 
     date = [InferRtConstants.REF_DATE + timedelta(days=int(t)) for t in times]
+    return pd.DataFrame(dict(cases=observed_new_cases, deaths=observed_new_deaths), index=date)
+
+
+def _generate_input_data(
+    regional_input: RegionalInput,
+    include_testing_correction: bool,
+    include_deaths: bool,
+    figure_collector: Optional[list],
+    plot_mode: plotting.PlotMode = plotting.PlotMode.IMMEDIATE,
+) -> pd.DataFrame:
+    """
+    Allow the RtInferenceEngine to be agnostic to aggregation level by handling the loading first
+
+    include_testing_correction: bool
+        If True, include a correction for testing increases and decreases.
+    plot_mode: PlotMode
+        How the smoothing report is produced.
+    """
+    df = _load_input_data(regional_input, include_testing_correction)
+    if df.empty:
+        return df
 
     df = filter_and_smooth_input_data(
-        df=pd.DataFrame(dict(cases=observed_new_cases, deaths=observed_new_deaths), index=date),
+        df=df,
         include_deaths=include_deaths,
         figure_collector=figure_collector,
         region=regional_input.region,
         log=rt_log.new(region=regional_input.display_name),
+        plot_mode=plot_mode,
     )
     return df
 
@@ -135,75 +355,100 @@ def filter_and_smooth_input_data(
     include_deaths: bool,
     figure_collector: Optional[list],
     log: structlog.BoundLoggerBase,
+    plot_mode: plotting.PlotMode = plotting.PlotMode.IMMEDIATE,
 ) -> pd.DataFrame:
     """Do Filtering Here Before it Gets to the Inference Engine"""
-    MIN_CUMULATIVE_COUNTS = dict(cases=20, deaths=10)
-    MIN_INCIDENT_COUNTS = dict(cases=5, deaths=5)
+    return filter_and_smooth_all_input_data(
+        [df],
+        [region],
+        include_deaths=include_deaths,
+        logs=[log],
+        figure_collector=figure_collector,
+        plot_mode=plot_mode,
+    )[0]
+
 
-    dates = df.index
-    # Apply Business Logic To Filter Raw Data
+def filter_and_smooth_all_input_data(
+    dfs: Sequence[pd.DataFrame],
+    regions: Sequence[pipeline.Region],
+    include_deaths: bool,
+    logs: Sequence[structlog.BoundLoggerBase],
+    figure_collector: Optional[dict] = None,
+    plot_mode: plotting.PlotMode = plotting.PlotMode.IMMEDIATE,
+) -> List[pd.DataFrame]:
+    """Replaces outliers, smooths and filters the cases and deaths of many regions at once.
+
+    The counts of each column of all regions are processed as one array, see
+    preprocessing.preprocess_counts. Columns that don't pass the filters are dropped from the
+    DataFrame of their region.
+
+    Args:
+        dfs: DataFrame of each region with a date index and columns cases and deaths.
+        regions: Region of each DataFrame, used for the paths of smoothing reports.
+        include_deaths: If False the deaths column is always dropped.
+        logs: Logger of each region.
+        figure_collector: Optional dict collecting the smoothing report of a single region.
+        plot_mode: How the smoothing reports are produced.
+
+    Returns: The filtered and smoothed DataFrame of each region.
+    """
+    lengths = np.array([len(df) for df in dfs], dtype=int)
+    results = [df.copy() for df in dfs]
     for column in ["cases", "deaths"]:
-        requirements = [  # All Must Be True
-            df[column].count() > InferRtConstants.MIN_TIMESERIES_LENGTH,
-            df[column].sum() > MIN_CUMULATIVE_COUNTS[column],
-            df[column].max() > MIN_INCIDENT_COUNTS[column],
-        ]
-        # Now Apply Input Outlier Detection and Smoothing
-
-        filtered = utils.replace_outliers(df[column], log=rt_log.new(column=column))
-        # TODO find way to indicate which points filtered in figure below
-
-        assert len(filtered) == len(df[column])
-        smoothed = filtered.rolling(
-            InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE,
-            win_type="gaussian",
-            min_periods=InferRtConstants.COUNT_SMOOTHING_KERNEL_STD,
-            center=True,
-        ).mean(std=InferRtConstants.COUNT_SMOOTHING_KERNEL_STD)
-        # TODO: Only start once non-zero to maintain backwards compatibility?
-
-        # Check if the Post Smoothed Meets the Requirements
-        requirements.append(smoothed.max() > MIN_INCIDENT_COUNTS[column])
-
-        # Check include_deaths Flag
-        if column == "deaths" and not include_deaths:
-            requirements.append(False)
-        else:
-            requirements.append(True)
-
-        if all(requirements):
-            if column == "cases":
-                fig = plt.figure(figsize=(10, 6))
-                ax = fig.add_subplot(111)  # plt.axes
-                ax.set_yscale("log")
-                chart_min = max(0.1, smoothed.min())
-                ax.set_ylim((chart_min, df[column].max()))
-                plt.scatter(
-                    dates[-len(df[column]) :],
-                    df[column],
-                    alpha=0.3,
-                    label=f"Smoothing of: {column}",
+        counts = np.full((len(dfs), lengths.max(initial=0)), np.nan)
+        for row, df in enumerate(dfs):
+            counts[row, : lengths[row]] = df[column].values
+        preprocessed = preprocessing.preprocess_counts(
+            counts, column, lengths=lengths, enabled=(column == "cases" or include_deaths)
+        )
+
+        for row in np.flatnonzero(preprocessed.outliers.replaced.any(axis=1)):
+            where = np.flatnonzero(preprocessed.outliers.replaced[row])
+            logs[row].info(
+                event="Replacing Outliers:",
+                column=column,
+                outlier_values=counts[row, where].tolist(),
+                z_score=preprocessed.outliers.z_scores[row, where].astype(int).tolist(),
+                where=where.tolist(),
+                snippets=preprocessing.outlier_snippets(
+                    counts[row, : lengths[row]], preprocessed.filtered[row], where
+                ),
+            )
+
+        included = preprocessed.included
+        for row, df in enumerate(results):
+            length = lengths[row]
+            if not included[row]:
+                logs[row].info(
+                    "Dropping:", columns=column, requirements=preprocessed.filters[row].tolist()
                 )
-                plt.plot(dates[-len(df[column]) :], smoothed)
-                plt.grid(True, which="both")
-                plt.xticks(rotation=30)
-                plt.xlim(min(dates[-len(df[column]) :]), max(dates) + timedelta(days=2))
+                results[row] = df.drop(columns=column, inplace=False)
+                continue
 
-                if not figure_collector:
+            smoothed = pd.Series(preprocessed.smoothed[row, :length], index=df.index)
+            if column == "cases" and plot_mode is not plotting.PlotMode.DISABLED:
+                smoothing_plot = dict(
+                    dates=df.index, original=df[column], smoothed=smoothed, column=column,
+                )
+                if plot_mode is plotting.PlotMode.DEFERRED:
                     plot_path = pyseir.utils.get_run_artifact_path(
-                        region, RunArtifact.RT_SMOOTHING_REPORT
+                        regions[row], RunArtifact.RT_SMOOTHING_REPORT
                     )
-                    plt.savefig(plot_path, bbox_inches="tight")
-                    plt.close(fig)
+                    plotting.defer_plot("smoothing_report", plot_path, **smoothing_plot)
+                elif not figure_collector:
+                    fig = plotting.plot_smoothing_report(**smoothing_plot)
+                    plot_path = pyseir.utils.get_run_artifact_path(
+                        regions[row], RunArtifact.RT_SMOOTHING_REPORT
+                    )
+                    plotting.save_figure(fig, plot_path)
                 else:
-                    figure_collector["1_smoothed_cases"] = fig
+                    figure_collector["1_smoothed_cases"] = plotting.plot_smoothing_report(
+                        **smoothing_plot
+                    )
 
             df[column] = smoothed
-        else:
-            df = df.drop(columns=column, inplace=False)
-            log.info("Dropping:", columns=column, requirements=requirements)
 
-    return df
+    return results
 
 
 class RtInferenceEngine:
@@ -222,6 +467,17 @@ class RtInferenceEngine:
         and save location somewhere downstream.
     regional_input: RegionalInput
         Just used for output paths. Should remove with display_name later.
+    precomputed_filter_results: dict
+        Optional results of bayes_filter.forward_filter for each TimeseriesType, used instead of
+        running the filter in get_posteriors. Set by run_rt_batch.
+    prior_update: PriorUpdateMethod
+        How the process matrix is applied to the posterior of each day.
+    checkpoint_store: RtCheckpointStore
+        Optional store used to resume the filter from a previous run, see get_posterior_summary.
+    plot_mode: PlotMode
+        How the inference report of infer_all is produced.
+    joint_signals: bool
+        If True, infer_all runs the filter once for all timeseries types, see filter_jointly.
     """
 
     def __init__(
@@ -231,6 +487,13 @@ class RtInferenceEngine:
         regional_input: RegionalInput,
         include_deaths=False,
         figure_collector=None,
+        precomputed_filter_results: Optional[
+            Mapping[TimeseriesType, bayes_filter.FilterResult]
+        ] = None,
+        prior_update: process_matrix.PriorUpdateMethod = process_matrix.PriorUpdateMethod.DENSE,
+        checkpoint_store: Optional[checkpoint.RtCheckpointStore] = None,
+        plot_mode: plotting.PlotMode = plotting.PlotMode.IMMEDIATE,
+        joint_signals: bool = False,
     ):
 
         self.dates = data.index
@@ -241,6 +504,11 @@ class RtInferenceEngine:
         self.display_name = display_name
         self.regional_input = regional_input
         self.figure_collector = figure_collector
+        self.precomputed_filter_results = dict(precomputed_filter_results or {})
+        self.prior_update = process_matrix.PriorUpdateMethod(prior_update)
+        self.checkpoint_store = checkpoint_store
+        self.plot_mode = plotting.PlotMode(plot_mode)
+        self.joint_signals = joint_signals
 
         # Load the InferRtConstants (TODO: turn into class constants)
         self.r_list = InferRtConstants.R_BUCKETS
@@ -259,6 +527,7 @@ class RtInferenceEngine:
         self.smooth_rt_map_composite = InferRtConstants.SMOOTH_RT_MAP_COMPOSITE
         self.rt_smoothing_window_size = InferRtConstants.RT_SMOOTHING_WINDOW_SIZE
         self.min_conf_width = InferRtConstants.MIN_CONF_WIDTH
+        self.process_matrix_provider = process_matrix.get_default_provider()
         self.log = structlog.getLogger(Rt_Inference_Target=self.display_name)
         self.log_likelihood = None  # TODO: Add this later. Not in init.
         self.log.info(event="Running:")
@@ -306,8 +575,8 @@ class RtInferenceEngine:
 
         Parameters
         ----------
-        posteriors: pd.DataFrame
-            Probability Mass Function to compute intervals for.
+        posteriors: np.array
+            Probability Mass Function to compute intervals for, one column per day.
         ci: float
             Float confidence interval. Value of 0.95 will compute the upper and
             lower bounds.
@@ -319,9 +588,9 @@ class RtInferenceEngine:
         ci_high: np.array
             High confidence intervals.
         """
-        posterior_cdfs = posteriors.values.cumsum(axis=0)
-        low_idx_list = np.argmin(np.abs(posterior_cdfs - (1 - ci)), axis=0)
-        high_idx_list = np.argmin(np.abs(posterior_cdfs - ci), axis=0)
+        posterior_cdfs = posteriors.cumsum(axis=0)
+        low_idx_list = utils.nearest_cdf_index(posterior_cdfs, 1 - ci)
+        high_idx_list = utils.nearest_cdf_index(posterior_cdfs, ci)
         ci_low = self.r_list[low_idx_list]
         ci_high = self.r_list[high_idx_list]
         return ci_low, ci_high
@@ -332,49 +601,11 @@ class RtInferenceEngine:
            1/sqrt(count) up to a maximum factor of MAX_SCALING_OF_SIGMA
         2) Ensures the smoothing (of the posterior when creating the prior) is symmetric
            in R so that this process does not move argmax (the peak in probability)
+
+        Sigma is quantized and the matrix is shared (read-only) across days and regions, see
+        process_matrix.ProcessMatrixProvider.
         """
-        # TODO FOR ALEX: Please expand this and describe more clearly the meaning of these variables
-        a = self.max_scaling_sigma
-        if timeseries_scale == 0:
-            b = 1.0
-        else:
-            b = max(1.0, math.sqrt(self.scale_sigma_from_count / timeseries_scale))
-
-        use_sigma = min(a, b) * self.default_process_sigma
-
-        process_matrix = sps.norm(loc=self.r_list, scale=use_sigma).pdf(self.r_list[:, None])
-
-        # process_matrix applies gaussian smoothing to the previous posterior to make the prior.
-        # But when the gaussian is wide much of its distribution function can be outside of the
-        # range Reff = (0,10). When this happens the smoothing is not symmetric in R space. For
-        # R<1, when posteriors[previous_day]).argmax() < 50, this asymmetry can push the argmax of
-        # the prior >10 Reff bins (delta R = .2) on each new day. This was a large systematic error.
-
-        # Ensure smoothing window is symmetric in X direction around diagonal
-        # to avoid systematic drift towards middle (Reff = 5). This is done by
-        # ensuring the following matrix values are 0:
-        # 1 0 0 0 0 0 ... 0 0 0 0 0 0
-        # * * * 0 0 0 ... 0 0 0 0 0 0
-        # ...
-        # * * * * * * ... * * * * 0 0
-        # * * * * * * ... * * * * * *
-        # 0 0 * * * * ... * * * * * *
-        # ...
-        # 0 0 0 0 0 0 ... 0 0 0 * * *
-        # 0 0 0 0 0 0 ... 0 0 0 0 0 1
-        sz = len(self.r_list)
-        for row in range(0, sz):
-            if row < (sz - 1) / 2:
-                process_matrix[row, 2 * row + 1 : sz] = 0.0
-            elif row > (sz - 1) / 2:
-                process_matrix[row, 0 : sz - 2 * (sz - row)] = 0.0
-
-        # (3a) Normalize all rows to sum to 1
-        row_sums = process_matrix.sum(axis=1)
-        for row in range(0, sz):
-            process_matrix[row] = process_matrix[row] / row_sums[row]
-
-        return use_sigma, process_matrix
+        return self.process_matrix_provider.get(timeseries_scale)
 
     def get_posteriors(self, timeseries_type, plot=False):
         """
@@ -394,8 +625,8 @@ class RtInferenceEngine:
             Input data over a subset of indices available after windowing.
         times: array-like
             Output integers since the reference date.
-        posteriors: pd.DataFrame
-            Posterior estimates for each timestamp with non-zero data.
+        posteriors: np.array
+            Posterior estimates of shape (len(r_list), number of days) with one column per day.
         start_idx: int
             Index of first Rt value calculated from input data series
             #TODO figure out why this value sometimes truncates the series
@@ -405,128 +636,189 @@ class RtInferenceEngine:
 
         if len(timeseries) == 0:
             self.log.info("empty timeseries, skipping", timeseries_type=str(timeseries_type.value))
-            return None, None, None, None
+            return None, None, None
         else:
             self.log.info(
                 "Analyzing posteriors for timeseries", timeseries_type=str(timeseries_type.value)
             )
 
-        # (1) Calculate Lambda (the Poisson likelihood given the data) based on
-        # the observed increase from t-1 cases to t cases.
-        lam = timeseries[:-1].values * np.exp((self.r_list[:, None] - 1) / self.serial_period)
-
-        # (2) Calculate each day's likelihood over R_t
-        # Originally smoothed counts were rounded (as needed for sps.poisson.pmf below) which
-        # doesn't work well for low counts and introduces artifacts at rounding transitions. Now
-        # calculate for both ceiling and floor values and interpolate between to get smooth
-        # behaviour
-        ts_floor = timeseries.apply(np.floor).astype(int)
-        ts_ceil = timeseries.apply(np.ceil).astype(int)
-        ts_frac = timeseries - ts_floor
-
-        likelihoods_floor = pd.DataFrame(
-            data=sps.poisson.pmf(ts_floor[1:].values, lam),
-            index=self.r_list,
-            columns=timeseries.index[1:],
-        )
-        likelihoods_ceil = pd.DataFrame(
-            data=sps.poisson.pmf(ts_ceil[1:].values, lam),
-            index=self.r_list,
-            columns=timeseries.index[1:],
-        )
-        # Interpolate between value for ceiling and floor of smoothed counts
-        likelihoods = ts_frac * likelihoods_ceil + (1 - ts_frac) * likelihoods_floor
+        # Calculate each day's Poisson likelihood over R_t based on the observed increase from
+        # t-1 to t and iteratively apply Bayes' rule, see bayes_filter.forward_filter. When the
+        # engine was created by run_rt_batch the filter already ran for all regions at once.
+        filter_result = self.precomputed_filter_results.get(timeseries_type)
+        if filter_result is None:
+            filter_result = self._forward_filter(timeseries.values)
+        posteriors = filter_result.posteriors[0]
+        num_days = posteriors.shape[1]
+        self.log_likelihood = filter_result.log_likelihoods[0]
+        self._monitor_lag(filter_result, posteriors.argmax(axis=0))
 
-        # (3) Create the (now scaled up for low counts) Gaussian Matrix
-        (current_sigma, process_matrix) = self.make_process_matrix(timeseries.median())
-
-        # (3a) Normalize all rows to sum to 1
-        process_matrix /= process_matrix.sum(axis=0)
+        if plot:
+            plotting.plot_posteriors(
+                x=pd.DataFrame(posteriors, index=self.r_list, columns=timeseries.index)
+            )  # Returns Figure.
+            # The interpreter will handle this as it sees fit. Normal builds never call plot flag.
 
-        # (4) Calculate the initial prior. Gamma mean of "a" with mode of "a-1".
-        prior0 = sps.gamma(a=2.5).pdf(self.r_list)
-        prior0 /= prior0.sum()
+        start_idx = -num_days
 
-        reinit_prior = sps.gamma(a=2).pdf(self.r_list)
-        reinit_prior /= reinit_prior.sum()
+        return dates[start_idx:], posteriors, start_idx
 
-        # Create a DataFrame that will hold our posteriors for each day
-        # Insert our prior as the first posterior.
-        posteriors = pd.DataFrame(
-            index=self.r_list, columns=timeseries.index, data={timeseries.index[0]: prior0}
+    def _forward_filter(self, counts, initial_posterior=None, initial_scale=None):
+        return bayes_filter.forward_filter(
+            counts[None, :],
+            self.process_matrix_provider,
+            r_buckets=self.r_list,
+            serial_period=self.serial_period,
+            prior_update=self.prior_update,
+            initial_posteriors=None if initial_posterior is None else initial_posterior[None, :],
+            initial_scales=None if initial_scale is None else np.array([initial_scale]),
         )
 
-        # We said we'd keep track of the sum of the log of the probability
-        # of the data for maximum likelihood calculation.
-        log_likelihood = 0.0
+    def filter_jointly(self, timeseries_types):
+        """Runs the filter for all timeseries_types in one call.
 
-        # Initialize timeseries scale (used for auto sigma)
-        scale = timeseries.head(1).item()
-
-        # Setup monitoring for Reff lagging signal in daily likelihood
-        monitor = utils.LagMonitor(debug=False)  # Set debug=True for detailed printout of daily lag
-
-        # (5) Iteratively apply Bayes' rule
-        loop_idx = 0
-        for previous_day, current_day in zip(timeseries.index[:-1], timeseries.index[1:]):
-
-            # Keep track of exponential moving average of scale of counts of timeseries
-            scale = 0.9 * scale + 0.1 * timeseries[current_day]
+        The series of a region share their dates, so they are filtered as the rows of one tensor
+        over the same R grid and process matrices, and each posterior update is applied to all of
+        them at once. The results are used by get_posteriors instead of filtering each series
+        alone. Series already filtered by run_rt_batch are left out, and nothing is done when the
+        engine has a checkpoint_store since checkpoints resume each series separately.
+        """
+        if self.checkpoint_store is not None:
+            return
+        pending = [
+            timeseries_type
+            for timeseries_type in timeseries_types
+            if timeseries_type not in self.precomputed_filter_results
+            and len(self.get_timeseries(timeseries_type)[1]) > 0
+        ]
+        if len(pending) < 2:
+            return
+        filter_results = _forward_filter_rows(
+            [self.get_timeseries(timeseries_type)[1].values for timeseries_type in pending],
+            self.process_matrix_provider,
+            r_buckets=self.r_list,
+            serial_period=self.serial_period,
+            prior_update=self.prior_update,
+        )
+        self.precomputed_filter_results.update(zip(pending, filter_results))
 
-            # Calculate process matrix for each day
-            (current_sigma, process_matrix) = self.make_process_matrix(scale)
+    def _monitor_lag(self, filter_result: bayes_filter.FilterResult, posterior_argmaxes):
+        """Monitors if posterior is lagging excessively behind signal in likelihood.
 
-            # (5a) Calculate the new prior
-            current_prior = process_matrix @ posteriors[previous_day]
+        posterior_argmaxes holds the MAP index of each day of filter_result.
+        """
+        # TODO future can return cumulative lag and use to scale sigma up only when needed
+        monitor = utils.LagMonitor(debug=False)  # Set debug=True for detailed printout of daily lag
+        for loop_idx in range(filter_result.sigmas.shape[1]):
+            monitor.evaluate_lag_using_argmaxes(
+                current_day=loop_idx,
+                current_sigma=filter_result.sigmas[0, loop_idx],
+                prev_post_am=posterior_argmaxes[loop_idx],
+                prior_am=filter_result.prior_argmaxes[0, loop_idx],
+                like_am=filter_result.likelihood_argmaxes[0, loop_idx],
+                post_am=filter_result.numerator_argmaxes[0, loop_idx],
+            )
 
-            # (5b) Calculate the numerator of Bayes' Rule: P(k|R_t)P(R_t)
-            numerator = likelihoods[current_day] * current_prior
+    def _checkpoint_settings(self) -> tuple:
+        """Settings that, along with the input counts, determine the output of the filter."""
+        return (
+            self.serial_period,
+            self.prior_update.value,
+            self.confidence_intervals,
+        ) + self.process_matrix_provider.parameters()
 
-            # (5c) Calculate the denominator of Bayes' Rule P(k)
-            denominator = np.sum(numerator)
+    def get_posterior_summary(self, timeseries_type):
+        """
+        Generate the MAP and credible intervals of the posteriors of R_t.
 
-            # Execute full Bayes' Rule
-            if denominator == 0:
-                # Restart the baysian learning for the remaining series.
-                # This is necessary since otherwise NaN values
-                # will be inferred for all future days, after seeing
-                # a single (smoothed) zero value.
-                #
-                # We understand that restarting the posteriors with the
-                # re-initial prior may incur a start-up artifact as the posterior
-                # restabilizes, but we believe it's the current best
-                # solution for municipalities that have smoothed cases and
-                # deaths that dip down to zero, but then start to increase
-                # again.
+        When the engine has a checkpoint_store and the timeseries is unchanged up to the
+        checkpoint of the region, the filter resumes from the checkpoint. A new checkpoint is then
+        stored for the day COUNT_SMOOTHING_WINDOW_SIZE days before the last, the most recent day
+        whose smoothed count is not expected to be revised by new data.
 
-                posteriors[current_day] = reinit_prior
-            else:
-                posteriors[current_day] = numerator / denominator
+        Parameters
+        ----------
+        timeseries_type: TimeseriesType
+            New X per day (cases, deaths etc).
 
-            # Monitors if posterior is lagging excessively behind signal in likelihood
-            # TODO future can return cumulative lag and use to scale sigma up only when needed
-            monitor.evaluate_lag_using_argmaxes(
-                current_day=loop_idx,
-                current_sigma=current_sigma,
-                prev_post_am=posteriors[previous_day].argmax(),
-                prior_am=current_prior.argmax(),
-                like_am=likelihoods[current_day].argmax(),
-                post_am=numerator.argmax(),
+        Returns
+        -------
+        dates: array-like
+            Date of each day of the summary.
+        summary: bayes_filter.PosteriorSummary
+            Indices into r_list of the MAP and credible interval bounds of each day.
+        """
+        if self.checkpoint_store is None or timeseries_type in self.precomputed_filter_results:
+            dates, posteriors, _ = self.get_posteriors(timeseries_type)
+            if posteriors is None:
+                return None, None
+            return (
+                dates,
+                bayes_filter.summarize_posteriors(posteriors, self.confidence_intervals),
             )
 
-            # Add to the running sum of log likelihoods
-            log_likelihood += np.log(denominator)
-            loop_idx += 1
-
-        self.log_likelihood = log_likelihood
-
-        if plot:
-            plotting.plot_posteriors(x=posteriors)  # Returns Figure.
-            # The interpreter will handle this as it sees fit. Normal builds never call plot flag.
+        dates, timeseries = self.get_timeseries(timeseries_type=timeseries_type)
+        if len(timeseries) == 0:
+            self.log.info("empty timeseries, skipping", timeseries_type=str(timeseries_type.value))
+            return None, None
 
-        start_idx = -len(posteriors.columns)
+        counts = timeseries.values
+        location_id = self.regional_input.region.location_id
+        settings = self._checkpoint_settings()
+        previous = self.checkpoint_store.get(location_id, timeseries_type)
+        if previous is not None and previous.matches(dates[0], counts, settings):
+            self.log.info(
+                "Resuming posteriors from checkpoint",
+                timeseries_type=str(timeseries_type.value),
+                day_index=previous.day_index,
+            )
+            first_day = previous.day_index
+            filter_result = self._forward_filter(
+                counts[first_day:], previous.posterior, previous.scale
+            )
+            # The first day of the result is the checkpoint itself.
+            summary = previous.summary.append(
+                bayes_filter.summarize_posteriors(
+                    filter_result.posteriors[0, :, 1:], self.confidence_intervals
+                )
+            )
+            log_likelihood_before = previous.log_likelihood
+        else:
+            self.log.info(
+                "Analyzing posteriors for timeseries", timeseries_type=str(timeseries_type.value)
+            )
+            first_day = 0
+            filter_result = self._forward_filter(counts)
+            summary = bayes_filter.summarize_posteriors(
+                filter_result.posteriors[0], self.confidence_intervals
+            )
+            log_likelihood_before = 0.0
+
+        self.log_likelihood = log_likelihood_before + filter_result.log_likelihoods[0]
+        self._monitor_lag(filter_result, summary.map_indices[first_day:])
+
+        checkpoint_day = len(counts) - 1 - self.window_size
+        if checkpoint_day >= first_day:
+            offset = checkpoint_day - first_day
+            self.checkpoint_store.put(
+                location_id,
+                timeseries_type,
+                checkpoint.RtCheckpoint(
+                    fingerprint=checkpoint.input_fingerprint(
+                        dates[0], counts[: checkpoint_day + 1], settings
+                    ),
+                    day_index=checkpoint_day,
+                    posterior=filter_result.posteriors[0, :, offset].copy(),
+                    scale=float(filter_result.scales[0, offset]),
+                    log_likelihood=float(
+                        log_likelihood_before
+                        + np.nansum(filter_result.daily_log_likelihoods[0, :offset])
+                    ),
+                    summary=summary.head(checkpoint_day + 1),
+                ),
+            )
 
-        return dates[start_idx:], posteriors, start_idx
+        return dates, summary
 
     def get_available_timeseries(self):
         """
@@ -574,6 +866,8 @@ class RtInferenceEngine:
             available_timeseries.append(TimeseriesType.NEW_CASES)
         if self.deaths is not None:  # We drop deaths in the data loader so don't need to check here
             available_timeseries.append(TimeseriesType.NEW_DEATHS)
+        if self.joint_signals:
+            self.filter_jointly(available_timeseries)
 
         for timeseries_type in available_timeseries:
             # Add Raw Data Output to Output DataFrame
@@ -585,7 +879,7 @@ class RtInferenceEngine:
 
             df = pd.DataFrame()
             try:
-                dates, posteriors, start_idx = self.get_posteriors(timeseries_type)
+                dates, summary = self.get_posterior_summary(timeseries_type)
             except Exception as e:
                 rt_log.exception(
                     event="Posterior Calculation Error", region=self.regional_input.display_name,
@@ -596,12 +890,13 @@ class RtInferenceEngine:
             # This can cause problems when:
             #   1) computing posteriors that assume continuous data (above),
             #   2) when merging data with variable keys
-            if posteriors is None:
+            if summary is None:
                 continue
 
-            df[f"Rt_MAP__{timeseries_type.value}"] = posteriors.idxmax()
-            for ci in self.confidence_intervals:
-                ci_low, ci_high = self.highest_density_interval(posteriors, ci=ci)
+            df[f"Rt_MAP__{timeseries_type.value}"] = self.r_list[summary.map_indices]
+            for i, ci in enumerate(self.confidence_intervals):
+                ci_low = self.r_list[summary.ci_low_indices[i]]
+                ci_high = self.r_list[summary.ci_high_indices[i]]
 
                 low_val = 1 - ci
                 high_val = ci
@@ -716,20 +1011,25 @@ class RtInferenceEngine:
                 / np.power(suppression, self.tail_suppression_correction / 2)
             ).apply(lambda v: max(v, self.min_conf_width)) + df_all["Rt_MAP_composite"]
 
-        if plot:
-            fig = plotting.plot_rt(
+        if plot and self.plot_mode is not plotting.PlotMode.DISABLED:
+            rt_plot = dict(
                 df=df_all,
                 include_deaths=self.include_deaths,
                 shift_deaths=shift_deaths,
                 display_name=self.display_name,
             )
-            if self.figure_collector is None:
+            if self.plot_mode is plotting.PlotMode.DEFERRED:
+                output_path = pyseir.utils.get_run_artifact_path(
+                    self.regional_input.region, RunArtifact.RT_INFERENCE_REPORT
+                )
+                plotting.defer_plot("rt", output_path, **rt_plot)
+            elif self.figure_collector is None:
                 output_path = pyseir.utils.get_run_artifact_path(
                     self.regional_input.region, RunArtifact.RT_INFERENCE_REPORT
                 )
-                fig.savefig(output_path, bbox_inches="tight")
+                plotting.save_figure(plotting.plot_rt(**rt_plot), output_path)
             else:
-                self.figure_collector["3_Rt_inference"] = fig
+                self.figure_collector["3_Rt_inference"] = plotting.plot_rt(**rt_plot)
         if df_all.empty:
             self.log.warning("Inference not possible")
         else:
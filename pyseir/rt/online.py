@@ -0,0 +1,242 @@
+"""
+Stateful R_t filter updated one day of counts at a time.
+
+RtInferenceEngine filters a whole timeseries on every run. OnlineRtFilter keeps the state of the
+filter after the latest day, so each new day of smoothed counts costs a single update of the
+posterior: one process matrix band and one likelihood over the R buckets. The states of the most
+recent days are kept too, so that revisions of recent counts (such as smoothed counts changed by
+new data, intraday corrections or late feeds) only replay the days after the revision. The filter
+can be saved to disk between runs.
+
+Posteriors are identical to those of bayes_filter.forward_filter over the same counts.
+"""
+import math
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pyseir.rt import bayes_filter, checkpoint, process_matrix
+from pyseir.rt.constants import InferRtConstants
+
+
+class OnlineRtFilter:
+    """Posterior of R_t over the days of a timeseries of smoothed daily counts.
+
+    Parameters
+    ----------
+    process_matrix_provider: ProcessMatrixProvider
+        Source of the process matrices. Defaults to the provider built from InferRtConstants.
+    serial_period: float
+        Serial period used to convert R to a daily growth rate.
+    prior_update: PriorUpdateMethod
+        How the process matrix is applied to the previous posterior.
+    confidence_intervals: tuple
+        Credible intervals reported by `summary`.
+    history_days: int
+        Number of most recent days whose counts can be revised.
+    """
+
+    def __init__(
+        self,
+        process_matrix_provider: Optional[process_matrix.ProcessMatrixProvider] = None,
+        serial_period: float = InferRtConstants.SERIAL_PERIOD,
+        prior_update: process_matrix.PriorUpdateMethod = process_matrix.PriorUpdateMethod.DENSE,
+        confidence_intervals=InferRtConstants.CONFIDENCE_INTERVALS,
+        history_days: int = InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE,
+    ):
+        self.process_matrix_provider = (
+            process_matrix_provider or process_matrix.get_default_provider()
+        )
+        self.r_buckets = self.process_matrix_provider.r_buckets
+        self.serial_period = serial_period
+        self.prior_update = process_matrix.PriorUpdateMethod(prior_update)
+        self.confidence_intervals = tuple(confidence_intervals)
+        self.history_days = history_days
+        # Number of days filtered, including those no longer in the history.
+        self.num_days = 0
+        # Days of the history, oldest first, with their count and the state of the filter after
+        # them. The oldest day cannot be revised as the state before it is gone.
+        self._dates: List[np.datetime64] = []
+        self._counts: List[float] = []
+        self._posteriors: List[np.ndarray] = []
+        self._scales: List[float] = []
+        self._log_likelihoods: List[float] = []
+
+    def _settings(self) -> tuple:
+        return (
+            self.serial_period,
+            self.prior_update.value,
+            self.confidence_intervals,
+        ) + self.process_matrix_provider.parameters()
+
+    @property
+    def date(self) -> Optional[pd.Timestamp]:
+        """Date of the latest day, None before the first update."""
+        return pd.Timestamp(self._dates[-1]) if self._dates else None
+
+    @property
+    def posterior(self) -> np.ndarray:
+        """Posterior of the latest day over r_buckets."""
+        return self._posteriors[-1].copy()
+
+    @property
+    def log_likelihood(self) -> float:
+        """Log of the probability of all counts filtered so far."""
+        return self._log_likelihoods[-1]
+
+    @property
+    def rt_map(self) -> float:
+        return float(self.r_buckets[self._posteriors[-1].argmax()])
+
+    @property
+    def rt_mean(self) -> float:
+        return float(self._posteriors[-1] @ self.r_buckets)
+
+    def credible_intervals(self) -> Dict[float, Tuple[float, float]]:
+        """Returns the low and high bound of each confidence interval of the latest day."""
+        summary = bayes_filter.summarize_posteriors(
+            self._posteriors[-1][:, None], self.confidence_intervals
+        )
+        return {
+            ci: (
+                float(self.r_buckets[summary.ci_low_indices[i, 0]]),
+                float(self.r_buckets[summary.ci_high_indices[i, 0]]),
+            )
+            for i, ci in enumerate(self.confidence_intervals)
+        }
+
+    def summary(self) -> pd.DataFrame:
+        """Returns the MAP, mean and credible intervals of each day of the history.
+
+        Columns are named like those of RtInferenceEngine.infer_all, without the timeseries type.
+        """
+        posteriors = np.column_stack(self._posteriors)
+        summary = bayes_filter.summarize_posteriors(posteriors, self.confidence_intervals)
+        df = pd.DataFrame(index=pd.DatetimeIndex(self._dates, name="date"))
+        df["Rt_MAP"] = self.r_buckets[summary.map_indices]
+        df["Rt_mean"] = self.r_buckets @ posteriors
+        for i, ci in enumerate(self.confidence_intervals):
+            df[f"Rt_ci{int(math.floor(100 * (1 - ci)))}"] = self.r_buckets[
+                summary.ci_low_indices[i]
+            ]
+            df[f"Rt_ci{int(math.floor(100 * ci))}"] = self.r_buckets[summary.ci_high_indices[i]]
+        return df
+
+    def update(self, date, count: float):
+        """Adds the count of the day after the latest day, or revises the count of a recent day.
+
+        Revising a day replays the days after it with their current counts.
+        """
+        self.revise(pd.Series([count], index=[date]))
+
+    def revise(self, counts: pd.Series):
+        """Sets the counts of consecutive days, dropping the days after the last of them.
+
+        The first day must be at most one day after the latest day and more recent than the
+        oldest day of the history.
+
+        Raises
+        ------
+        ValueError
+            If the days are not consecutive, a count is not finite, or the first day cannot be
+            revised.
+        """
+        if counts.empty:
+            return
+        dates = pd.DatetimeIndex(counts.index).values.astype("datetime64[D]")
+        values = counts.values.astype(float)
+        if (np.diff(dates) != np.timedelta64(1, "D")).any():
+            raise ValueError("Counts must be of consecutive days")
+        if not np.isfinite(values).all():
+            raise ValueError("Cannot filter non-finite counts")
+
+        if self._dates:
+            if dates[0] > self._dates[-1] + np.timedelta64(1, "D"):
+                raise ValueError(
+                    f"Counts must start on or before {self.date + pd.Timedelta(1, 'D')}"
+                )
+            keep = int(np.searchsorted(np.array(self._dates), dates[0]))
+            if keep == 0:
+                raise ValueError(f"Counts before {self._dates[0]} can no longer be revised")
+            self.num_days -= len(self._dates) - keep
+            for history in self._history():
+                del history[keep:]
+
+        for date, count in zip(dates, values):
+            self._step(date, count)
+        for history in self._history():
+            del history[: -self.history_days - 1]
+
+    def _history(self) -> Tuple[list, ...]:
+        return self._dates, self._counts, self._posteriors, self._scales, self._log_likelihoods
+
+    def _step(self, date: np.datetime64, count: float):
+        if not self._dates:
+            posterior, _ = bayes_filter.initial_priors(self.r_buckets)
+            scale = count
+            log_likelihood = 0.0
+        else:
+            result = bayes_filter.forward_filter(
+                np.array([[self._counts[-1], count]]),
+                self.process_matrix_provider,
+                r_buckets=self.r_buckets,
+                serial_period=self.serial_period,
+                prior_update=self.prior_update,
+                initial_posteriors=self._posteriors[-1][None, :],
+                initial_scales=np.array([self._scales[-1]]),
+            )
+            posterior = result.posteriors[0, :, 1]
+            scale = result.scales[0, 1]
+            log_likelihood = self._log_likelihoods[-1] + result.daily_log_likelihoods[0, 0]
+        self._dates.append(date)
+        self._counts.append(float(count))
+        self._posteriors.append(posterior)
+        self._scales.append(float(scale))
+        self._log_likelihoods.append(float(log_likelihood))
+        self.num_days += 1
+
+    def save(self, path: pathlib.Path):
+        # Write to a temporary file first so that an interrupted run never leaves a partial
+        # state behind.
+        path = pathlib.Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as f:
+            np.savez(
+                f,
+                settings_fingerprint=checkpoint.settings_fingerprint(self._settings()),
+                history_days=self.history_days,
+                num_days=self.num_days,
+                dates=np.array(self._dates, dtype="datetime64[D]").astype(np.int64),
+                counts=np.array(self._counts),
+                posteriors=np.array(self._posteriors).reshape(-1, len(self.r_buckets)),
+                scales=np.array(self._scales),
+                log_likelihoods=np.array(self._log_likelihoods),
+            )
+        tmp_path.replace(path)
+
+    @staticmethod
+    def load(path: pathlib.Path, **kwargs) -> "OnlineRtFilter":
+        """Loads a filter saved by `save`.
+
+        kwargs are the settings passed to OnlineRtFilter, except history_days which is restored.
+
+        Raises
+        ------
+        ValueError
+            If the filter was saved with different settings.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            online_filter = OnlineRtFilter(history_days=int(data["history_days"]), **kwargs)
+            if str(data["settings_fingerprint"]) != checkpoint.settings_fingerprint(
+                online_filter._settings()
+            ):
+                raise ValueError(f"{path} was saved with different filter settings")
+            online_filter.num_days = int(data["num_days"])
+            online_filter._dates = list(data["dates"].astype("datetime64[D]"))
+            online_filter._counts = data["counts"].tolist()
+            online_filter._posteriors = list(data["posteriors"])
+            online_filter._scales = data["scales"].tolist()
+            online_filter._log_likelihoods = data["log_likelihoods"].tolist()
+        return online_filter
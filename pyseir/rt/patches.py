@@ -1,4 +1,4 @@
-from typing import Mapping
+from typing import Mapping, Sequence
 
 import pandas as pd
 import numpy as np
@@ -7,43 +7,103 @@ from libs import pipeline
 from libs.datasets.combined_datasets import CommonFields
 
 
-def patch_aggregate_rt_results(
+RT_AGGREGATE_COLUMNS = ("Rt_MAP_composite", "Rt_ci95_composite")
+
+
+def aggregate_rt_results(
     infection_rate_map: Mapping[pipeline.Region, pd.DataFrame],
     population_map: Mapping[pipeline.Region, float],
+    group_map: Mapping[pipeline.Region, pipeline.Region],
+    columns: Sequence[str] = RT_AGGREGATE_COLUMNS,
 ) -> pd.DataFrame:
-    """Return the population weighted rt dataframe results for the given fips_superset
+    """Return the population weighted Rt results of groups of regions, such as metro areas.
+
+    The rows of all member regions are combined in one pass: each value of `columns` is averaged
+    over the members of its group that have a row for the date, weighted by their population. As
+    with np.average, a NaN value of any member makes the average of its group and date NaN.
 
     Parameters
     ----------
-    fips_superset
-        A list of fips to combine for rt calculation
+    infection_rate_map
+        Rt results of each member region, with a "date" column and `columns`.
+    population_map
+        Population of each member region.
+    group_map
+        Group region of each member region. Members without a group are ignored.
+    columns
+        Columns to average.
 
     Returns
     -------
     dataframe
-        With columns "Rt_MAP_composite" and "Rt_ci95_composite"
+        With columns "location_id" of the group, "date" and `columns`, sorted by both.
     """
-    assert set(infection_rate_map.keys()) == set(population_map.keys())
+    members = [
+        region
+        for region, df in infection_rate_map.items()
+        if region in group_map and df is not None and not df.empty
+    ]
+    groups = sorted({group_map[region] for region in members}, key=lambda r: r.location_id)
+    group_index = {group: i for i, group in enumerate(groups)}
+    output_columns = [CommonFields.LOCATION_ID, CommonFields.DATE, *columns]
+    if not members:
+        return pd.DataFrame(columns=output_columns)
 
-    def load_and_append_population(region: pipeline.Region) -> pd.DataFrame:
-        tmp = infection_rate_map[region]
-        tmp["population"] = population_map[region]
-        return tmp
+    lengths = [len(infection_rate_map[region]) for region in members]
+    dates = np.concatenate(
+        [infection_rate_map[region][CommonFields.DATE].values for region in members]
+    )
+    group_codes = np.repeat([group_index[group_map[region]] for region in members], lengths)
+    weights = np.repeat([float(population_map[region]) for region in members], lengths)
 
-    combined_df = pd.concat(load_and_append_population(x) for x in infection_rate_map.keys())
+    date_codes, unique_dates = pd.factorize(dates, sort=True)
+    keys = group_codes * len(unique_dates) + date_codes
+    num_keys = len(groups) * len(unique_dates)
+    present = np.bincount(keys, minlength=num_keys) > 0
+    total_weights = np.bincount(keys, weights=weights, minlength=num_keys)[present]
 
-    def f(x):
-        """Helper function to apply to weighted arithmetic means to groupby objects"""
-        # TODO: Decide whether Rt_ci95_composite should be changed to being combined in quadrature
-        #  http://ipl.physics.harvard.edu/wp-uploads/2013/03/PS3_Error_Propagation_sp13.pdf instead
-        #  of the population weighted arithmetic mean
+    result = pd.DataFrame(
+        {
+            CommonFields.LOCATION_ID: np.array([group.location_id for group in groups])[
+                np.flatnonzero(present) // len(unique_dates)
+            ],
+            CommonFields.DATE: unique_dates[np.flatnonzero(present) % len(unique_dates)],
+        }
+    )
+    for column in columns:
+        values = np.concatenate(
+            [infection_rate_map[region][column].values for region in members]
+        ).astype(float)
+        weighted_sums = np.bincount(keys, weights=weights * values, minlength=num_keys)
+        result[column] = weighted_sums[present] / total_weights
+    return result[output_columns]
 
-        weighted_data = dict(
-            Rt_MAP_composite=np.average(x["Rt_MAP_composite"], weights=x["population"]),
-            Rt_ci95_composite=np.average(x["Rt_ci95_composite"], weights=x["population"]),
-            date=x.name,
-        )
 
-        return pd.Series(weighted_data)
+def patch_aggregate_rt_results(
+    infection_rate_map: Mapping[pipeline.Region, pd.DataFrame],
+    population_map: Mapping[pipeline.Region, float],
+) -> pd.DataFrame:
+    """Return the population weighted rt dataframe results for the given fips_superset
 
-    return combined_df.groupby(CommonFields.DATE).apply(f)
+    Parameters
+    ----------
+    infection_rate_map
+        Rt results of each region to combine.
+    population_map
+        Population of each region to combine.
+
+    Returns
+    -------
+    dataframe
+        With columns "Rt_MAP_composite", "Rt_ci95_composite" and "date", indexed by date.
+    """
+    assert set(infection_rate_map.keys()) == set(population_map.keys())
+    # TODO: Decide whether Rt_ci95_composite should be changed to being combined in quadrature
+    #  http://ipl.physics.harvard.edu/wp-uploads/2013/03/PS3_Error_Propagation_sp13.pdf instead
+    #  of the population weighted arithmetic mean
+    group = pipeline.Region(location_id="group", fips=None)
+    combined = aggregate_rt_results(
+        infection_rate_map, population_map, {region: group for region in infection_rate_map}
+    )
+    combined = combined.set_index(CommonFields.DATE, drop=False)
+    return combined[[*RT_AGGREGATE_COLUMNS, CommonFields.DATE]]
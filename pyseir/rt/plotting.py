@@ -1,10 +1,46 @@
-import matplotlib.pyplot as plt
+"""
+Figures of Rt inference.
+
+matplotlib is only imported when a figure is rendered, so importing this module does not
+load it. This does not keep matplotlib out of the pyseir cli: importing pyseir.cli loads it
+through the SEIR model fitting modules, whatever PlotMode is used. With PlotMode.DISABLED or
+PlotMode.DEFERRED Rt workers skip building and saving the figures, which is most of the cost.
+"""
+import enum
+import os
+import pathlib
+import pickle
+from dataclasses import dataclass
 from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Callable, Dict
+
+import structlog
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+_log = structlog.get_logger(__name__)
+
+# Data of a deferred figure is saved next to the path of the figure with this suffix added.
+DEFERRED_PLOT_SUFFIX = ".plotdata.pkl"
 
 
-def plot_smoothing(x, original, processed, timeseries_type) -> plt.Figure:
+class PlotMode(enum.Enum):
+    """How figures of Rt inference are produced."""
+
+    # Render each figure and save it as a PDF while inferring Rt.
+    IMMEDIATE = "immediate"
+    # Save the data of each figure, to be rendered later by render_deferred_plots.
+    DEFERRED = "deferred"
+    # Don't produce any figures.
+    DISABLED = "disabled"
+
+
+def plot_smoothing(x, original, processed, timeseries_type) -> "Figure":
     """
     """
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.scatter(
         x[-len(original) :],
@@ -20,9 +56,30 @@ def plot_smoothing(x, original, processed, timeseries_type) -> plt.Figure:
     return fig
 
 
-def plot_posteriors(x) -> plt.Figure:
+def plot_smoothing_report(dates, original, smoothed, column: str) -> "Figure":
+    """Plots the original and smoothed counts of column on a log scale."""
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(10, 6))
+    ax = fig.add_subplot(111)  # plt.axes
+    ax.set_yscale("log")
+    chart_min = max(0.1, smoothed.min())
+    ax.set_ylim((chart_min, original.max()))
+    plt.scatter(
+        dates[-len(original) :], original, alpha=0.3, label=f"Smoothing of: {column}",
+    )
+    plt.plot(dates[-len(original) :], smoothed)
+    plt.grid(True, which="both")
+    plt.xticks(rotation=30)
+    plt.xlim(min(dates[-len(original) :]), max(dates) + timedelta(days=2))
+    return fig
+
+
+def plot_posteriors(x) -> "Figure":
     """
     """
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(12, 8))
     ax.plot(x, alpha=0.1, color="k")
     plt.grid(alpha=0.4)
@@ -31,8 +88,10 @@ def plot_posteriors(x) -> plt.Figure:
     return fig
 
 
-def plot_rt(df, include_deaths, shift_deaths, display_name) -> plt.Figure:
+def plot_rt(df, include_deaths, shift_deaths, display_name) -> "Figure":
     """"""
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(10, 6))
 
     if "Rt_ci5__new_deaths" in df:
@@ -104,3 +163,62 @@ def plot_rt(df, include_deaths, shift_deaths, display_name) -> plt.Figure:
     plt.title(display_name, fontsize=14)
 
     return fig
+
+
+# Figures that can be deferred, by name.
+_DEFERRABLE_PLOTS: Dict[str, Callable[..., "Figure"]] = {
+    "smoothing_report": plot_smoothing_report,
+    "rt": plot_rt,
+}
+
+
+@dataclass(frozen=True)
+class DeferredPlot:
+    """Data of a figure, saved by PlotMode.DEFERRED to be rendered later."""
+
+    # Key of _DEFERRABLE_PLOTS
+    plot_name: str
+    kwargs: Dict[str, Any]
+    # Path of the rendered figure.
+    output_path: str
+
+    def render(self):
+        import matplotlib.pyplot as plt
+
+        fig = _DEFERRABLE_PLOTS[self.plot_name](**self.kwargs)
+        fig.savefig(self.output_path, bbox_inches="tight")
+        plt.close(fig)
+
+
+def save_figure(fig: "Figure", output_path: str):
+    """Saves fig as output_path and releases it."""
+    import matplotlib.pyplot as plt
+
+    fig.savefig(output_path, bbox_inches="tight")
+    plt.close(fig)
+
+
+def defer_plot(plot_name: str, output_path: str, **kwargs):
+    """Saves the data needed to render plot_name to output_path later."""
+    deferred = DeferredPlot(plot_name=plot_name, kwargs=kwargs, output_path=output_path)
+    with open(output_path + DEFERRED_PLOT_SUFFIX, "wb") as f:
+        pickle.dump(deferred, f)
+
+
+def render_deferred_plots(directory: pathlib.Path) -> int:
+    """Renders every figure deferred under directory, returning the number of figures rendered.
+
+    The data of each figure is removed once its figure is saved.
+    """
+    rendered = 0
+    for data_path in sorted(pathlib.Path(directory).rglob(f"*{DEFERRED_PLOT_SUFFIX}")):
+        with data_path.open("rb") as f:
+            deferred: DeferredPlot = pickle.load(f)
+        try:
+            deferred.render()
+        except Exception:
+            _log.exception("Failed to render deferred plot", path=str(data_path))
+            continue
+        os.remove(data_path)
+        rendered += 1
+    return rendered
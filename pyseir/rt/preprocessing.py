@@ -0,0 +1,280 @@
+"""
+Outlier replacement, smoothing and data quality filters of the counts used to infer R_t.
+
+Counts of many regions are processed together as rows of a (regions x days) array. Each row is
+left aligned and its series has a length; days after the end of a row are padding and ignored.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+from pyseir.rt.constants import InferRtConstants
+
+
+# Small epsilon to prevent divide by 0 errors.
+OUTLIER_Z_SCORE_EPSILON = 1e-8
+
+
+def _row_lengths(counts: np.ndarray, lengths: Optional[np.ndarray]) -> np.ndarray:
+    if lengths is None:
+        return np.full(counts.shape[0], counts.shape[1])
+    return np.asarray(lengths, dtype=int)
+
+
+def _padding_mask(counts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    return np.arange(counts.shape[1]) >= lengths[:, None]
+
+
+def lookback_mean_and_std(counts: np.ndarray, window: int):
+    """Returns the mean and standard deviation (ddof=0) of the window days before each day.
+
+    The result is NaN where fewer than window days precede a day or one of them is NaN.
+    """
+    num_regions, num_days = counts.shape
+    mean = np.full((num_regions, num_days), np.nan)
+    std = np.full((num_regions, num_days), np.nan)
+    if num_days <= window:
+        return mean, std
+    # Day t looks at days t - window to t - 1, so the first day with a full window is window.
+    total = np.zeros((num_regions, num_days - window))
+    for offset in range(window):
+        total += counts[:, offset : num_days - window + offset]
+    mean[:, window:] = total / window
+    squares = np.zeros_like(total)
+    for offset in range(window):
+        squares += (counts[:, offset : num_days - window + offset] - mean[:, window:]) ** 2
+    std[:, window:] = np.sqrt(squares / window)
+    return mean, std
+
+
+@dataclass(frozen=True)
+class OutlierReplacement:
+    """Result of replace_outliers."""
+
+    # Counts with outliers replaced, of shape (regions, days).
+    counts: np.ndarray
+    # True for each replaced value.
+    replaced: np.ndarray
+    # z score of every day compared to the lookback window before it.
+    z_scores: np.ndarray
+
+
+def replace_outliers(
+    counts: np.ndarray,
+    lengths: Optional[np.ndarray] = None,
+    local_lookback_window=InferRtConstants.LOCAL_LOOKBACK_WINDOW,
+    z_threshold=InferRtConstants.Z_THRESHOLD,
+    min_mean_to_consider=InferRtConstants.MIN_MEAN_TO_CONSIDER,
+) -> OutlierReplacement:
+    """Replaces outliers in each row of counts, see pyseir.rt.utils.replace_outliers.
+
+    z scores are computed once from the original counts. A value is replaced with the mean of its
+    neighbors, or with the previous value on the last day of a row. Days are replaced in order, so
+    the previous neighbor may itself be a replaced value.
+
+    Parameters
+    ----------
+    counts
+        Array of shape (regions, days).
+    lengths
+        Number of days of each row. Defaults to all days.
+    """
+    counts = np.array(counts, dtype=float)
+    lengths = _row_lengths(counts, lengths)
+    counts[_padding_mask(counts, lengths)] = np.nan
+
+    mean, std = lookback_mean_and_std(counts, local_lookback_window)
+    with np.errstate(invalid="ignore"):
+        z_scores = (counts - mean) / (std + OUTLIER_Z_SCORE_EPSILON)
+        replaced = (z_scores > z_threshold) & (mean > min_mean_to_consider)
+
+    num_days = counts.shape[1]
+    for day in np.flatnonzero(replaced.any(axis=0)):
+        rows = np.flatnonzero(replaced[:, day])
+        previous = counts[rows, day - 1]
+        if day + 1 < num_days:
+            following = counts[rows, day + 1]
+        else:
+            following = np.full(len(rows), np.nan)
+        # The newest value of a row has no next value, so use the previous one.
+        counts[rows, day] = np.where(day == lengths[rows] - 1, previous, (previous + following) / 2)
+    return OutlierReplacement(counts=counts, replaced=replaced, z_scores=z_scores)
+
+
+def outlier_snippets(
+    original: np.ndarray,
+    replaced_counts: np.ndarray,
+    where: np.ndarray,
+    local_lookback_window=InferRtConstants.LOCAL_LOOKBACK_WINDOW,
+) -> List[List[int]]:
+    """Returns the counts around each replaced day of one series, as logged with the outliers.
+
+    Each snippet covers local_lookback_window days before and after a replaced day. Days before it
+    have earlier replacements applied, the day itself and the days after it are original counts.
+
+    Parameters
+    ----------
+    original
+        Counts of one series before outlier replacement.
+    replaced_counts
+        The same counts with outliers replaced, see OutlierReplacement.counts.
+    where
+        Indices of the replaced days.
+    """
+    snippets = []
+    for day in where:
+        start = max(day - local_lookback_window, 0)
+        end = day + local_lookback_window
+        snippet = np.concatenate([replaced_counts[start:day], original[day:end]])
+        snippets.append(snippet.astype(int).tolist())
+    return snippets
+
+
+def gaussian_smooth(
+    counts: np.ndarray,
+    lengths: Optional[np.ndarray] = None,
+    window_size=InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE,
+    kernel_std=InferRtConstants.COUNT_SMOOTHING_KERNEL_STD,
+    min_periods=InferRtConstants.COUNT_SMOOTHING_KERNEL_STD,
+) -> np.ndarray:
+    """Centered gaussian weighted rolling mean of each row of counts.
+
+    Matches pandas `rolling(window_size, win_type="gaussian", min_periods=min_periods,
+    center=True).mean(std=kernel_std)` applied to each series: NaN values are skipped, and the
+    result is NaN where a window has fewer than min_periods values. Weighted sums are accumulated
+    in the same order as pandas.
+    """
+    counts = np.asarray(counts, dtype=float)
+    lengths = _row_lengths(counts, lengths)
+    padding = _padding_mask(counts, lengths)
+    valid = np.isfinite(counts) & ~padding
+    values = np.where(valid, counts, 0.0)
+
+    weights = signal.get_window(("gaussian", kernel_std), window_size, fftbins=False)
+    offset = (window_size - 1) // 2
+    num_days = counts.shape[1]
+    weighted_sum = np.zeros_like(values)
+    weight_sum = np.zeros_like(values)
+    num_values = np.zeros(values.shape, dtype=int)
+    for i, weight in enumerate(weights):
+        # Input day t + shift contributes to output day t.
+        shift = i - offset
+        output_days = slice(max(0, -shift), min(num_days, num_days - shift))
+        input_days = slice(max(0, shift), min(num_days, num_days + shift))
+        weighted_sum[:, output_days] += weight * values[:, input_days]
+        weight_sum[:, output_days] += weight * valid[:, input_days]
+        num_values[:, output_days] += valid[:, input_days]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        smoothed = weighted_sum / weight_sum
+    smoothed[(num_values < min_periods) | padding] = np.nan
+    return smoothed
+
+
+def _nanmax(counts: np.ndarray) -> np.ndarray:
+    """Max of each row ignoring NaN, NaN for rows without any value."""
+    return np.fmax.reduce(counts, axis=1) if counts.shape[1] else np.full(len(counts), np.nan)
+
+
+# Columns of PreprocessedCounts.diagnostics with the result of each filter.
+FILTER_COLUMNS = ("long_enough", "enough_total", "enough_max", "enough_smoothed_max", "enabled")
+
+
+@dataclass(frozen=True)
+class PreprocessedCounts:
+    """Result of preprocess_counts."""
+
+    # Counts with outliers replaced, of shape (regions, days).
+    filtered: np.ndarray
+    # Smoothed counts, of shape (regions, days).
+    smoothed: np.ndarray
+    # See OutlierReplacement
+    outliers: OutlierReplacement
+    # Values compared by the filters, of shape (regions,).
+    num_values: np.ndarray
+    total: np.ndarray
+    max: np.ndarray
+    smoothed_max: np.ndarray
+    # Result of each filter of FILTER_COLUMNS, of shape (regions, len(FILTER_COLUMNS)).
+    filters: np.ndarray
+
+    @property
+    def included(self) -> np.ndarray:
+        """True for rows that pass every filter, of shape (regions,)."""
+        return self.filters.all(axis=1)
+
+    @property
+    def diagnostics(self) -> pd.DataFrame:
+        """One row per region with the values and result of each filter."""
+        diagnostics = pd.DataFrame(
+            {
+                "num_values": self.num_values,
+                "total": self.total,
+                "max": self.max,
+                "outliers_replaced": self.outliers.replaced.sum(axis=1),
+                "smoothed_max": self.smoothed_max,
+            }
+        )
+        for i, column in enumerate(FILTER_COLUMNS):
+            diagnostics[column] = self.filters[:, i]
+        diagnostics["included"] = self.included
+        return diagnostics
+
+
+def preprocess_counts(
+    counts: np.ndarray, column: str, lengths: Optional[np.ndarray] = None, enabled: bool = True,
+) -> PreprocessedCounts:
+    """Replaces outliers, smooths and filters the cases or deaths of many regions at once.
+
+    A region is included when all of the following hold:
+     - it has more than MIN_TIMESERIES_LENGTH values,
+     - its total is more than MIN_CUMULATIVE_COUNTS[column],
+     - its maximum is more than MIN_INCIDENT_COUNTS[column], before and after smoothing,
+     - enabled is True (used to exclude deaths).
+
+    Parameters
+    ----------
+    counts
+        Daily new counts of shape (regions, days).
+    column
+        "cases" or "deaths".
+    lengths
+        Number of days of each row. Defaults to all days.
+    enabled
+        If False no region is included.
+    """
+    counts = np.array(np.atleast_2d(counts), dtype=float)
+    lengths = _row_lengths(counts, lengths)
+    counts[_padding_mask(counts, lengths)] = np.nan
+
+    outliers = replace_outliers(counts, lengths)
+    smoothed = gaussian_smooth(outliers.counts, lengths)
+
+    num_values = np.isfinite(counts).sum(axis=1)
+    total = np.nansum(counts, axis=1)
+    max_count = _nanmax(counts)
+    smoothed_max = _nanmax(smoothed)
+    with np.errstate(invalid="ignore"):
+        filters = np.column_stack(
+            [
+                num_values > InferRtConstants.MIN_TIMESERIES_LENGTH,
+                total > InferRtConstants.MIN_CUMULATIVE_COUNTS[column],
+                max_count > InferRtConstants.MIN_INCIDENT_COUNTS[column],
+                smoothed_max > InferRtConstants.MIN_INCIDENT_COUNTS[column],
+                np.full(len(counts), enabled),
+            ]
+        )
+
+    return PreprocessedCounts(
+        filtered=outliers.counts,
+        smoothed=smoothed,
+        outliers=outliers,
+        num_values=num_values,
+        total=total,
+        max=max_count,
+        smoothed_max=smoothed_max,
+        filters=filters,
+    )
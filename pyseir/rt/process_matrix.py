@@ -0,0 +1,201 @@
+import enum
+import functools
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from scipy import stats as sps
+
+from pyseir.rt.constants import InferRtConstants
+
+
+def build_process_matrix(r_buckets: np.ndarray, sigma: float) -> np.ndarray:
+    """Build the Gaussian process matrix used to smooth the previous posterior into the prior.
+
+    process_matrix applies gaussian smoothing to the previous posterior to make the prior.
+    But when the gaussian is wide much of its distribution function can be outside of the
+    range Reff = (0,10). When this happens the smoothing is not symmetric in R space. For
+    R<1, when posteriors[previous_day]).argmax() < 50, this asymmetry can push the argmax of
+    the prior >10 Reff bins (delta R = .2) on each new day. This was a large systematic error.
+
+    Ensure smoothing window is symmetric in X direction around diagonal
+    to avoid systematic drift towards middle (Reff = 5). This is done by
+    ensuring the following matrix values are 0:
+    1 0 0 0 0 0 ... 0 0 0 0 0 0
+    * * * 0 0 0 ... 0 0 0 0 0 0
+    ...
+    * * * * * * ... * * * * 0 0
+    * * * * * * ... * * * * * *
+    0 0 * * * * ... * * * * * *
+    ...
+    0 0 0 0 0 0 ... 0 0 0 * * *
+    0 0 0 0 0 0 ... 0 0 0 0 0 1
+
+    Rows are then normalized to sum to 1.
+    """
+    process_matrix = sps.norm(loc=r_buckets, scale=sigma).pdf(r_buckets[:, None])
+
+    sz = len(r_buckets)
+    rows = np.arange(sz)[:, None]
+    cols = np.arange(sz)[None, :]
+    above_diagonal_band = (rows < (sz - 1) / 2) & (cols > 2 * rows)
+    below_diagonal_band = (rows > (sz - 1) / 2) & (cols < 2 * rows - sz)
+    process_matrix[above_diagonal_band | below_diagonal_band] = 0.0
+
+    process_matrix /= process_matrix.sum(axis=1, keepdims=True)
+    return process_matrix
+
+
+class PriorUpdateMethod(enum.Enum):
+    """How a process matrix is applied to the previous posterior to make the prior."""
+
+    # Dense matrix product, O(R^2) per posterior.
+    DENSE = "dense"
+    # Product with only the diagonals of the process matrix holding entries above
+    # BANDED_PROCESS_MATRIX_TOLERANCE, O(R * k) per posterior. Falls back to DENSE for wide
+    # bands where the dense product is faster.
+    BANDED = "banded"
+
+
+def extract_band(process_matrix: np.ndarray, tolerance: float) -> np.ndarray:
+    """Returns the band of process_matrix holding all entries greater than tolerance.
+
+    The band is an array of shape (len(process_matrix), 2 * k + 1) where band[i, k + d] is
+    process_matrix[i, i + d], zero where i + d is outside the matrix. Every entry outside the
+    band is at most tolerance so when the band is applied to a probability vector (which sums to
+    1) each element differs from the dense product by at most tolerance.
+    """
+    sz = len(process_matrix)
+    rows, cols = np.nonzero(process_matrix > tolerance)
+    half_width = int(np.abs(cols - rows).max()) if len(rows) else 0
+    band_cols = np.arange(sz)[:, None] + np.arange(-half_width, half_width + 1)
+    in_matrix = (band_cols >= 0) & (band_cols < sz)
+    return np.where(
+        in_matrix, process_matrix[np.arange(sz)[:, None], np.clip(band_cols, 0, sz - 1)], 0.0
+    )
+
+
+def apply_band(posteriors: np.ndarray, band: np.ndarray) -> np.ndarray:
+    """Applies a band from `extract_band` to each row of posteriors, returning the priors."""
+    num_rows, sz = posteriors.shape
+    width = band.shape[1]
+    half_width = (width - 1) // 2
+    padded = np.zeros((num_rows, sz + 2 * half_width))
+    padded[:, half_width : half_width + sz] = posteriors
+    # windows[n, i, j] is padded[n, i + j], the posterior at i + j - half_width.
+    windows = as_strided(
+        padded,
+        shape=(num_rows, sz, width),
+        strides=(padded.strides[0], padded.strides[1], padded.strides[1]),
+        writeable=False,
+    )
+    return np.einsum("nij,ij->ni", windows, band)
+
+
+class ProcessMatrixProvider:
+    """Builds and caches process matrices keyed by a quantized process sigma.
+
+    Sigma is auto adjusted from its default value for low counts - it is scaled up as
+    1/sqrt(count) up to a maximum factor of max_scaling_of_sigma. The scaling factor is quantized
+    in relative steps of sigma_quantization so that the small set of distinct matrices can be
+    built once and shared across days and regions. A factor of 1 (counts at or above
+    scale_sigma_from_count) is never perturbed by the quantization.
+
+    Returned matrices are read-only as they are shared between callers.
+    """
+
+    def __init__(
+        self,
+        r_buckets: np.ndarray = InferRtConstants.R_BUCKETS,
+        default_process_sigma: float = InferRtConstants.DEFAULT_PROCESS_SIGMA,
+        max_scaling_of_sigma: float = InferRtConstants.MAX_SCALING_OF_SIGMA,
+        scale_sigma_from_count: float = InferRtConstants.SCALE_SIGMA_FROM_COUNT,
+        sigma_quantization: float = InferRtConstants.PROCESS_SIGMA_QUANTIZATION,
+        cache_size: Optional[int] = InferRtConstants.PROCESS_MATRIX_CACHE_SIZE,
+        band_tolerance: float = InferRtConstants.BANDED_PROCESS_MATRIX_TOLERANCE,
+    ):
+        self.r_buckets = r_buckets
+        self.default_process_sigma = default_process_sigma
+        self.max_scaling_of_sigma = max_scaling_of_sigma
+        self.scale_sigma_from_count = scale_sigma_from_count
+        self.sigma_quantization = sigma_quantization
+        self._log_step = math.log1p(sigma_quantization)
+        self.band_tolerance = band_tolerance
+        self._matrix_for_step = functools.lru_cache(maxsize=cache_size)(self._build_for_step)
+        self._band_for_step = functools.lru_cache(maxsize=cache_size)(self._build_band_for_step)
+
+    def quantized_steps(self, timeseries_scales: np.ndarray) -> np.ndarray:
+        """Returns the integer quantization step of sigma for each count scale.
+
+        Steps are the cache keys of the provider, see `sigma_for_step` and `matrix_for_step`.
+        """
+        scales = np.asarray(timeseries_scales, dtype=float)
+        with np.errstate(divide="ignore"):
+            factors = np.sqrt(self.scale_sigma_from_count / scales)
+        factors = np.where(scales == 0, 1.0, np.maximum(1.0, factors))
+        factors = np.minimum(self.max_scaling_of_sigma, factors)
+        return np.round(np.log(factors) / self._log_step).astype(int)
+
+    def sigma_for_step(self, step: int) -> float:
+        factor = min(self.max_scaling_of_sigma, math.exp(step * self._log_step))
+        return factor * self.default_process_sigma
+
+    def matrix_for_step(self, step: int) -> np.ndarray:
+        return self._matrix_for_step(int(step))
+
+    def _build_for_step(self, step: int) -> np.ndarray:
+        process_matrix = build_process_matrix(self.r_buckets, self.sigma_for_step(step))
+        process_matrix.setflags(write=False)
+        return process_matrix
+
+    def _build_band_for_step(self, step: int) -> Optional[np.ndarray]:
+        band = extract_band(self.matrix_for_step(step), self.band_tolerance)
+        if 2 * band.shape[1] > len(self.r_buckets):
+            # Wide bands (large sigma) are slower than the dense product.
+            return None
+        band.setflags(write=False)
+        return band
+
+    def band_for_step(self, step: int) -> Optional[np.ndarray]:
+        """Returns the band of the process matrix or None if it is too wide to be worth using."""
+        return self._band_for_step(int(step))
+
+    def update_priors(
+        self, step: int, posteriors: np.ndarray, method: PriorUpdateMethod
+    ) -> np.ndarray:
+        """Applies the process matrix of step to each row of posteriors, returning the priors."""
+        if method is PriorUpdateMethod.BANDED:
+            band = self.band_for_step(step)
+            if band is not None:
+                return apply_band(posteriors, band)
+        return posteriors @ self.matrix_for_step(step).T
+
+    def sigma_for_scale(self, timeseries_scale: float) -> float:
+        """Returns the quantized process sigma for a timeseries of the given count scale."""
+        return self.sigma_for_step(self.quantized_steps([timeseries_scale])[0])
+
+    def get(self, timeseries_scale: float) -> Tuple[float, np.ndarray]:
+        """Returns the quantized sigma and the shared process matrix for the count scale."""
+        step = self.quantized_steps([timeseries_scale])[0]
+        return self.sigma_for_step(step), self.matrix_for_step(step)
+
+    def parameters(self) -> tuple:
+        """Returns the settings that determine the matrices of the provider."""
+        return (
+            self.r_buckets,
+            self.default_process_sigma,
+            self.max_scaling_of_sigma,
+            self.scale_sigma_from_count,
+            self.sigma_quantization,
+            self.band_tolerance,
+        )
+
+    def cache_info(self):
+        return self._matrix_for_step.cache_info()
+
+
+@functools.lru_cache(maxsize=None)
+def get_default_provider() -> ProcessMatrixProvider:
+    """Returns the process-wide provider built from InferRtConstants."""
+    return ProcessMatrixProvider()
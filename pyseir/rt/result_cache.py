@@ -0,0 +1,92 @@
+"""
+Cache of Rt inference results keyed by the content of their input.
+
+The output of RtInferenceEngine.infer_all only depends on the filtered and smoothed input counts
+and on the inference settings. A result is stored under a digest of both, so reruns of regions
+whose input did not change, such as most counties after a late patch of a few of them, return the
+stored result instead of running the filter again.
+"""
+import hashlib
+import pathlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pyseir.rt import utils
+from pyseir.rt.constants import InferRtConstants
+
+
+def inference_settings() -> tuple:
+    """Returns the InferRtConstants values, which all affect the output of infer_all."""
+    return tuple(
+        (name, getattr(InferRtConstants, name))
+        for name in sorted(vars(InferRtConstants))
+        if name.isupper()
+    )
+
+
+def input_digest(input_df: pd.DataFrame, settings: Sequence) -> str:
+    """Returns a digest of the dates, columns and values of input_df and of settings."""
+    hasher = hashlib.sha256()
+    utils.update_hash_with_settings(hasher, settings)
+    hasher.update(repr(list(input_df.columns)).encode())
+    hasher.update(np.ascontiguousarray(input_df.index.values.astype("datetime64[ns]")).tobytes())
+    for column in input_df.columns:
+        hasher.update(np.ascontiguousarray(input_df[column].values, dtype=float).tobytes())
+    return hasher.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class RtResultCache:
+    """Rt results keyed by input_digest.
+
+    When created with a directory each result is also written to its own file so that the cache
+    can be shared by the processes of a build and reused by the next build. Otherwise results are
+    only kept in memory. Statistics are counted per instance.
+    """
+
+    def __init__(self, directory: Optional[pathlib.Path] = None):
+        self.directory = pathlib.Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._results: Dict[str, pd.DataFrame] = {}
+        self.stats = CacheStats()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Returns a copy of the result stored for key, None if there is none."""
+        if key not in self._results and self.directory is not None:
+            path = self._path(key)
+            if path.exists():
+                self._results[key] = pd.read_pickle(path)
+        result = self._results.get(key)
+        if result is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return result.copy()
+
+    def put(self, key: str, result: pd.DataFrame):
+        result = result.copy()
+        self._results[key] = result
+        if self.directory is not None:
+            # Write to a temporary file first so that an interrupted build never leaves a partial
+            # result behind.
+            path = self._path(key)
+            tmp_path = path.with_name(path.name + ".tmp")
+            result.to_pickle(tmp_path)
+            tmp_path.replace(path)
@@ -1,8 +1,12 @@
 import logging
+from typing import Sequence
+
 import numpy as np
 from scipy import signal
+from scipy import special
 
 from pyseir.rt.constants import InferRtConstants
+from pyseir.rt import preprocessing
 
 utils_log = logging.getLogger(__name__)
 
@@ -151,43 +155,115 @@ def replace_outliers(
     x
         pandas.Series with any triggered outliers replaced
     """
-    # Small epsilon to prevent divide by 0 errors.
-    EPSILON = 1e-8
-
-    # Calculate Z Score
-    r = x.rolling(window=local_lookback_window, min_periods=local_lookback_window, center=False)
-    m = r.mean().shift(1)
-    s = r.std(ddof=0).shift(1)
-    z_score = (x - m) / (s + EPSILON)
-    possible_changes_idx = np.flatnonzero(z_score > z_threshold)
-    changed_idx = []
-    changed_value = []
-    changed_snippets = []
-
-    for idx in possible_changes_idx:
-        if m[idx] > min_mean_to_consider:
-            changed_idx.append(idx)
-            changed_value.append(int(x[idx]))
-            slicer = slice(idx - local_lookback_window, idx + local_lookback_window)
-            changed_snippets.append(x[slicer].astype(int).tolist())
-            try:
-                x[idx] = np.mean([x.iloc[idx - 1], x.iloc[idx + 1]])
-            except IndexError:  # Value to replace can be newest and fail on x[idx+1].
-                # If so, just use previous.
-                x[idx] = x[idx - 1]
+    # See preprocessing.replace_outliers for the version applied to many series at once.
+    result = preprocessing.replace_outliers(
+        x.values[None, :],
+        local_lookback_window=local_lookback_window,
+        z_threshold=z_threshold,
+        min_mean_to_consider=min_mean_to_consider,
+    )
+    changed_idx = np.flatnonzero(result.replaced[0])
 
     if len(changed_idx) > 0:
         log.info(
             event="Replacing Outliers:",
-            outlier_values=changed_value,
-            z_score=z_score[changed_idx].astype(int).tolist(),
-            where=changed_idx,
-            snippets=changed_snippets,
+            outlier_values=x.iloc[changed_idx].tolist(),
+            z_score=result.z_scores[0, changed_idx].astype(int).tolist(),
+            where=changed_idx.tolist(),
+            snippets=preprocessing.outlier_snippets(
+                x.values, result.counts[0], changed_idx, local_lookback_window
+            ),
         )
+        x.iloc[changed_idx] = result.counts[0, changed_idx]
 
     return x
 
 
+def poisson_likelihoods(
+    counts, r_buckets=InferRtConstants.R_BUCKETS, serial_period=InferRtConstants.SERIAL_PERIOD,
+):
+    """
+    Compute the Poisson likelihood of each day's count for every R bucket.
+
+    The expected count for day t is the count of day t-1 grown by exp((R - 1) / serial_period).
+    Smoothed counts are not integers so the pmf is evaluated at the floor and ceiling of each
+    count and linearly interpolated between the two. The pmf is evaluated in log space with
+    gammaln which is equivalent to scipy.stats.poisson.pmf without the per-call overhead.
+
+    Parameters
+    ----------
+    counts: array-like
+        Smoothed daily counts of length T.
+    r_buckets: np.array
+        R values to evaluate the likelihood at.
+    serial_period: float
+        Serial period used to convert R to a daily growth rate.
+
+    Returns
+    -------
+    likelihoods: np.array
+        Array of shape (len(r_buckets), T - 1) where column t - 1 is the likelihood of day t.
+    """
+    counts = np.asarray(counts, dtype=float)
+    if not np.isfinite(counts).all():
+        raise ValueError("Cannot calculate likelihoods of non-finite counts")
+    lam = counts[:-1] * np.exp((r_buckets[:, None] - 1) / serial_period)
+    return interpolated_poisson_pmf(counts[1:], lam)
+
+
+def interpolated_poisson_pmf(observed, lam):
+    """
+    Poisson pmf of (possibly non-integer) observed counts given expected counts lam.
+
+    The pmf is evaluated at the floor and ceiling of observed and linearly interpolated. observed
+    and lam are broadcast against each other.
+    """
+    k_floor = np.floor(observed)
+    k_ceil = np.ceil(observed)
+    frac = observed - k_floor
+
+    def log_pmf(k):
+        # Negative counts have zero probability. Guard them explicitly as xlogy(k, 0) is +inf for
+        # k < 0 which would otherwise produce nan.
+        with np.errstate(invalid="ignore"):
+            log_p = special.xlogy(k, lam) - lam - special.gammaln(k + 1)
+        return np.where(k < 0, -np.inf, log_p)
+
+    return (1 - frac) * np.exp(log_pmf(k_floor)) + frac * np.exp(log_pmf(k_ceil))
+
+
+def nearest_cdf_index(cdfs, target):
+    """
+    Find the index of the value closest to target in each column of cumulative distributions.
+
+    Equivalent to np.argmin(np.abs(cdfs - target), axis=0), including picking the first index on
+    ties, but only compares the two values on either side of target in each (non-decreasing)
+    column instead of building an array of differences.
+
+    Parameters
+    ----------
+    cdfs: np.array
+        Array of shape (buckets, columns) where each column is non-decreasing.
+    target: float
+        Value to search for.
+
+    Returns
+    -------
+    indices: np.array
+        Integer index into the first axis for each column.
+    """
+    num_buckets = cdfs.shape[0]
+    above = (cdfs < target).sum(axis=0)
+    below_values = np.take_along_axis(cdfs, np.maximum(above - 1, 0)[np.newaxis], axis=0)[0]
+    above_values = np.take_along_axis(cdfs, np.minimum(above, num_buckets - 1)[np.newaxis], axis=0)[
+        0
+    ]
+    # The closest value below target may be repeated, in which case argmin picks the first.
+    below = (cdfs < below_values).sum(axis=0)
+    pick_below = (above == num_buckets) | (target - below_values <= above_values - target)
+    return np.where(above == 0, 0, np.where(pick_below, below, above))
+
+
 def ewma_smoothing(series, tau=5):
     """
     Exponentially weighted moving average of a series.
@@ -210,6 +286,99 @@ def ewma_smoothing(series, tau=5):
     return smoothed
 
 
+def align_time_series_batch(
+    series_a: np.ndarray, series_b: np.ndarray, shifts=InferRtConstants.XCOR_DAY_RANGE
+) -> np.ndarray:
+    """
+    Identify the optimal time shift between each row of series_a and series_b based on maximal
+    cross-correlation of their derivatives, see align_time_series.
+
+    The cross-correlation of the derivatives over the days where both are valid is averaged over
+    its 2 * n - 1 lags, which equals sum(a) * sum(b) / (2 * n - 1). The sums and n are computed for
+    every shift at once with FFT based correlations of the NaN-masked derivatives and masks.
+
+    The FFT adds rounding errors, and Rt values on the R_BUCKETS grid often give several shifts the
+    same cross-correlation. Rows where another shift is within XCOR_TIE_TOLERANCE of the best one
+    are scored again one shift at a time, as align_time_series did before, so ties are resolved
+    exactly as before.
+
+    Parameters
+    ----------
+    series_a: np.array
+        Reference series to cross-correlate against, of shape (regions, days).
+    series_b: np.array
+        Series to shift and cross-correlate against, of the same shape as series_a.
+    shifts: sequence of int
+        Candidate shifts. Ties are resolved in favor of the first shift.
+
+    Returns
+    -------
+    shift: np.array
+        For each row, the shift applied to series b that aligns it to series a. 0 when no shift
+        leaves any valid day.
+    """
+    shifts = np.asarray(shifts, dtype=int)
+    diff_a = np.diff(np.atleast_2d(np.asarray(series_a, dtype=float)), axis=1)
+    diff_b = np.diff(np.atleast_2d(np.asarray(series_b, dtype=float)), axis=1)
+    num_regions, num_days = diff_a.shape
+    if num_days == 0:
+        return np.zeros(num_regions, dtype=int)
+
+    valid_a = ~np.isnan(diff_a)
+    valid_b = ~np.isnan(diff_b)
+    masked_a = np.where(valid_a, diff_a, 0.0)
+    masked_b = np.where(valid_b, diff_b, 0.0)
+
+    # Shifting b by `shift` pairs day t of a with day t - shift of b. correlate(x, y)[k] is
+    # sum_t x[t] * y[t - k], with negative k wrapping around to the end.
+    fft_size = 2 * num_days
+    fft_valid_a = np.fft.rfft(valid_a, fft_size)
+    fft_valid_b_conj = np.conj(np.fft.rfft(valid_b, fft_size))
+
+    def correlate(fft_x, fft_y_conj):
+        return np.fft.irfft(fft_x * fft_y_conj, fft_size)[:, shifts % fft_size]
+
+    sum_a = correlate(np.fft.rfft(masked_a, fft_size), fft_valid_b_conj)
+    sum_b = correlate(fft_valid_a, np.conj(np.fft.rfft(masked_b, fft_size)))
+    num_valid = np.rint(correlate(fft_valid_a, fft_valid_b_conj))
+    # Shifts beyond the series leave no overlap but still wrap around in the FFT.
+    num_valid[:, np.abs(shifts) >= num_days] = 0
+
+    has_overlap = num_valid > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        xcor = np.where(has_overlap, sum_a * sum_b / (2 * num_valid - 1), -np.inf)
+    best = shifts[xcor.argmax(axis=1)]
+
+    # |sum(a) * sum(b)| of any shift is at most sum(|a|) * sum(|b|).
+    tolerance = InferRtConstants.XCOR_TIE_TOLERANCE * (
+        np.abs(masked_a).sum(axis=1) * np.abs(masked_b).sum(axis=1)
+    )
+    near_best = xcor >= xcor.max(axis=1, keepdims=True) - tolerance[:, None]
+    for row in np.flatnonzero(has_overlap.any(axis=1) & (near_best.sum(axis=1) > 1)):
+        best[row] = _align_with_shift_loop(diff_a[row], diff_b[row], shifts)
+    return np.where(has_overlap.any(axis=1), best, 0)
+
+
+def _align_with_shift_loop(diff_a: np.ndarray, diff_b: np.ndarray, shifts: np.ndarray) -> int:
+    """Returns the shift of diff_b with the largest cross-correlation, computed one at a time.
+
+    The first shift wins ties. Only called with shifts leaving some overlap.
+    """
+    valid_shifts = []
+    xcor = []
+    for shift in shifts:
+        shifted_b = np.full(len(diff_b), np.nan)
+        if shift >= 0:
+            shifted_b[shift:] = diff_b[: max(len(diff_b) - shift, 0)]
+        else:
+            shifted_b[:shift] = diff_b[-shift:]
+        valid = ~np.isnan(diff_a) & ~np.isnan(shifted_b)
+        if valid.any():
+            xcor.append(signal.correlate(diff_a[valid], shifted_b[valid]).mean())
+            valid_shifts.append(shift)
+    return valid_shifts[np.argmax(xcor)]
+
+
 def align_time_series(series_a, series_b):
     """
     Identify the optimal time shift between two data series based on
@@ -227,19 +396,25 @@ def align_time_series(series_a, series_b):
     shift: int
         A shift period applied to series b that aligns to series a
     """
-    shifts = InferRtConstants.XCOR_DAY_RANGE
-    valid_shifts = []
-    xcor = []
-    np.random.seed(InferRtConstants.RNG_SEED)  # Xcor has some stochastic FFT elements.
-    _series_a = np.diff(series_a)
-
-    for i in shifts:
-        series_b_shifted = np.diff(series_b.shift(i))
-        valid = ~np.isnan(_series_a) & ~np.isnan(series_b_shifted)
-        if len(series_b_shifted[valid]) > 0:
-            xcor.append(signal.correlate(_series_a[valid], series_b_shifted[valid]).mean())
-            valid_shifts.append(i)
-    if len(valid_shifts) > 0:
-        return valid_shifts[np.argmax(xcor)]
-    else:
-        return 0
+    # The global seed was set here when the correlation was computed by scipy, keep setting it so
+    # the random state seen by the rest of the pipeline does not change.
+    np.random.seed(InferRtConstants.RNG_SEED)
+    return int(align_time_series_batch(series_a.values[None, :], series_b.values[None, :])[0])
+
+
+def update_hash_with_settings(hasher, settings: Sequence):
+    """Updates hasher with each value of settings.
+
+    The repr of an ndarray rounds its values and elides the middle of long arrays, so ndarrays are
+    hashed by dtype, shape and content. Tuples and lists are hashed value by value, other values by
+    their repr.
+    """
+    for setting in settings:
+        if isinstance(setting, np.ndarray):
+            hasher.update(repr((setting.dtype.str, setting.shape)).encode())
+            hasher.update(np.ascontiguousarray(setting).tobytes())
+        elif isinstance(setting, (tuple, list)):
+            hasher.update(f"{type(setting).__name__}[{len(setting)}]".encode())
+            update_hash_with_settings(hasher, setting)
+        else:
+            hasher.update(repr(setting).encode())
@@ -264,3 +264,37 @@ def test_make_binary_array_exclude_fips_prefix():
         "state97",
         "country-uk",
     }
+
+
+def test_yield_records():
+    df = pd.DataFrame(
+        {
+            CommonFields.FIPS: ["06", "06075"],
+            CommonFields.DATE: pd.to_datetime(["2020-04-01", None]),
+            CommonFields.AGGREGATE_LEVEL: pd.Categorical(["state", None]),
+            CommonFields.CASES: [10, 20],
+            CommonFields.DEATHS: [1.5, np.nan],
+        }
+    )
+
+    records = list(dataset_utils.yield_records(df))
+
+    assert records == [
+        {
+            CommonFields.FIPS: "06",
+            CommonFields.DATE: pd.Timestamp("2020-04-01"),
+            CommonFields.AGGREGATE_LEVEL: "state",
+            CommonFields.CASES: 10,
+            CommonFields.DEATHS: 1.5,
+        },
+        {
+            CommonFields.FIPS: "06075",
+            CommonFields.DATE: None,
+            CommonFields.AGGREGATE_LEVEL: None,
+            CommonFields.CASES: 20,
+            CommonFields.DEATHS: None,
+        },
+    ]
+    assert records == [row.where(pd.notnull(row), None).to_dict() for _, row in df.iterrows()]
+    # The input is not modified.
+    assert df[CommonFields.DEATHS].isna().tolist() == [False, True]
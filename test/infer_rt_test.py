@@ -1,6 +1,9 @@
+import multiprocessing.dummy
 import pathlib
+import unittest.mock
 
 import pytest
+import numpy as np
 import pandas as pd
 import structlog
 
@@ -12,6 +15,16 @@ from pyseir import cli
 
 from pyseir.rt import utils
 from pyseir.rt import infer_rt
+from pyseir.rt import process_matrix
+from pyseir.rt import bayes_filter
+from pyseir.rt import checkpoint
+from pyseir.rt import plotting
+from pyseir.rt import preprocessing
+from pyseir.rt import result_cache
+from pyseir.rt import online
+from pyseir.rt import patches
+from pyseir.rt.constants import InferRtConstants
+from pyseir.utils import TimeseriesType
 from test.mocks.inference import load_data
 from test.mocks.inference.load_data import RateChange
 
@@ -29,6 +42,403 @@ def test_replace_outliers_on_last_day():
     pd.testing.assert_series_equal(results, expected)
 
 
+def _replace_outliers_loop(x: pd.Series):
+    """Copy of the per-series outlier replacement that preprocessing.replace_outliers replaced."""
+    x = x.copy()
+    window = InferRtConstants.LOCAL_LOOKBACK_WINDOW
+    r = x.rolling(window=window, min_periods=window, center=False)
+    m = r.mean().shift(1)
+    s = r.std(ddof=0).shift(1)
+    z_score = (x - m) / (s + 1e-8)
+    snippets = []
+    for idx in np.flatnonzero(z_score > InferRtConstants.Z_THRESHOLD):
+        if m[idx] > InferRtConstants.MIN_MEAN_TO_CONSIDER:
+            snippets.append(x[slice(idx - window, idx + window)].astype(int).tolist())
+            try:
+                x[idx] = np.mean([x.iloc[idx - 1], x.iloc[idx + 1]])
+            except IndexError:
+                x[idx] = x[idx - 1]
+    return x, snippets
+
+
+class _RecordingLog:
+    def __init__(self):
+        self.events = []
+
+    def info(self, **kwargs):
+        self.events.append(kwargs)
+
+
+def test_preprocess_counts_matches_single_series():
+    rng = np.random.default_rng(5)
+    series = [rng.poisson(200, 60).astype(float), rng.poisson(3, 45).astype(float)]
+    series[0][[30, 59]] = 5000.0
+    counts = np.full((3, 60), np.nan)
+    counts[0] = series[0]
+    counts[1, :45] = series[1]
+
+    preprocessed = preprocessing.preprocess_counts(counts, "cases", lengths=[60, 45, 0])
+
+    for row, values in enumerate(series):
+        filtered, snippets = _replace_outliers_loop(pd.Series(values))
+        smoothed = filtered.rolling(
+            InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE,
+            win_type="gaussian",
+            min_periods=InferRtConstants.COUNT_SMOOTHING_KERNEL_STD,
+            center=True,
+        ).mean(std=InferRtConstants.COUNT_SMOOTHING_KERNEL_STD)
+        np.testing.assert_array_equal(preprocessed.filtered[row, : len(values)], filtered.values)
+        np.testing.assert_allclose(preprocessed.smoothed[row, : len(values)], smoothed.values)
+        assert np.isnan(preprocessed.smoothed[row, len(values) :]).all()
+
+        log = _RecordingLog()
+        utils.replace_outliers(pd.Series(values), log)
+        assert [event["snippets"] for event in log.events] == ([snippets] if snippets else [])
+
+    assert preprocessed.outliers.replaced[0, [30, 59]].all()
+    assert preprocessed.filtered[0, 59] == series[0][58]
+    assert preprocessed.included.tolist() == [True, False, False]
+    diagnostics = preprocessed.diagnostics
+    assert diagnostics["outliers_replaced"].tolist() == [2, 0, 0]
+    assert diagnostics["enough_smoothed_max"].tolist() == [True, False, False]
+
+
+def _shift_loop_xcor(series_a: pd.Series, series_b: pd.Series) -> dict:
+    """Cross correlation of each shift, as computed by align_time_series before batching."""
+    from scipy import signal
+
+    diff_a = np.diff(series_a)
+    xcor = {}
+    for shift in InferRtConstants.XCOR_DAY_RANGE:
+        diff_b = np.diff(series_b.shift(shift))
+        valid = ~np.isnan(diff_a) & ~np.isnan(diff_b)
+        if valid.any():
+            xcor[shift] = signal.correlate(diff_a[valid], diff_b[valid]).mean()
+    return xcor
+
+
+def _shift_loop_alignment(series_a: pd.Series, series_b: pd.Series) -> int:
+    xcor = _shift_loop_xcor(series_a, series_b)
+    # max returns the first of equal values, like np.argmax did.
+    return max(xcor, key=xcor.get) if xcor else 0
+
+
+def test_align_time_series_batch_matches_shift_loop():
+    rng = np.random.default_rng(9)
+    series_a = rng.normal(0, 0.05, (40, 50)).cumsum(axis=1) + 1
+    series_b = np.roll(series_a, 7, axis=1) + rng.normal(0, 0.02, (40, 50))
+    series_b[::3, :10] = np.nan
+    series_a[::5, 20] = np.nan
+    series_b[1] = np.nan
+
+    shifts = utils.align_time_series_batch(series_a, series_b)
+
+    for row in range(len(series_a)):
+        expected = _shift_loop_alignment(pd.Series(series_a[row]), pd.Series(series_b[row]))
+        assert shifts[row] == expected
+    assert shifts[1] == 0
+
+
+def test_align_time_series_batch_ties_on_r_grid():
+    # Rt MAP values are on the R_BUCKETS grid, so several shifts often have the same cross
+    # correlation. The shift loop picked the first of them.
+    rng = np.random.default_rng(3)
+    grid_step = InferRtConstants.R_BUCKETS[1]
+    num_days = 21
+    series_a = np.round((1 + rng.normal(0, 0.01, (500, num_days)).cumsum(axis=1)) / grid_step)
+    series_b = np.round(np.roll(series_a, 3, axis=1) + rng.normal(0, 0.5, (500, num_days)))
+    series_a *= grid_step
+    series_b *= grid_step
+    series_b[::4, :2] = np.nan
+    series_a[::7, : num_days - 5] = np.nan
+
+    shifts = utils.align_time_series_batch(series_a, series_b)
+
+    num_ties = 0
+    for row in range(len(series_a)):
+        a, b = pd.Series(series_a[row]), pd.Series(series_b[row])
+        xcor = _shift_loop_xcor(a, b)
+        num_ties += list(xcor.values()).count(max(xcor.values())) > 1
+        assert shifts[row] == _shift_loop_alignment(a, b)
+    assert num_ties > 10
+
+
+def test_poisson_likelihoods_matches_scipy():
+    from scipy import stats as sps
+    from pyseir.rt.constants import InferRtConstants
+
+    counts = np.array([0.0, 0.0, 3.4, 12.0, 11.5, 250.25, 0.7])
+    r_list = InferRtConstants.R_BUCKETS
+    lam = counts[:-1] * np.exp((r_list[:, None] - 1) / InferRtConstants.SERIAL_PERIOD)
+    floor = np.floor(counts[1:])
+    frac = counts[1:] - floor
+    expected = (1 - frac) * sps.poisson.pmf(floor, lam) + frac * sps.poisson.pmf(floor + 1, lam)
+
+    likelihoods = utils.poisson_likelihoods(counts)
+
+    assert likelihoods.shape == (len(r_list), len(counts) - 1)
+    np.testing.assert_allclose(likelihoods, expected, rtol=1e-10, atol=1e-300)
+
+
+def test_nearest_cdf_index_matches_argmin():
+    rng = np.random.default_rng(42)
+    pmfs = rng.random((50, 40)) * (rng.random((50, 40)) > 0.6)
+    pmfs[:, 0] = 0.0
+    pmfs[10, 0] = 1.0
+    cdfs = (pmfs / pmfs.sum(axis=0)).cumsum(axis=0)
+
+    for target in (0.0, 0.05, 0.32, 0.5, 0.68, 0.95, 1.0):
+        expected = np.argmin(np.abs(cdfs - target), axis=0)
+        np.testing.assert_array_equal(utils.nearest_cdf_index(cdfs, target), expected)
+
+
+@pytest.mark.parametrize("sz,sigma", [(11, 0.5), (501, 0.03), (501, 0.9)])
+def test_build_process_matrix_matches_row_loop(sz, sigma):
+    from scipy import stats as sps
+
+    r_list = np.linspace(0, 10, sz)
+    expected = sps.norm(loc=r_list, scale=sigma).pdf(r_list[:, None])
+    for row in range(0, sz):
+        if row < (sz - 1) / 2:
+            expected[row, 2 * row + 1 : sz] = 0.0
+        elif row > (sz - 1) / 2:
+            expected[row, 0 : sz - 2 * (sz - row)] = 0.0
+    expected /= expected.sum(axis=1)[:, None]
+
+    np.testing.assert_array_equal(process_matrix.build_process_matrix(r_list, sigma), expected)
+
+
+def test_process_matrix_provider_shares_quantized_matrices():
+    provider = process_matrix.ProcessMatrixProvider()
+
+    sigma, matrix = provider.get(10000.0)
+    assert sigma == provider.default_process_sigma
+    assert provider.get(5000.0)[1] is matrix
+    assert not matrix.flags.writeable
+
+    low_sigma, low_matrix = provider.get(100.0)
+    assert low_sigma == pytest.approx(
+        provider.default_process_sigma * (5000 / 100) ** 0.5, rel=0.01
+    )
+    assert provider.get(100.5)[1] is low_matrix
+    assert provider.get(0.001)[0] == provider.default_process_sigma * provider.max_scaling_of_sigma
+    assert provider.cache_info().misses == 3
+
+
+@pytest.mark.parametrize("scale", [10000.0, 500.0, 60.0, 0.001])
+def test_banded_prior_update_matches_dense(scale):
+    provider = process_matrix.ProcessMatrixProvider()
+    step = provider.quantized_steps([scale])[0]
+    rng = np.random.default_rng(3)
+    posteriors = rng.random((5, len(provider.r_buckets))) ** 8
+    posteriors /= posteriors.sum(axis=1, keepdims=True)
+
+    dense = provider.update_priors(step, posteriors, process_matrix.PriorUpdateMethod.DENSE)
+    banded = provider.update_priors(step, posteriors, process_matrix.PriorUpdateMethod.BANDED)
+
+    np.testing.assert_allclose(banded, dense, rtol=0, atol=provider.band_tolerance)
+
+
+def test_banded_forward_filter_matches_dense():
+    provider = process_matrix.get_default_provider()
+    counts = np.array([[5.0, 8.0, 12.5, 20.0, 26.0, 31.0, 30.0, 24.0, 15.0, 3.0, 0.5, 1.0]])
+
+    dense = bayes_filter.forward_filter(
+        counts, provider, prior_update=process_matrix.PriorUpdateMethod.DENSE
+    )
+    banded = bayes_filter.forward_filter(
+        counts, provider, prior_update=process_matrix.PriorUpdateMethod.BANDED
+    )
+
+    np.testing.assert_allclose(banded.posteriors, dense.posteriors, rtol=1e-8, atol=1e-10)
+    np.testing.assert_array_equal(banded.posteriors.argmax(axis=1), dense.posteriors.argmax(axis=1))
+
+
+def test_forward_filter_rows_match_single_region_filter():
+    provider = process_matrix.get_default_provider()
+    rng = np.random.default_rng(7)
+    series = [rng.uniform(0, 30, 40).cumsum() / 10, rng.uniform(50, 500, 25), np.array([3.0, 0.0])]
+    counts = np.full((3, 45), np.nan)
+    counts[0, :40] = series[0]
+    counts[1, 10:35] = series[1]
+    counts[2, 43:] = series[2]
+
+    batch = bayes_filter.forward_filter(counts, provider)
+
+    for row, (values, first) in enumerate(zip(series, (0, 10, 43))):
+        single = bayes_filter.forward_filter(values[None, :], provider)
+        days = slice(first, first + len(values))
+        np.testing.assert_allclose(batch.posteriors[row, :, days], single.posteriors[0])
+        assert np.isnan(batch.posteriors[row, :, : days.start]).all()
+        assert np.isnan(batch.posteriors[row, :, days.stop :]).all()
+        assert batch.log_likelihoods[row] == pytest.approx(single.log_likelihoods[0])
+
+
+def test_run_from_checkpoint_matches_full_run(tmp_path):
+    rng = np.random.default_rng(11)
+    counts = pd.Series(
+        rng.uniform(40, 60, 90).cumsum() / 10, index=pd.date_range("2020-06-01", periods=90)
+    )
+    regional_input = infer_rt.RegionalInput(
+        region=pipeline.Region.from_fips("06075"), _combined_data=None
+    )
+
+    def infer(data, store):
+        engine = infer_rt.RtInferenceEngine(
+            data=data.to_frame("cases"),
+            display_name="test",
+            regional_input=regional_input,
+            checkpoint_store=store,
+        )
+        return engine.infer_all(plot=False)
+
+    expected = infer(counts, None)
+
+    # The first run stores a checkpoint that the second, with 20 more days, resumes from.
+    infer(counts.iloc[:70], checkpoint.RtCheckpointStore(tmp_path))
+    store = checkpoint.RtCheckpointStore(tmp_path)
+    previous = store.get(regional_input.region.location_id, TimeseriesType.NEW_CASES)
+    assert previous.day_index == 70 - 1 - InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE
+    pd.testing.assert_frame_equal(infer(counts, store), expected, check_exact=True)
+    assert store.get(regional_input.region.location_id, TimeseriesType.NEW_CASES).day_index == (
+        90 - 1 - InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE
+    )
+
+    # A revision before the checkpoint forces a full run.
+    revised = counts.copy()
+    revised.iloc[5] += 1.0
+    store = checkpoint.RtCheckpointStore(tmp_path)
+    pd.testing.assert_frame_equal(infer(revised, store), infer(revised, None), check_exact=True)
+
+
+def test_joint_signals_match_separate_filters():
+    rng = np.random.default_rng(13)
+    dates = pd.date_range("2020-06-01", periods=90)
+    data = pd.DataFrame(
+        {"cases": rng.uniform(40, 60, 90).cumsum() / 10, "deaths": rng.uniform(1, 3, 90)},
+        index=dates,
+    )
+    regional_input = infer_rt.RegionalInput(
+        region=pipeline.Region.from_fips("06075"), _combined_data=None
+    )
+
+    def infer(joint_signals):
+        engine = infer_rt.RtInferenceEngine(
+            data=data,
+            display_name="test",
+            regional_input=regional_input,
+            include_deaths=True,
+            joint_signals=joint_signals,
+        )
+        return engine, engine.infer_all(plot=False)
+
+    engine, result = infer(True)
+    assert set(engine.precomputed_filter_results) == {
+        TimeseriesType.NEW_CASES,
+        TimeseriesType.NEW_DEATHS,
+    }
+    assert "Rt_MAP__new_deaths" in result
+    pd.testing.assert_frame_equal(result, infer(False)[1])
+
+
+def test_result_cache_keyed_by_input(tmp_path):
+    input_df = pd.DataFrame(
+        dict(cases=np.linspace(10, 50, 30)), index=pd.date_range("2020-06-01", periods=30)
+    )
+    settings = result_cache.inference_settings()
+    key = result_cache.input_digest(input_df, settings)
+    result = pd.DataFrame(dict(Rt_MAP_composite=np.ones(30), fips="06075"))
+
+    cache = result_cache.RtResultCache(tmp_path)
+    assert cache.get(key) is None
+    cache.put(key, result)
+
+    # A new cache reads the result written by the previous one.
+    cache = result_cache.RtResultCache(tmp_path)
+    pd.testing.assert_frame_equal(cache.get(key), result)
+    revised = input_df.copy()
+    revised.iloc[-1] += 1.0
+    assert cache.get(result_cache.input_digest(revised, settings)) is None
+    shifted = input_df.set_index(input_df.index + pd.Timedelta(days=1))
+    assert cache.get(result_cache.input_digest(shifted, settings)) is None
+    assert cache.get(result_cache.input_digest(input_df, settings + (True,))) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 3)
+    assert cache.stats.hit_rate == 0.25
+
+    # The repr of R_BUCKETS rounds its values, hiding this change, the digest must not.
+    r_buckets = InferRtConstants.R_BUCKETS.copy()
+    r_buckets[250] += 1e-10
+    changed = tuple((name, r_buckets if name == "R_BUCKETS" else value) for name, value in settings)
+    assert repr(changed) == repr(settings)
+    assert result_cache.input_digest(input_df, changed) != key
+
+
+def test_online_filter_matches_forward_filter(tmp_path):
+    provider = process_matrix.get_default_provider()
+    rng = np.random.default_rng(13)
+    counts = pd.Series(
+        rng.uniform(20, 80, 60).cumsum() / 10, index=pd.date_range("2020-06-01", periods=60)
+    )
+    expected = bayes_filter.forward_filter(counts.values[None, :], provider)
+
+    online_filter = online.OnlineRtFilter(provider)
+    for date, count in counts.iloc[:40].items():
+        online_filter.update(date, count)
+    # Save and restore the filter between days.
+    online_filter.save(tmp_path / "filter.npz")
+    online_filter = online.OnlineRtFilter.load(tmp_path / "filter.npz")
+    # A wrong count, then corrected along with the next days.
+    online_filter.update(counts.index[40], 1000.0)
+    online_filter.revise(counts.iloc[40:50])
+    for date, count in counts.iloc[50:].items():
+        online_filter.update(date, count)
+
+    assert online_filter.date == counts.index[-1]
+    assert online_filter.num_days == len(counts)
+    np.testing.assert_array_equal(online_filter.posterior, expected.posteriors[0, :, -1])
+    assert online_filter.log_likelihood == pytest.approx(expected.log_likelihoods[0])
+    summary = online_filter.summary()
+    assert len(summary) == InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE + 1
+    assert summary["Rt_MAP"].iloc[-1] == online_filter.rt_map
+    assert summary["Rt_mean"].iloc[-1] == pytest.approx(online_filter.rt_mean)
+    low, high = online_filter.credible_intervals()[0.95]
+    assert (summary["Rt_ci5"].iloc[-1], summary["Rt_ci95"].iloc[-1]) == (low, high)
+
+    with pytest.raises(ValueError):
+        online_filter.update(counts.index[-1] + pd.Timedelta(days=2), 10.0)
+    with pytest.raises(ValueError):
+        online_filter.update(counts.index[0], 10.0)
+    with pytest.raises(ValueError):
+        online.OnlineRtFilter.load(tmp_path / "filter.npz", serial_period=5.0)
+
+
+def test_render_deferred_plots(tmp_path):
+    dates = pd.date_range("2020-06-01", periods=30)
+    original = pd.Series(np.linspace(10, 40, 30), index=dates)
+    output_path = tmp_path / "reports" / "Rt_smoothing.pdf"
+    output_path.parent.mkdir()
+
+    plotting.defer_plot(
+        "smoothing_report",
+        str(output_path),
+        dates=dates,
+        original=original,
+        smoothed=original.rolling(3).mean(),
+        column="cases",
+    )
+    assert not output_path.exists()
+
+    assert plotting.render_deferred_plots(tmp_path) == 1
+    assert output_path.exists()
+    assert not list(tmp_path.rglob(f"*{plotting.DEFERRED_PLOT_SUFFIX}"))
+
+
+def test_forward_filter_rejects_gaps():
+    counts = np.array([[1.0, 2.0, np.nan, 4.0]])
+    with pytest.raises(ValueError):
+        bayes_filter.forward_filter(counts, process_matrix.get_default_provider())
+
+
 """
 Tests of Rt inference code using synthetically generated data for 100 days where the following are
 specified:
@@ -226,6 +636,43 @@ def test_generate_infection_rate_metric_one_empty():
     assert "51017" not in returned_fips
 
 
+@pytest.mark.slow
+def test_run_rt_batch_matches_run_rt():
+    FIPS = [
+        "51017",  # Bath County VA Almost No Cases. Will be filtered out under any thresholds.
+        "51153",  # Prince William VA Lots of Cases
+        "06",  # CA
+        "06075",  # San Francisco, CA
+    ]
+    regions = [pipeline.Region.from_fips(fips) for fips in FIPS]
+
+    results = infer_rt.run_rt_batch(
+        combined_datasets.load_us_timeseries_dataset(), regions, batch_size=2
+    )
+
+    assert set(results.keys()) == set(regions)
+    for region in regions:
+        expected = infer_rt.run_rt(infer_rt.RegionalInput.from_region(region))
+        pd.testing.assert_frame_equal(results[region], expected)
+
+
+@pytest.mark.slow
+def test_run_rt_with_result_cache():
+    regional_input = infer_rt.RegionalInput.from_fips("06075")
+    cache = result_cache.RtResultCache()
+
+    expected = infer_rt.run_rt(regional_input, cache=cache)
+    assert (cache.stats.hits, cache.stats.misses) == (0, 1)
+    pd.testing.assert_frame_equal(infer_rt.run_rt(regional_input, cache=cache), expected)
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    results = infer_rt.run_rt_batch(
+        combined_datasets.load_us_timeseries_dataset(), [regional_input.region], cache=cache
+    )
+    pd.testing.assert_frame_equal(results[regional_input.region], expected)
+    assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+
+
 @pytest.mark.slow
 def test_generate_infection_rate_metric_two_aggregate_levels():
     FIPS = ["06", "06075"]  # CA  # San Francisco, CA
@@ -273,6 +720,70 @@ def test_generate_infection_rate_with_nans():
     assert "25001" in returned_fips
 
 
+def test_aggregate_rt_results_population_weighted():
+    dates = pd.date_range("2020-06-01", periods=3)
+    region_a, region_b, region_c = [
+        pipeline.Region.from_fips(f) for f in ["22051", "22071", "06075"]
+    ]
+    metro = pipeline.Region.from_cbsa_code("35380")
+    infection_rate_map = {
+        region_a: pd.DataFrame(
+            {"date": dates, "Rt_MAP_composite": [1.0, 1.0, 1.0], "Rt_ci95_composite": 1.5}
+        ),
+        # Starts a day later and has a missing value.
+        region_b: pd.DataFrame(
+            {"date": dates[1:], "Rt_MAP_composite": [2.0, np.nan], "Rt_ci95_composite": 2.5}
+        ),
+        region_c: pd.DataFrame(
+            {"date": dates, "Rt_MAP_composite": [0.9, 1.1, 1.2], "Rt_ci95_composite": 1.4}
+        ),
+    }
+    population_map = {region_a: 100.0, region_b: 300.0, region_c: 50.0}
+    group_map = {region_a: metro, region_b: metro, region_c: region_c}
+
+    result = patches.aggregate_rt_results(infection_rate_map, population_map, group_map)
+
+    expected = pd.DataFrame(
+        {
+            "location_id": [metro.location_id] * 3 + [region_c.location_id] * 3,
+            "date": list(dates) * 2,
+            "Rt_MAP_composite": [1.0, 1.75, np.nan, 0.9, 1.1, 1.2],
+            "Rt_ci95_composite": [1.5, 2.25, 2.25, 1.4, 1.4, 1.4],
+        }
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+    # The New Orleans patch is the same aggregation with a single group.
+    nola = {region: infection_rate_map[region] for region in (region_a, region_b)}
+    patched = patches.patch_aggregate_rt_results(
+        nola, {region: population_map[region] for region in nola}
+    )
+    assert patched["Rt_MAP_composite"].tolist()[:2] == [1.0, 1.75]
+    assert (patched.index == dates).all()
+
+
+def test_cli_infers_rt_in_batches():
+    regions = [pipeline.Region.from_fips(fips) for fips in ["06075", "06001", "06013"]]
+    batches = []
+
+    def run_rt_batch(dataset, batch_regions, **kwargs):
+        batches.append(list(batch_regions))
+        return {region: pd.DataFrame({"fips": [region.fips]}) for region in batch_regions}
+
+    single_region_error = AssertionError("Rt inferred one region at a time")
+    with unittest.mock.patch.object(infer_rt, "run_rt_batch", side_effect=run_rt_batch):
+        with unittest.mock.patch.object(infer_rt, "run_rt", side_effect=single_region_error):
+            with unittest.mock.patch.object(combined_datasets, "load_us_timeseries_dataset"):
+                with unittest.mock.patch("os.cpu_count", return_value=1):
+                    with multiprocessing.dummy.Pool(2) as pool:
+                        results = cli._run_infer_rt(pool, regions, batch_size=2)
+
+    assert sorted(batches, key=len, reverse=True) == [regions[:2], regions[2:]]
+    assert {region: df["fips"].item() for region, df in results.items()} == {
+        region: region.fips for region in regions
+    }
+
+
 @pytest.mark.slow
 def test_patch_substatepipeline_nola_infection_rate():
     nola_fips = [
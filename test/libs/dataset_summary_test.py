@@ -84,3 +84,35 @@ def test_summarize_timeseries_fields_with_some_real_data():
     assert summary.loc[("06025", "cases"), "largest_delta_date"] > pd.to_datetime("2020-04-01")
     assert cases_summary["has_value"] == True
     assert cases_summary["num_observations"] > 100
+
+
+def test_generate_field_summaries_matches_generate_field_summary():
+    dates = pd.to_datetime([f"2020-07-0{i + 1}" for i in range(8)])
+    wide_df = pd.DataFrame(
+        [
+            [None, None, 10, 30, 32, None, 40, None],
+            [None, None, 10, None, None, None, None, None],
+            [5, 1, None, 1, 5, 5, None, 2],
+        ],
+        index=pd.Index(["multiple", "one", "tied_deltas"], name="variable"),
+        columns=dates,
+        dtype=float,
+    )
+
+    summaries = libs.qa.dataset_summary_gen.generate_field_summaries(wide_df)
+
+    expected = wide_df.apply(libs.qa.dataset_summary_gen.generate_field_summary, axis=1)
+    pd.testing.assert_frame_equal(summaries, expected)
+
+
+def test_generate_field_summaries_no_data_points():
+    wide_df = pd.DataFrame(
+        [[None, None, None]], index=["cases"], columns=["2020-07-01", "2020-07-02", "2020-07-03"]
+    )
+
+    summaries = libs.qa.dataset_summary_gen.generate_field_summaries(wide_df)
+
+    assert summaries.loc["cases", "has_value"] == False
+    assert summaries.loc["cases", "num_observations"] == 0
+    assert summaries.loc["cases", ["min_date", "max_date", "largest_delta_date"]].isna().all()
+    assert summaries.loc["cases", ["max_value", "min_value", "latest_value"]].isna().all()
@@ -1,7 +1,9 @@
 import io
 import pathlib
+import pickle
 
 import pytest
+import numpy as np
 import pandas as pd
 import structlog
 
@@ -10,6 +12,7 @@ from covidactnow.datapublic.common_fields import PdFields
 
 from covidactnow.datapublic.common_test_helpers import to_dict
 from libs.datasets import combined_datasets
+from libs.datasets import dataset_utils
 
 from libs.datasets import timeseries
 from libs.pipeline import Region
@@ -95,6 +98,29 @@ def test_multi_region_to_from_timeseries_and_latest_values(tmp_path: pathlib.Pat
     assert multiregion_loaded.get_one_region(Region.from_fips("01")).latest["c2"] == 123.4
 
 
+def test_multi_region_to_from_parquet(tmp_path: pathlib.Path):
+    multiregion = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,fips,county,aggregate_level,date,m1,m2\n"
+            "iso1:us#fips:97111,97111,Bar County,county,2020-04-02,2,\n"
+            "iso1:us#fips:97111,97111,Bar County,county,2020-04-03,3,\n"
+            "iso1:us#fips:97222,97222,Foo County,county,2020-04-01,,10\n"
+            "iso1:us#fips:97111,97111,Bar County,county,,3,\n"
+            "iso1:us#fips:97222,97222,Foo County,county,,,11\n"
+        )
+    )
+    parquet_path = tmp_path / "multiregion.parquet"
+    multiregion.to_parquet(parquet_path)
+
+    multiregion_loaded = timeseries.MultiRegionTimeseriesDataset.from_parquet(parquet_path)
+    assert_combined_like(multiregion_loaded, multiregion)
+    pd.testing.assert_series_equal(multiregion_loaded.data.dtypes, multiregion.data.dtypes)
+
+    m1_loaded = timeseries.MultiRegionTimeseriesDataset.from_parquet(parquet_path, columns=["m1"])
+    assert set(m1_loaded.combined_df.columns) == {"location_id", "date", "fips", "m1"}
+    assert m1_loaded.get_one_region(Region.from_fips("97111")).latest["m1"] == 3
+
+
 def test_multi_region_get_one_region():
     ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
         io.StringIO(
@@ -124,6 +150,90 @@ def test_multi_region_get_one_region():
     assert region_97222_ts.latest["m2"] == 11
 
 
+def test_multi_region_get_one_region_unsorted():
+    ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,county,aggregate_level,date,m1\n"
+            "iso1:us#fips:97222,Foo County,county,2020-04-02,12\n"
+            "iso1:us#fips:97111,Bar County,county,2020-04-02,2\n"
+            "iso1:us#fips:97222,Foo County,county,2020-04-01,11\n"
+            "iso1:us#fips:97111,Bar County,county,2020-04-01,1\n"
+            "iso1:us#fips:97111,Bar County,county,,3\n"
+            "iso1:us#fips:97333,Baz County,county,,4\n"
+        )
+    )
+    region_97222_ts = ts.get_one_region(Region.from_fips("97222"))
+    assert (
+        region_97222_ts.data["date"].tolist()
+        == pd.to_datetime(["2020-04-01", "2020-04-02"]).tolist()
+    )
+    assert region_97222_ts.data["m1"].tolist() == [11, 12]
+    assert region_97222_ts.latest["m1"] is None
+    assert ts.get_one_region(Region.from_fips("97111")).data["m1"].tolist() == [1, 2]
+    assert ts.get_one_region(Region.from_fips("97111")).latest["m1"] == 3
+
+    region_97333_ts = ts.get_one_region(Region.from_fips("97333"))
+    assert region_97333_ts.data.empty
+    assert region_97333_ts.latest["m1"] == 4
+
+    with pytest.raises(timeseries.RegionLatestNotFound):
+        ts.get_one_region(Region.from_fips("97444"))
+
+
+def test_shared_dataset_get_one_region(tmp_path: pathlib.Path):
+    ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,county,aggregate_level,date,m1\n"
+            "iso1:us#fips:97222,Foo County,county,2020-04-02,12\n"
+            "iso1:us#fips:97111,Bar County,county,2020-04-02,2\n"
+            "iso1:us#fips:97222,Foo County,county,2020-04-01,\n"
+            "iso1:us#fips:97111,Bar County,county,2020-04-01,1\n"
+            "iso1:us#fips:97111,Bar County,county,,3\n"
+            "iso1:us#fips:97333,Baz County,county,,4\n"
+        )
+    )
+    shared = timeseries.SharedMultiRegionDataset.write(ts, tmp_path / "shared")
+    # A pickled dataset re-opens the same files.
+    shared = pickle.loads(pickle.dumps(shared))
+    assert [region.location_id for region in shared.iter_regions()] == [
+        "iso1:us#fips:97111",
+        "iso1:us#fips:97222",
+    ]
+
+    for fips in ["97111", "97222", "97333"]:
+        region = Region.from_fips(fips)
+        expected = ts.get_one_region(region)
+        region_ts = shared.get_one_region(region)
+        pd.testing.assert_frame_equal(
+            region_ts.data, expected.data.reset_index(drop=True), check_index_type=False,
+        )
+        assert region_ts.latest == expected.latest
+
+    with pytest.raises(timeseries.RegionLatestNotFound):
+        shared.get_one_region(Region.from_fips("97444"))
+
+
+def test_multi_region_last_valid_values():
+    ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,county,aggregate_level,date,m1,m2\n"
+            "iso1:us#fips:97222,Foo County,county,2020-04-03,,\n"
+            "iso1:us#fips:97111,Bar County,county,2020-04-02,2,\n"
+            "iso1:us#fips:97222,Foo County,county,2020-04-01,11,\n"
+            "iso1:us#fips:97111,Bar County,county,2020-04-01,1,10\n"
+            "iso1:us#fips:97222,Foo County,county,2020-04-02,12,\n"
+            "iso1:us#fips:97333,Baz County,county,,4,\n"
+        )
+    )
+    latest = ts.last_valid_values()
+
+    assert latest is ts.last_valid_values()
+    assert to_dict([CommonFields.LOCATION_ID], latest[["county", "m1", "m2"]]) == {
+        "iso1:us#fips:97111": {"county": "Bar County", "m1": 2, "m2": 10},
+        "iso1:us#fips:97222": {"county": "Foo County", "m1": 12},
+    }
+
+
 def test_multi_region_get_counties():
     ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
         io.StringIO(
@@ -222,6 +332,74 @@ def test_multiregion_provenance():
     counties = out.get_counties(after=pd.to_datetime("2020-04-01"))
     assert "iso1:us#fips:03" not in counties.provenance.index
     assert counties.provenance.loc["iso1:us#fips:97222"].at["m1"] == "src21"
+    assert isinstance(out.provenance.dtype, pd.CategoricalDtype)
+
+
+def test_multi_region_categorical_columns():
+    ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,county,aggregate_level,date,m1\n"
+            "iso1:us#fips:97111,Bar County,county,2020-04-02,2\n"
+            "iso1:us#fips:97222,Foo County,county,2020-04-01,3\n"
+            "iso1:us#fips:97111,Bar County,county,,3\n"
+        )
+    )
+    for column in [CommonFields.LOCATION_ID, CommonFields.FIPS, CommonFields.COUNTY]:
+        assert isinstance(ts.data[column].dtype, pd.CategoricalDtype)
+    assert isinstance(ts.latest_data[CommonFields.COUNTY].dtype, pd.CategoricalDtype)
+    assert ts.latest_data.index.dtype == object
+
+    # Groups are only made for the locations in the subset, not every category.
+    subset = ts.get_regions_subset([Region.from_fips("97222")])
+    assert subset.groupby_region().ngroups == 1
+
+
+def test_categorical_columns_keep_dtypes_and_row_counts(tmp_path: pathlib.Path):
+    df = read_csv_and_index_fips_date(
+        "fips,county,aggregate_level,date,m1,m2\n"
+        "97111,Bar County,county,2020-04-02,2,\n"
+        "97111,Bar County,county,2020-04-03,3,\n"
+        "97222,Foo County,county,2020-04-01,,10\n"
+        "01,,state,2020-04-01,,20\n"
+    ).reset_index()
+    ts = timeseries.TimeseriesDataset(df)
+    latest = ts.latest_values_object()
+    multiregion = timeseries.MultiRegionTimeseriesDataset.from_timeseries_and_latest(ts, latest)
+    multiregion.to_parquet(tmp_path / "multiregion.parquet")
+    shared = timeseries.SharedMultiRegionDataset.write(multiregion, tmp_path / "shared")
+    object_timeseries_df = multiregion.data.astype(
+        {
+            column: object
+            for column in dataset_utils.CATEGORICAL_COLUMNS
+            if column in multiregion.data.columns
+        }
+    )
+
+    # Every constructor converts the same columns to categoricals and keeps the other dtypes.
+    for data in [
+        ts.data,
+        latest.data,
+        multiregion.data,
+        multiregion.latest_data,
+        timeseries.MultiRegionTimeseriesDataset.from_timeseries_df(object_timeseries_df).data,
+        timeseries.MultiRegionTimeseriesDataset.from_parquet(tmp_path / "multiregion.parquet").data,
+        shared.get_one_region(Region.from_fips("97111")).data,
+    ]:
+        for column, dtype in data.dtypes.items():
+            if column in dataset_utils.CATEGORICAL_COLUMNS:
+                assert isinstance(dtype, pd.CategoricalDtype), column
+            else:
+                assert dtype == df.dtypes[column], column
+
+    # Grouping rows of one location makes one group, not one for every category.
+    subset = ts.data.loc[ts.data[CommonFields.FIPS] == "97111", :]
+    provenance = combined_datasets.provenance_wide_metrics_to_series(
+        subset.loc[:, [CommonFields.FIPS, CommonFields.DATE]]
+        .assign(m1="src1")
+        .set_index([CommonFields.FIPS, CommonFields.DATE]),
+        structlog.get_logger(),
+    )
+    assert provenance.to_dict() == {("97111", "m1"): "src1"}
 
 
 def _combined_sorted_by_location_date(ts: timeseries.MultiRegionTimeseriesDataset) -> pd.DataFrame:
@@ -315,6 +493,7 @@ def test_calculate_new_cases():
 
     mrts_after = timeseries.add_new_cases(mrts=mrts_before)
     pd.testing.assert_frame_equal(mrts_after.data, mrts_expected.data, check_like=True)
+    pd.testing.assert_frame_equal(mrts_after.latest_data, mrts_before.latest_data)
 
 
 def test_timeseries_long():
@@ -339,7 +518,7 @@ def test_timeseries_long():
             "iso1:us#fips:97111,2020-04-04,m1,4\n"
         ),
         parse_dates=[CommonFields.DATE],
-        dtype={"value": float},
+        dtype={"value": float, "location_id": "category"},
     )
     long = ts.timeseries_long(["m1", "m2"]).sort_values(
         [CommonFields.LOCATION_ID, PdFields.VARIABLE, CommonFields.DATE], ignore_index=True
@@ -347,6 +526,39 @@ def test_timeseries_long():
     pd.testing.assert_frame_equal(long, expected, check_like=True)
 
 
+def test_timeseries_array():
+    ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,date,county,aggregate_level,m1,m2\n"
+            "iso1:us#fips:97111,2020-04-04,Bar County,county,4,\n"
+            "iso1:us#cbsa:10100,2020-04-03,,,,3\n"
+            "iso1:us#fips:97111,2020-04-02,Bar County,county,2,\n"
+            "iso1:us#cbsa:10100,2020-04-02,,,,2\n"
+            "iso1:us#fips:97111,,Bar County,county,4,\n"
+            "iso1:us#fips:97222,,Foo County,county,5,\n"
+        )
+    )
+    array = ts.timeseries_array(["m1", "m2"])
+
+    assert array is ts.timeseries_array(["m1", "m2"])
+    assert array.values.dtype == np.float32
+    assert array.location_ids.tolist() == ["iso1:us#cbsa:10100", "iso1:us#fips:97111"]
+    assert array.dates.equals(pd.date_range("2020-04-02", "2020-04-04"))
+    assert array.values.shape == (2, 3, 2)
+    np.testing.assert_array_equal(array.field("m1").loc["iso1:us#fips:97111"], [2, np.nan, 4])
+    np.testing.assert_array_equal(array.field("m2").loc["iso1:us#cbsa:10100"], [2, 3, np.nan])
+
+    long = array.to_long().astype({PdFields.VALUE: float})
+    pd.testing.assert_frame_equal(
+        long,
+        ts.timeseries_long(["m1", "m2"]).sort_values(
+            [PdFields.VARIABLE, CommonFields.LOCATION_ID, CommonFields.DATE], ignore_index=True
+        ),
+        check_like=True,
+        check_categorical=False,
+    )
+
+
 def test_join_columns():
     ts_1 = timeseries.MultiRegionTimeseriesDataset.from_csv(
         io.StringIO(
@@ -433,6 +645,63 @@ def test_join_columns_missing_regions():
     assert_combined_like(ts_joined, ts_expected)
 
 
+def test_builder_same_as_chained_methods():
+    ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,date,county,aggregate_level,m1\n"
+            "iso1:us#fips:97111,2020-04-02,Bar County,county,2\n"
+            "iso1:us#fips:97111,2020-04-04,Bar County,county,4\n"
+            "iso1:us#fips:97111,,Bar County,county,4\n"
+        )
+    )
+    ts_m2 = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,date,m2\n"
+            "iso1:us#fips:97111,2020-04-02,3\n"
+            "iso1:us#fips:97111,2020-04-03,5\n"
+        )
+    )
+    ts_m3 = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO("location_id,date,m3\n" "iso1:us#fips:97222,2020-04-02,6\n")
+    )
+    ts_cbsa = timeseries.MultiRegionTimeseriesDataset.from_csv(
+        io.StringIO(
+            "location_id,date,m1\n" "iso1:us#cbsa:10100,2020-04-02,2\n" "iso1:us#cbsa:10100,,3\n"
+        )
+    )
+    latest_m4 = pd.DataFrame({"location_id": ["iso1:us#fips:97111"], "m4": [7]})
+    latest_m5 = pd.DataFrame({"location_id": ["iso1:us#cbsa:10100"], "m5": [8]})
+
+    built = (
+        timeseries.MultiRegionTimeseriesDatasetBuilder(ts)
+        .join_columns(ts_m2)
+        .join_columns(ts_m3)
+        .append_regions(ts_cbsa)
+        .append_latest_df(latest_m4)
+        .append_latest_df(latest_m5)
+        .build()
+    )
+
+    chained = (
+        ts.join_columns(ts_m2)
+        .join_columns(ts_m3)
+        .append_regions(ts_cbsa)
+        .append_latest_df(latest_m4)
+        .append_latest_df(latest_m5)
+    )
+    pd.testing.assert_frame_equal(built.data, chained.data)
+    pd.testing.assert_frame_equal(built.latest_data, chained.latest_data)
+
+    with pytest.raises(ValueError):
+        # Raises because m2 is already joined
+        timeseries.MultiRegionTimeseriesDatasetBuilder(ts).join_columns(ts_m2).join_columns(ts_m2)
+
+    with pytest.raises(ValueError):
+        timeseries.MultiRegionTimeseriesDatasetBuilder(ts).append_regions(ts_cbsa).join_columns(
+            ts_m2
+        )
+
+
 def test_iter_one_region():
     ts = timeseries.MultiRegionTimeseriesDataset.from_csv(
         io.StringIO(
@@ -446,6 +715,8 @@ def test_iter_one_region():
             # 97222 does not have a row of latest data to make sure it still works
             "iso1:us#fips:97222,2020-04-02,No Recent County,county,3\n"
             "iso1:us#fips:97222,2020-04-04,No Recent County,county,5\n"
+            # 97333 only has latest data so is not a region of the timeseries
+            "iso1:us#fips:97333,,Baz County,county,6\n"
         )
     )
     assert {region.location_id for region, _ in ts.iter_one_regions()} == {
@@ -455,5 +726,5 @@ def test_iter_one_region():
     }
     for it_region, it_one_region in ts.iter_one_regions():
         one_region = ts.get_one_region(it_region)
-        assert (one_region.data.fillna("") == it_one_region.data.fillna("")).all(axis=None)
+        pd.testing.assert_frame_equal(one_region.data, it_one_region.data)
         assert one_region.latest == it_one_region.latest
@@ -0,0 +1,26 @@
+import pytest
+
+from libs import pipeline
+from libs.pipeline import Region
+
+
+def test_fips_to_location_id():
+    assert pipeline.fips_to_location_id("06") == "iso1:us#iso2:us-ca"
+    assert pipeline.fips_to_location_id("06075") == "iso1:us#iso2:us-ca#fips:06075"
+    # The warning is raised for every call, not only the one that is cached.
+    for _ in range(2):
+        with pytest.warns(pipeline.BadFipsWarning):
+            assert pipeline.fips_to_location_id("97111") == "iso1:us#fips:97111"
+
+
+def test_location_id_to_fips():
+    assert pipeline.location_id_to_fips("iso1:us#iso2:us-ca#fips:06075") == "06075"
+    assert pipeline.location_id_to_fips("iso1:us#cbsa:10100") is None
+
+
+def test_region_interned():
+    assert Region.from_fips("06075") is Region.from_fips("06075")
+    assert Region.from_state("CA") is Region.from_fips("06")
+    assert Region.from_cbsa_code("10100") is Region.from_cbsa_code("10100")
+    # Regions made with the constructor are still equal to interned ones.
+    assert Region.from_fips("06") == Region(location_id="iso1:us#iso2:us-ca", fips="06")